@@ -16,19 +16,19 @@ load_dotenv()
 API_BASE_URL = os.getenv('API_BASE_URL', 'http://127.0.0.1:8000')
 ADMIN_KEY = os.getenv('ADMIN_KEY', 'dev-admin-key')
 
-def make_admin_request(endpoint, method='GET', data=None):
+# Session HTTP partagée : connexions keep-alive réutilisées entre les appels
+session = requests.Session()
+session.headers['X-Admin-Key'] = ADMIN_KEY
+
+def make_admin_request(endpoint, method='GET', data=None, params=None):
     """Fait une requête à l'API admin"""
     url = f"{API_BASE_URL}{endpoint}"
-    headers = {
-        'X-Admin-Key': ADMIN_KEY,
-        'Content-Type': 'application/json'
-    }
     
     try:
         if method == 'GET':
-            response = requests.get(url, headers=headers)
+            response = session.get(url, params=params)
         elif method == 'POST':
-            response = requests.post(url, headers=headers, json=data)
+            response = session.post(url, json=data)
         else:
             print(f"Méthode {method} non supportée")
             return None
@@ -42,24 +42,73 @@ def make_admin_request(endpoint, method='GET', data=None):
         print(f"Erreur de connexion: {e}")
         return None
 
-def list_users():
-    """Liste tous les utilisateurs"""
+# Filtres de la commande list/export -> paramètres de /api/admin/users
+USER_FILTERS = {
+    'premium': {'premium': 'true'},
+    'standard': {'premium': 'false'},
+    'exhausted': {'trial_exhausted': 'true'},
+}
+
+def parse_user_filters(args):
+    """premium | standard | exhausted | after=<date ISO> | before=<date ISO>"""
+    params = {}
+    for arg in args:
+        if arg in USER_FILTERS:
+            params.update(USER_FILTERS[arg])
+        elif arg.startswith('after='):
+            params['created_after'] = arg[len('after='):]
+        elif arg.startswith('before='):
+            params['created_before'] = arg[len('before='):]
+        else:
+            print(f"⚠️ Filtre ignoré: {arg}")
+    return params
+
+def list_users(filters=None, page_size=500):
+    """Liste les utilisateurs page par page (curseurs de l'API)"""
     print("📋 Liste des utilisateurs:")
-    result = make_admin_request('/api/admin/users')
-    if result:
-        users = result.get('users', [])
-        if not users:
-            print("Aucun utilisateur trouvé")
+    params = dict(filters or {}, limit=page_size)
+    total = 0
+    while True:
+        result = make_admin_request('/api/admin/users', params=params)
+        if not result:
             return
         
-        print(f"Total: {len(users)} utilisateur(s)")
-        print("-" * 80)
-        for user in users:
+        for user in result.get('users', []):
             premium_status = "✅ Premium" if user['premium'] else "❌ Standard"
             print(f"📧 {user['email']}")
             print(f"   {premium_status} | Essais: {user['trial_count']}")
             print(f"   Créé: {user['created_at']}")
             print()
+        total += result.get('count', 0)
+        
+        if not result.get('next_cursor'):
+            break
+        params['cursor'] = result['next_cursor']
+    
+    if total == 0:
+        print("Aucun utilisateur trouvé")
+        return
+    print("-" * 80)
+    print(f"Total: {total} utilisateur(s)")
+
+def export_users(output, filters=None):
+    """Exporte les utilisateurs en NDJSON (une ligne JSON par utilisateur), lu en streaming"""
+    url = f"{API_BASE_URL}/api/admin/users"
+    params = dict(filters or {}, format='ndjson')
+    try:
+        with session.get(url, params=params, stream=True) as response:
+            if response.status_code != 200:
+                print(f"Erreur {response.status_code}: {response.text}")
+                return
+            count = 0
+            with open(output, 'wb') as f:
+                for line in response.iter_lines():
+                    if line:
+                        f.write(line + b"\n")
+                        count += 1
+        print(f"✅ {count} utilisateur(s) exporté(s) dans {output}")
+    except Exception as e:
+        print(f"Erreur de connexion: {e}")
 
 def set_premium(email, premium=True):
     """Active/désactive le statut premium d'un utilisateur"""
@@ -76,6 +125,51 @@ def reset_trial(email):
     if result:
         print(f"✅ Compteur d'essais remis à zéro pour {email}")
 
+def make_bulk_request(endpoint, sources, data=None):
+    """
+    Opération groupée : `sources` = fichiers CSV et/ou emails.
+    Un fichier est envoyé tel quel (upload CSV), les emails en une requête JSON.
+    """
+    url = f"{API_BASE_URL}{endpoint}"
+    files = [source for source in sources if os.path.isfile(source)]
+    emails = [source for source in sources if not os.path.isfile(source)]
+    results = []
+    try:
+        for path in files:
+            with open(path, 'rb') as f:
+                response = session.post(url, files={'file': (os.path.basename(path), f, 'text/csv')}, params=data)
+            if response.status_code != 200:
+                print(f"Erreur {response.status_code} ({path}): {response.text}")
+                continue
+            results.extend(response.json().get('results', []))
+        if emails:
+            response = session.post(url, json=dict(data or {}, emails=emails))
+            if response.status_code != 200:
+                print(f"Erreur {response.status_code}: {response.text}")
+            else:
+                results.extend(response.json().get('results', []))
+    except Exception as e:
+        print(f"Erreur de connexion: {e}")
+    return results
+
+def print_bulk_results(results, action):
+    summary = {}
+    for result in results:
+        summary[result['status']] = summary.get(result['status'], 0) + 1
+        if result['status'] != 'updated':
+            print(f"   ⚠️ {result['email'] or '<vide>'}: {result['status']}")
+    print(f"✅ {action}: {summary.get('updated', 0)}/{len(results)} utilisateur(s) mis à jour")
+
+def bulk_premium(sources, premium=True):
+    """Premium pour une liste d'emails ou des fichiers CSV (email[,premium])"""
+    results = make_bulk_request('/api/admin/bulk/set-premium', sources, {'premium': 'true' if premium else 'false'})
+    print_bulk_results(results, f"Premium {'activé' if premium else 'désactivé'}")
+
+def bulk_reset(sources):
+    """Remise à zéro des essais pour une liste d'emails ou des fichiers CSV (email)"""
+    results = make_bulk_request('/api/admin/bulk/reset-trial', sources)
+    print_bulk_results(results, "Essais remis à zéro")
+
 def show_help():
     """Affiche l'aide"""
     print("""
@@ -85,15 +179,25 @@ Usage:
     python admin_script.py <commande> [arguments]
 
 Commandes disponibles:
-    list                    - Liste tous les utilisateurs
+    list [filtres]          - Liste les utilisateurs (page par page)
+    export <fichier> [filtres] - Exporte les utilisateurs en NDJSON
     premium <email> <true/false> - Active/désactive le premium
     reset <email>           - Remet à zéro les essais
+    bulk-premium <true/false> <fichier.csv|email>... - Premium en masse (CSV: email[,premium])
+    bulk-reset <fichier.csv|email>...  - Remet à zéro les essais en masse
     help                    - Affiche cette aide
 
+Filtres (list, export):
+    premium | standard | exhausted | after=<date ISO> | before=<date ISO>
+
 Exemples:
     python admin_script.py list
+    python admin_script.py list exhausted after=2025-01-01
+    python admin_script.py export users.ndjson premium
     python admin_script.py premium user@example.com true
     python admin_script.py reset user@example.com
+    python admin_script.py bulk-premium true clients.csv
+    python admin_script.py bulk-reset a@example.com b@example.com
 
 Variables d'environnement:
     API_BASE_URL - URL de l'API (défaut: http://127.0.0.1:8000)
@@ -108,7 +212,13 @@ def main():
     command = sys.argv[1].lower()
     
     if command == 'list':
-        list_users()
+        list_users(parse_user_filters(sys.argv[2:]))
+    
+    elif command == 'export':
+        if len(sys.argv) < 3:
+            print("❌ Usage: python admin_script.py export <fichier> [filtres]")
+            return
+        export_users(sys.argv[2], parse_user_filters(sys.argv[3:]))
     
     elif command == 'premium':
         if len(sys.argv) < 4:
@@ -125,6 +235,18 @@ def main():
         email = sys.argv[2]
         reset_trial(email)
     
+    elif command == 'bulk-premium':
+        if len(sys.argv) < 4:
+            print("❌ Usage: python admin_script.py bulk-premium <true/false> <fichier.csv|email>...")
+            return
+        bulk_premium(sys.argv[3:], sys.argv[2].lower() == 'true')
+    
+    elif command == 'bulk-reset':
+        if len(sys.argv) < 3:
+            print("❌ Usage: python admin_script.py bulk-reset <fichier.csv|email>...")
+            return
+        bulk_reset(sys.argv[2:])
+    
     elif command == 'help':
         show_help()
     
@@ -1,53 +1,65 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Blueprint, Flask, g, request, jsonify, Response, send_file, stream_with_context
 from flask_cors import CORS
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+from werkzeug.wsgi import FileWrapper
 import os
 import json
 import subprocess
 import sys
 import platform
+import time
 from pathlib import Path
+import csv
 import hashlib
-from logger import logger
+import io
+from logger import LOG_FILE, logger
+from scrape_feed import SCRAPE_FEED_NAME, ScrapeFeedState
+from events import (
+    acquire_stream_slot, parse_event_id, read_since, release_stream_slot, stream_events, stream_log, tail_lines
+)
+from title_cache import TITLE_MAX_WAIT, resolve_titles
+from zip_stream import ZIP_COMPRESSLEVEL, stream_zip
+from transcript_catalog import (
+    TRANSCRIPTS_PAGE_SIZE, count_transcripts, delete_transcripts, list_transcripts as list_catalog,
+    recent_transcript_names
+)
+from transcript_search import ensure_search_index, search_transcripts
+from transcript_store import (
+    GZIP_SUFFIX, READ_CHUNK_SIZE, display_name, header_path, open_transcript, read_transcript,
+    read_transcript_page, resolve_transcript_path, transcript_header, transcript_size
+)
+from database import DATABASE_URL, engine, SessionLocal, Base
+from quota import TRIAL_LIMIT, consume_trial, invalidate_premium, refund_trial
+from auth import auth_required, current_email, init_auth, is_admin, user_required
+from jobs import (
+    ACTIVE_STATES, JOB_QUEUE_LIMIT, JOB_SCRIPTS, count_jobs, create_job, get_job, queue_depth,
+    latest_job, list_jobs, job_workdir, read_completion_signal
+)
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, Column, String, Boolean, Integer, DateTime
-from sqlalchemy.orm import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import Column, String, Boolean, Integer, DateTime, Index, or_, and_, tuple_, update
 from functools import wraps
 from datetime import datetime
-from supabase import create_client, Client
 
 # Charger les variables d'environnement
 load_dotenv()
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# Création du schéma au démarrage : seulement en local (SQLite) par défaut ; en production -> python app.py migrate
+DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", str(DATABASE_URL.startswith("sqlite"))).lower() in ("1", "true", "yes")
 
-app = Flask(__name__)
+# Routes de l'API, enregistrées sur l'application par create_app()
+api = Blueprint("api", __name__)
 
-# Configuration de la base de données Supabase
-DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///users.db')
 SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key')
-TRIAL_LIMIT = int(os.getenv('TRIAL_LIMIT', '3'))
-ADMIN_KEY = os.getenv('ADMIN_KEY', 'dev-admin-key')
-
-app.config['SECRET_KEY'] = SECRET_KEY
-
-# Configuration SQLAlchemy (connexion sécurisée Supabase IPv4)
-# Détecter le type de base de données pour les arguments de connexion
-connect_args = {}
-if DATABASE_URL.startswith('postgresql://'):
-    connect_args = {"sslmode": "require"}
-
-engine = create_engine(
-    DATABASE_URL,
-    connect_args=connect_args,
-    pool_pre_ping=True,
-    pool_size=5,          # Taille modérée pour Render (évite surcharge)
-    max_overflow=10       # Connexions temporaires supplémentaires
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
+ADMIN_USERS_PAGE_SIZE = 100
+ADMIN_USERS_PAGE_MAX = 1000
+ADMIN_BULK_CHUNK = 500  # emails par UPDATE ... WHERE email IN (...)
+ADMIN_BULK_MAX = 50000
+CONTENT_PAGE_SIZE = int(os.getenv('CONTENT_PAGE_SIZE', str(64 * 1024)))  # octets par page de transcription
+CONTENT_PAGE_MAX = 1024 * 1024
+LOG_TAIL_MAX_LINES = 5000
+LOG_SINCE_MAX_BYTES = 1024 * 1024  # au-delà, since_offset repart de la fin du log
 
 # Modèle User pour Supabase
 class User(Base):
@@ -59,13 +71,30 @@ class User(Base):
     premium = Column(Boolean, default=False)
     trial_count = Column(Integer, default=0)
     created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        # Liste admin paginée (keyset sur created_at, id)
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
+
+_supabase = None
 
-# Créer les tables si elles n'existent pas
-Base.metadata.create_all(bind=engine)
+def get_supabase():
+    """Client Supabase créé au premier appel (import lourd, utile seulement pour /api/auth/register et login)"""
+    global _supabase
+    if _supabase is None:
+        from supabase import create_client
+        _supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+    return _supabase
 
-# Configuration CORS pour les origines frontend (production + développement)
-CORS(app, resources={r"/api/*": {"origins": ["*"]}},
-     supports_credentials=True)
+def migrate():
+    """Crée les tables et index manquants (toutes les tables déclarées : users, jobs, transcripts...)"""
+    Base.metadata.create_all(bind=engine)
+    # Index ajoutés après coup sur des tables existantes (create_all ne touche pas une table existante)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    ensure_search_index()
 
 # Chemins basés sur le répertoire du script
 BASE_DIR = Path(__file__).resolve().parent
@@ -73,19 +102,16 @@ USERS_FILE = BASE_DIR / "users.json"
 CHANNELS_FILE = BASE_DIR / "channels.txt"
 URLS_FILE = BASE_DIR / "urls.txt"
 TRANSCRIPTS_DIR = BASE_DIR / "transcripts"
-TRANSCRIBE_LOG = BASE_DIR / "transcribe.out"
 
-# Chemins pour Render (dossier /tmp writable)
-RENDER_TMP_DIR = Path("/tmp")
-RENDER_TRANSCRIPTS_DIR = RENDER_TMP_DIR / "transcripts"
-RENDER_LOG_FILE = RENDER_TMP_DIR / "transcribe.out"
+# Vues incrémentales des flux de scraping, une par fichier (seul le delta depuis le dernier offset est relu)
+SCRAPE_FEEDS = {}
 
-# Créer le dossier transcripts s'il n'existe pas
-TRANSCRIPTS_DIR.mkdir(exist_ok=True)
-
-# Variables globales pour suivre les processus en cours
-SCRAPE_PROCESS = None
-TRANSCRIBE_PROCESS = None
+def _feed_state(path):
+    """Vue matérialisée du flux d'un job (créée à la première lecture)"""
+    state = SCRAPE_FEEDS.get(path)
+    if state is None:
+        state = SCRAPE_FEEDS.setdefault(path, ScrapeFeedState(path))
+    return state
 
 def load_users():
     """Charge les utilisateurs depuis le fichier JSON"""
@@ -141,22 +167,6 @@ def create_user(email, password_hash):
     finally:
         db.close()
 
-def increment_trial_count(email):
-    """Incrémente le compteur d'essais d'un utilisateur"""
-    db = get_db()
-    try:
-        user = db.query(User).filter(User.email == email).first()
-        if user:
-            user.trial_count += 1
-            db.commit()
-            return user.trial_count
-        return None
-    except Exception as e:
-        db.rollback()
-        raise e
-    finally:
-        db.close()
-
 def can_user_transcribe(email):
     """Vérifie si un utilisateur peut transcrire (premium ou essais restants)"""
     user = get_user_by_email(email)
@@ -171,74 +181,143 @@ def can_user_transcribe(email):
     
     return False, f"Limite d'essais atteinte ({TRIAL_LIMIT})"
 
-def _spawn_transcriber(script_path: Path):
+def _request_job_id():
+    """job_id passé en query string ou dans le corps JSON"""
+    job_id = request.args.get("job_id")
+    if not job_id and request.is_json:
+        job_id = (request.get_json(silent=True) or {}).get("job_id")
+    return job_id
+
+def _caller_email():
+    """Propriétaire des jobs de l'appelant : email du jeton (?email= seulement en mode AUTH_REQUIRED=false)"""
+    return current_email(request.args.get("email"))
+
+def _owns(job):
+    """L'appelant peut lire ce job : il en est le propriétaire, ou c'est un appel d'administration"""
+    return is_admin() or job["owner"] == _caller_email()
+
+def _load_job(kind, job_id=None):
     """
-    Lance le script de transcription de manière compatible Windows/Linux
-    Redirige stdout et stderr vers le fichier de log /tmp/transcribe.out (Render)
+    Job de l'appelant : `job_id` s'il lui appartient, sinon son dernier job de ce type.
+    Retourne (job, None), ou (None, réponse 404) si le job est inconnu, d'un autre type,
+    d'un autre utilisateur, ou si l'appelant n'a encore aucun job (pas de repli sur les
+    fichiers partagés du dossier backend).
     """
-    global TRANSCRIBE_PROCESS
-    
+    if job_id:
+        job = get_job(job_id)
+        if job is not None and (job["kind"] != kind or not _owns(job)):
+            job = None
+    elif is_admin():
+        job = latest_job(kind)
+    else:
+        owner = _caller_email()
+        job = latest_job(kind, owner=owner) if owner else None
+    if job is None:
+        return None, (jsonify({"error": "Job non trouvé"}), 404)
+    return job, None
+
+def _event_stream(generator):
+    """
+    Réponse SSE occupant une place de flux (SSE_MAX_CONNECTIONS par processus) jusqu'à sa fermeture ;
+    503 avec Retry-After si toutes sont prises (EventSource réessaie de lui-même).
+    """
+    if not acquire_stream_slot():
+        return jsonify({"error": "Trop de flux temps réel ouverts, réessayez plus tard"}), 503, {"Retry-After": "5"}
+    response = Response(
+        stream_with_context(generator),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+    # Appelé même si le générateur n'a jamais été parcouru (client parti avant le premier octet)
+    response.call_on_close(release_stream_slot)
+    return response
+
+def _owned_events(owner):
+    """Filtre d'événements : seulement ceux des jobs de `owner` (propriétaire de chaque job mis en cache)"""
+    owners = {}
+    def accept(record):
+        job_id = record.get("job_id")
+        if not job_id:
+            return False
+        if job_id not in owners:
+            job = get_job(job_id)
+            owners[job_id] = job["owner"] if job else None
+        return owner is not None and owners[job_id] == owner
+    return accept
+
+def _enqueue_job(kind, owner, params, files):
+    """
+    Enregistre un job dans la file (worker.py l'exécutera).
+    Retourne (job, None) ou (None, réponse 503) quand la file est pleine.
+    """
+    if queue_depth() >= JOB_QUEUE_LIMIT:
+        logger.log_warning(f"File de jobs pleine ({JOB_QUEUE_LIMIT}), job {kind} refusé")
+        return None, (jsonify({
+            "error": "Trop de jobs en attente, réessayez dans un instant"
+        }), 503, {"Retry-After": "30"})
+    job = create_job(kind, owner=owner, params=params, files=files)
+    logger.log_info(f"Job {kind} {job['job_id']} mis en file")
+    return job, None
+
+def _job_response(job):
+    """Champs communs renvoyés par les endpoints de scraping / transcription"""
+    return {
+        "job_id": job["job_id"],
+        "state": job["state"],
+        "process_id": job["pid"],
+        "attempts": job["attempts"],
+    }
+
+def _scrape_files(job):
+    """(flux JSON Lines, urls.txt) d'un job de scraping"""
+    base = job_workdir(job)
+    return base / SCRAPE_FEED_NAME, base / "urls.txt"
+
+def _transcripts_base(job):
+    """Dossier racine des transcripts d'un job ('transcripts/' y est relatif)"""
+    return job_workdir(job)
+
+def _transcript_files(transcripts_dir):
+    """Fichiers de transcription d'un dossier : [(nom affiché, chemin)], .txt.gz (compressé) ou .txt (existant)"""
+    files = {}
+    if transcripts_dir.exists():
+        for file_path in sorted(transcripts_dir.glob("*.txt")) + sorted(transcripts_dir.glob("*.txt" + GZIP_SUFFIX)):
+            files[display_name(file_path)] = file_path
+    return sorted(files.items())
+
+def _transcribe_log(job):
+    return job_workdir(job) / JOB_SCRIPTS["transcribe"][1]
+
+def _read_scraped_videos(urls_file):
+    """Lit l'instantané urls.txt (JSON) ou l'ancien format une URL par ligne"""
+    if not urls_file.exists():
+        return None
+    with open(urls_file, 'r', encoding='utf-8') as f:
+        content = f.read().strip()
     try:
-        # Vérifier que le script existe
-        if not script_path.exists():
-            raise FileNotFoundError(f"Script non trouvé: {script_path}")
-        
-        # Créer le dossier /tmp/transcripts s'il n'existe pas
-        RENDER_TRANSCRIPTS_DIR.mkdir(exist_ok=True)
-        
-        # Utiliser le fichier de log dans /tmp (writable sur Render)
-        log_file_path = RENDER_LOG_FILE
-        
-        # Logger tous les chemins utilisés
-        logger.log_transcription("", "CHEMINS", f"Script: {script_path}")
-        logger.log_transcription("", "CHEMINS", f"Base dir: {BASE_DIR}")
-        logger.log_transcription("", "CHEMINS", f"Sortie transcripts: {RENDER_TRANSCRIPTS_DIR}")
-        logger.log_transcription("", "CHEMINS", f"Log file: {log_file_path}")
-        
-        print(f"🔧 Chemins utilisés:")
-        print(f"   Script: {script_path}")
-        print(f"   Base dir: {BASE_DIR}")
-        print(f"   Sortie transcripts: {RENDER_TRANSCRIPTS_DIR}")
-        print(f"   Log file: {log_file_path}")
-        
-        # Lancer le processus avec python3 (compatible Render)
-        TRANSCRIBE_PROCESS = subprocess.Popen(
-            ["python3", str(script_path)],
-            cwd=str(BASE_DIR),
-            stdout=open(log_file_path, 'w', encoding='utf-8'),
-            stderr=subprocess.STDOUT,  # Rediriger stderr vers stdout
-            text=True,
-            bufsize=1,  # Ligne par ligne
-            universal_newlines=True
-        )
-        
-        logger.log_transcription("", "LANCÉ", f"PID: {TRANSCRIBE_PROCESS.pid}, Log: {log_file_path}")
-        print(f"Processus de transcription lancé avec PID: {TRANSCRIBE_PROCESS.pid}")
-        print(f"Sortie redirigée vers: {log_file_path}")
-        
-        return TRANSCRIBE_PROCESS
-        
-    except Exception as e:
-        logger.log_error(f"Erreur lors du lancement de la transcription: {str(e)}")
-        raise e
+        videos_data = json.loads(content)
+        if isinstance(videos_data, list):
+            return videos_data
+    except (json.JSONDecodeError, ValueError):
+        pass
+    return [{"url": line.strip()} for line in content.splitlines() if line.strip()]
 
 # Décorateur pour l'authentification admin
 def admin_required(f):
     @wraps(f)
     def wrapper(*args, **kwargs):
-        key = request.headers.get("X-Admin-Key")
-        if key != ADMIN_KEY:
+        if not is_admin():
             return jsonify({"error": "forbidden"}), 403
         return f(*args, **kwargs)
     return wrapper
 
-@app.route("/api/health", methods=["GET"])
+@api.route("/api/health", methods=["GET"])
 def health():
     """Healthcheck endpoint"""
     logger.log_info("Healthcheck appelé")
     return jsonify({"status": "ok"})
 
-@app.route("/api/test-transcription", methods=["POST"])
+@api.route("/api/test-transcription", methods=["POST"])
 def test_transcription():
     """Test de transcription pour diagnostiquer les problèmes"""
     try:
@@ -271,7 +350,7 @@ def test_transcription():
     except Exception as e:
         return jsonify({"error": f"Erreur lors du test: {str(e)}"}), 500
 
-@app.route("/api/debug", methods=["GET"])
+@api.route("/api/debug", methods=["GET"])
 def debug():
     """Debug endpoint pour vérifier les fichiers"""
     files_status = {
@@ -281,7 +360,7 @@ def debug():
         "channels_file": CHANNELS_FILE.exists(),
         "urls_file": URLS_FILE.exists(),
         "transcripts_dir": TRANSCRIPTS_DIR.exists(),
-        "transcripts_count": len(list(TRANSCRIPTS_DIR.glob("*.txt"))) if TRANSCRIPTS_DIR.exists() else 0,
+        "transcripts_count": count_transcripts(all_jobs=True),
         "dependencies": {
             "playwright": False,
             "rich": False,
@@ -317,7 +396,15 @@ def debug():
     
     return jsonify(files_status)
 
-@app.route("/api/auth/register", methods=["POST"])
+def _model_dict(obj):
+    """Objets du client Supabase (modèles pydantic) -> dict sérialisable"""
+    if obj is None:
+        return None
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(mode="json")
+    return obj
+
+@api.route("/api/auth/register", methods=["POST"])
 def register_supabase():
     """Inscription d'un utilisateur avec Supabase Auth"""
     data = request.get_json()
@@ -328,15 +415,17 @@ def register_supabase():
         return jsonify({"error": "Email et mot de passe requis"}), 400
 
     try:
-        response = supabase.auth.sign_up({"email": email, "password": password})
+        response = get_supabase().auth.sign_up({"email": email, "password": password})
+        session = getattr(response, "session", None)
         return jsonify({
             "message": "Inscription réussie",
-            "user": getattr(response, "user", None)
+            "user": _model_dict(getattr(response, "user", None)),
+            "token": getattr(session, "access_token", None)
         }), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route("/api/auth/login", methods=["POST"])
+@api.route("/api/auth/login", methods=["POST"])
 def login_supabase():
     """Connexion d'un utilisateur via Supabase Auth"""
     data = request.get_json()
@@ -347,28 +436,56 @@ def login_supabase():
         return jsonify({"error": "Email et mot de passe requis"}), 400
 
     try:
-        response = supabase.auth.sign_in_with_password({"email": email, "password": password})
+        response = get_supabase().auth.sign_in_with_password({"email": email, "password": password})
+        session = getattr(response, "session", None)
         return jsonify({
             "message": "Connexion réussie",
-            "session": getattr(response, "session", None),
-            "user": getattr(response, "user", None)
+            "session": _model_dict(session),
+            "user": _model_dict(getattr(response, "user", None)),
+            # Jeton d'accès à renvoyer en Authorization: Bearer (vérifié localement, cf. auth.py)
+            "token": getattr(session, "access_token", None)
         }), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 401
 
-@app.route("/api/auth/me", methods=["GET"])
-def get_me():
-    """Récupère l'utilisateur actuellement connecté"""
+@api.route("/api/auth/refresh", methods=["POST"])
+def refresh_supabase():
+    """
+    Nouveau jeton d'accès à partir du refresh_token de la session Supabase
+    (appelé par le frontend avant l'expiration du jeton, ou après un 401).
+    """
+    data = request.get_json(silent=True) or {}
+    refresh_token = data.get("refresh_token")
+    if not isinstance(refresh_token, str) or not refresh_token:
+        return jsonify({"error": "refresh_token requis"}), 400
+
     try:
-        user = supabase.auth.get_user()
-        return jsonify(user), 200
+        response = get_supabase().auth.refresh_session(refresh_token)
+        session = getattr(response, "session", None)
+        if session is None:
+            return jsonify({"error": "Session expirée, reconnectez-vous"}), 401
+        return jsonify({
+            "session": _model_dict(session),
+            "token": session.access_token,
+            "refresh_token": session.refresh_token,
+            "expires_at": session.expires_at
+        }), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 401
 
-@app.route("/api/scrape/channel", methods=["POST"])
+@api.route("/api/auth/me", methods=["GET"])
+@auth_required
+def get_me():
+    """Récupère l'utilisateur actuellement connecté (jeton vérifié localement, sans appel à Supabase)"""
+    return jsonify({
+        "user": {"id": g.user["id"], "email": g.user["email"], "role": g.user["role"]},
+        "expires_at": g.user["claims"].get("exp")
+    }), 200
+
+@api.route("/api/scrape/channel", methods=["POST"])
+@user_required
 def scrape_channel():
-    """Scrape une chaîne YouTube en utilisant le script existant"""
-    global SCRAPE_PROCESS
+    """Scrape une chaîne YouTube en utilisant le script existant (un job isolé par scraping)"""
     data = request.get_json()
     channel = data.get("channel")
     
@@ -379,59 +496,73 @@ def scrape_channel():
         return jsonify({"error": "Channel requis"}), 400
     
     try:
-        # Nettoyer les anciens fichiers avant de commencer
-        if URLS_FILE.exists():
-            URLS_FILE.unlink()
-            logger.log_file_operation("SUPPRESSION", str(URLS_FILE), "Nettoyage avant nouveau scraping")
-        
-        # Écrire la chaîne dans channels.txt
-        with open(CHANNELS_FILE, 'w', encoding='utf-8') as f:
-            f.write(channel)
-        
-        logger.log_file_operation("ÉCRITURE", str(CHANNELS_FILE), f"Contenu: {channel}")
-        
-        # Lancer le script de scraping en arrière-plan
-        script_path = BASE_DIR / "scrape_channel_videos.py"
-        logger.log_scraping(channel, 0, "DÉBUT")
-        print(f"Lancement du scraping pour: {channel}")
+        # La chaîne est écrite dans le channels.txt du job ; worker.py lance le scraping
+        job, error_response = _enqueue_job("scrape", current_email(data.get("email")), {"channel": channel},
+                                           {"channels.txt": channel})
+        if error_response:
+            return error_response
         
-        # Lancer en arrière-plan avec Popen
-        SCRAPE_PROCESS = subprocess.Popen(
-            ["python", str(script_path)],
-            cwd=str(BASE_DIR),
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-        
-        logger.log_scraping(channel, 0, "LANCÉ")
-        print(f"Processus de scraping lancé avec PID: {SCRAPE_PROCESS.pid}")
+        logger.log_scraping(channel, 0, "EN FILE")
+        print(f"Scraping mis en file pour: {channel} (job {job['job_id']})")
         
         return jsonify({
             "message": "Scraping démarré",
             "status": "started",
-            "process_id": SCRAPE_PROCESS.pid
+            **_job_response(job)
         }), 202
         
     except Exception as e:
         print(f"Exception lors du scraping: {str(e)}")
         return jsonify({"error": f"Erreur lors du scraping: {str(e)}"}), 500
 
-@app.route("/api/transcribe/selected", methods=["POST"])
+def _start_transcription(urls, owner, params, trial_used=False):
+    """
+    Met en file un job de transcription avec ses URLs ; retourne (réponse, code).
+    Si le job n'est pas créé (file pleine, erreur), l'essai consommé (`trial_used`) est rendu.
+    """
+    try:
+        job, error_response = _enqueue_job("transcribe", owner, params, {"urls.txt": '\n'.join(urls)})
+    except Exception:
+        if trial_used:
+            refund_trial(owner)
+        raise
+    if error_response:
+        if trial_used:
+            refund_trial(owner)
+            logger.log_info(f"Essai rendu à {owner} (job non créé)")
+        return error_response
+    logger.log_transcription("", "EN FILE", f"Job {job['job_id']}: {len(urls)} URL(s)")
+    print(f"Transcription de {len(urls)} vidéos mise en file (job {job['job_id']})")
+    
+    # Retour immédiat : la fin (même rapide) est signalée par /api/transcribe/status et l'événement job_finished
+    return jsonify({
+        "message": f"Transcription démarrée ! Le script va traiter {len(urls)} vidéo(s)",
+        "status": "started",
+        "log_file": str(_transcribe_log(job)),
+        "note": "Suivez la progression avec /api/transcribe/status?job_id=...",
+        **_job_response(job)
+    }), 202
+
+@api.route("/api/transcribe/selected", methods=["POST"])
+@user_required
 def transcribe_selected():
     """Transcrire seulement les vidéos sélectionnées"""
-    global TRANSCRIBE_PROCESS
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
     urls = data.get("urls", [])
-    user_email = data.get("email")  # Email de l'utilisateur connecté
+    user_email = current_email(data.get("email"))  # Utilisateur du jeton (email du corps : AUTH_REQUIRED=false)
     
     logger.log_api_call("/api/transcribe/selected", "POST", data)
     
     if not urls:
         logger.log_error("Aucune URL fournie pour la transcription")
         return jsonify({"error": "Aucune URL fournie"}), 400
+    # Validé avant de consommer un essai : une chaîne serait parcourue caractère par caractère
+    if not isinstance(urls, list) or not all(isinstance(url, str) and url.strip() for url in urls):
+        logger.log_error("Liste d'URLs invalide pour la transcription")
+        return jsonify({"error": "urls doit être une liste d'URLs (chaînes non vides)"}), 400
     
     # Vérifier les limites d'utilisation si un email est fourni
+    trial_used = False
     if user_email:
         can_transcribe, message = check_transcription_limit(user_email)
         if not can_transcribe:
@@ -440,86 +571,41 @@ def transcribe_selected():
                 "error": f"Limite d'utilisation atteinte: {message}",
                 "trial_limit_reached": True
             }), 403
+        trial_used = message != "Compte premium"
     
     try:
-        # Écrire les URLs sélectionnées dans urls.txt
-        with open(URLS_FILE, 'w', encoding='utf-8', newline='\n') as f:
-            f.write('\n'.join(urls))
-        
-        logger.log_file_operation("ÉCRITURE", str(URLS_FILE), f"URLs sélectionnées: {len(urls)}")
         print(f"Transcription de {len(urls)} vidéos sélectionnées")
-        
-        # Lancer le script de transcription ORIGINAL avec Playwright
-        script_path = BASE_DIR / "bot_yttotranscript.py"
-        
-        logger.log_transcription("", "DÉBUT", f"Script: {script_path}")
-        print(f"Lancement de la transcription pour {len(urls)} vidéos...")
-        print(f"Script utilisé: {script_path}")
-        print(f"URLs à transcrire: {urls}")
-        
-        # Vérifier que urls.txt contient bien les URLs
-        if URLS_FILE.exists():
-            with open(URLS_FILE, 'r', encoding='utf-8') as f:
-                content = f.read()
-                print(f"Contenu de urls.txt: {content[:200]}...")
-        
-        try:
-            # Utiliser la nouvelle fonction compatible Windows/Linux
-            TRANSCRIBE_PROCESS = _spawn_transcriber(script_path)
-            
-            print("Le script de transcription va traiter les vidéos...")
-            
-            # Attendre que le processus se termine (pour Render)
-            import time
-            time.sleep(2)  # Attendre un peu pour que le script démarre
-            
-            # Vérifier le statut du processus
-            poll_result = TRANSCRIBE_PROCESS.poll()
-            if poll_result is not None:
-                # Le processus s'est terminé, vérifier les fichiers générés
-                files_generated = 0
-                if RENDER_TRANSCRIPTS_DIR.exists():
-                    transcript_files = list(RENDER_TRANSCRIPTS_DIR.glob("*.txt"))
-                    files_generated = len(transcript_files)
-                
-                logger.log_transcription("", "TERMINÉ", f"Code: {poll_result}, Fichiers: {files_generated}")
-                
-                return jsonify({
-                    "message": f"✅ Transcription terminée ! {files_generated} fichier(s) généré(s)",
-                    "process_id": TRANSCRIBE_PROCESS.pid,
-                    "status": "completed",
-                    "files_generated": files_generated,
-                    "log_file": str(RENDER_LOG_FILE),
-                    "transcripts_dir": str(RENDER_TRANSCRIPTS_DIR)
-                }), 200
-            else:
-                # Le processus est encore en cours
-                return jsonify({
-                    "message": f"Transcription démarrée ! Le script va traiter {len(urls)} vidéo(s)",
-                    "process_id": TRANSCRIBE_PROCESS.pid,
-                    "status": "started",
-                    "log_file": str(RENDER_LOG_FILE),
-                    "note": "Vérifiez les logs pour suivre la progression"
-                }), 202
-                
-        except Exception as e:
-            print(f"Erreur lors du lancement: {e}")
-            return jsonify({
-                "error": f"Erreur lors du lancement de la transcription: {str(e)}"
-            }), 500
-        
+        return _start_transcription(urls, user_email, {"source": "selected", "count": len(urls)}, trial_used)
+    except FileNotFoundError as e:
+        print(f"Erreur fichier non trouvé: {e}")
+        return jsonify({"error": f"Script de transcription non trouvé: {e}"}), 500
     except Exception as e:
         print(f"Exception lors de la transcription: {str(e)}")
         return jsonify({"error": f"Erreur lors de la transcription: {str(e)}"}), 500
 
-@app.route("/api/transcribe/bulk", methods=["POST"])
+@api.route("/api/transcribe/bulk", methods=["POST"])
+@user_required
 def transcribe_bulk():
-    """Lance la transcription en bulk avec le script existant"""
-    global TRANSCRIBE_PROCESS
+    """Transcrit toutes les vidéos d'un job de scraping (scrape_job_id, par défaut le dernier)"""
     data = request.get_json() or {}
-    user_email = data.get("email")  # Email de l'utilisateur connecté
+    user_email = current_email(data.get("email"))  # Utilisateur du jeton (email du corps : AUTH_REQUIRED=false)
+    
+    scrape_job, error_response = _load_job("scrape", data.get("scrape_job_id"))
+    if error_response:
+        return error_response
+    feed_file, urls_file = _scrape_files(scrape_job)
+    if feed_file.exists():
+        feed = _feed_state(feed_file)
+        feed.refresh()
+        videos = feed.snapshot()
+    else:
+        videos = _read_scraped_videos(urls_file) or []
+    urls = [video.get("url") for video in videos if video.get("url")]
+    if not urls:
+        return jsonify({"error": "Aucune vidéo scrapée à transcrire"}), 400
     
     # Vérifier les limites d'utilisation si un email est fourni
+    trial_used = False
     if user_email:
         can_transcribe, message = check_transcription_limit(user_email)
         if not can_transcribe:
@@ -528,62 +614,18 @@ def transcribe_bulk():
                 "error": f"Limite d'utilisation atteinte: {message}",
                 "trial_limit_reached": True
             }), 403
+        trial_used = message != "Compte premium"
     
     try:
-        # Utiliser directement le script Python (compatible Windows/Linux)
-        script_path = BASE_DIR / "bot_yttotranscript.py"
-        print(f"Lancement de la transcription: {script_path}")
-        
-        # Vérifier que le script existe
-        if not script_path.exists():
-            return jsonify({"error": "Script de transcription non trouvé"}), 500
-        
-        # Utiliser la nouvelle fonction compatible Windows/Linux
-        try:
-            TRANSCRIBE_PROCESS = _spawn_transcriber(script_path)
-            
-            print(f"Processus de transcription lancé avec PID: {TRANSCRIBE_PROCESS.pid}")
-            
-            # Attendre que le processus se termine (pour Render)
-            import time
-            time.sleep(2)  # Attendre un peu pour que le script démarre
-            
-            # Vérifier le statut du processus
-            poll_result = TRANSCRIBE_PROCESS.poll()
-            if poll_result is not None:
-                # Le processus s'est terminé, vérifier les fichiers générés
-                files_generated = 0
-                if RENDER_TRANSCRIPTS_DIR.exists():
-                    transcript_files = list(RENDER_TRANSCRIPTS_DIR.glob("*.txt"))
-                    files_generated = len(transcript_files)
-                
-                logger.log_transcription("", "TERMINÉ", f"Code: {poll_result}, Fichiers: {files_generated}")
-                
-                return jsonify({
-                    "message": f"✅ Transcription terminée ! {files_generated} fichier(s) généré(s)",
-                    "process_id": TRANSCRIBE_PROCESS.pid,
-                    "status": "completed",
-                    "files_generated": files_generated,
-                    "log_file": str(RENDER_LOG_FILE),
-                    "transcripts_dir": str(RENDER_TRANSCRIPTS_DIR)
-                }), 200
-            else:
-                # Le processus est encore en cours
-                return jsonify({
-                    "message": "Transcription démarrée ! Le script va traiter les vidéos en arrière-plan",
-                    "process_id": TRANSCRIBE_PROCESS.pid,
-                    "status": "started",
-                    "log_file": str(RENDER_LOG_FILE),
-                    "note": "Vérifiez les logs pour suivre la progression"
-                }), 202
-                
-        except FileNotFoundError as e:
-            print(f"Erreur fichier non trouvé: {e}")
-            return jsonify({"error": f"Script de transcription non trouvé: {e}"}), 500
-        except Exception as e:
-            print(f"Erreur lors du lancement: {e}")
-            return jsonify({"error": f"Erreur lors du lancement de la transcription: {str(e)}"}), 500
-        
+        params = {
+            "source": "bulk",
+            "scrape_job_id": scrape_job["job_id"],
+            "count": len(urls)
+        }
+        return _start_transcription(urls, user_email, params, trial_used)
+    except FileNotFoundError as e:
+        print(f"Erreur fichier non trouvé: {e}")
+        return jsonify({"error": f"Script de transcription non trouvé: {e}"}), 500
     except Exception as e:
         print(f"Exception lors de la transcription: {str(e)}")
         return jsonify({"error": f"Erreur lors de la transcription: {str(e)}"}), 500
@@ -594,77 +636,154 @@ def get_video_info_from_url(url):
     video_id_match = re.search(r'(?:v=|\/)([0-9A-Za-z_-]{11}).*', url)
     return video_id_match.group(1) if video_id_match else None
 
-def get_video_title(video_id):
-    """Récupère le titre d'une vidéo YouTube via l'API publique"""
+def _title_wait():
+    """?wait=<secondes> : attendre la résolution des titres manquants (par défaut réponse immédiate)"""
     try:
-        import requests
-        import re
-        
-        # Utiliser l'API publique de YouTube (sans clé API)
-        url = f"https://www.youtube.com/watch?v={video_id}"
-        response = requests.get(url, timeout=5)
-        
-        if response.status_code == 200:
-            # Extraire le titre depuis la page HTML
-            title_match = re.search(r'<title>([^<]+)</title>', response.text)
-            if title_match:
-                title = title_match.group(1)
-                # Nettoyer le titre (enlever " - YouTube")
-                title = title.replace(' - YouTube', '').strip()
-                return title
-    except Exception as e:
-        print(f"Erreur lors de la récupération du titre pour {video_id}: {e}")
-    
-    return None
+        return max(0.0, min(float(request.args.get("wait", 0)), TITLE_MAX_WAIT))
+    except ValueError:
+        return 0.0
 
-@app.route("/api/scraped-urls", methods=["GET"])
+def _with_cached_titles(videos, job_id=None):
+    """
+    Complète les titres absents depuis le cache (LRU + base) sans bloquer la requête :
+    les manquants sont résolus en arrière-plan (événements title_resolved) et marqués
+    title_resolved=False avec un titre temporaire. Retourne (vidéos, nombre en attente).
+    """
+    def untitled(video):
+        # Titre temporaire : title_resolved=False (vidéo venant du flux), ou titre absent
+        return not video.get("title") or video.get("title_resolved") is False
+
+    missing = [video["video_id"] for video in videos if untitled(video) and video.get("video_id")]
+    titles = resolve_titles(missing, wait=_title_wait(), job_id=job_id) if missing else {}
+    completed = []
+    pending = 0
+    for i, video in enumerate(videos):
+        if untitled(video):
+            title = titles.get(video.get("video_id"))
+            if title:
+                video = {**video, "title": title, "title_resolved": True}
+            else:
+                video = {**video, "title": video.get("title") or f"Vidéo {i + 1}", "title_resolved": False}
+                # Titre introuvable déjà connu (None) : pas la peine de faire attendre le client
+                pending += 1 if video.get("video_id") and video.get("video_id") not in titles else 0
+        completed.append(video)
+    return completed, pending
+
+@api.route("/api/scraped-urls", methods=["GET"])
+@user_required
 def get_scraped_urls():
-    """Récupère les URLs scrapées depuis urls.txt avec infos vidéo"""
+    """Récupère les URLs scrapées d'un job de l'utilisateur (urls.txt) avec infos vidéo"""
     try:
-        urls = []
-        if URLS_FILE.exists():
-            with open(URLS_FILE, 'r', encoding='utf-8') as f:
-                urls = [line.strip() for line in f.readlines() if line.strip()]
+        job, error_response = _load_job("scrape", _request_job_id())
+        if error_response:
+            return error_response
+        _, urls_file = _scrape_files(job)
+        videos = [
+            {**video, "video_id": video.get("video_id") or get_video_info_from_url(video.get("url", ""))}
+            for video in _read_scraped_videos(urls_file) or []
+        ]
+        # Titres manquants : cache immédiat, résolution réseau en arrière-plan
+        videos, pending = _with_cached_titles(videos, job["job_id"])
         
         # Enrichir avec les infos vidéo
         videos_with_info = []
-        for i, url in enumerate(urls):
-            video_id = get_video_info_from_url(url)
-            title = get_video_title(video_id) if video_id else f"Vidéo {i + 1}"
+        for video in videos:
+            video_id = video["video_id"]
             videos_with_info.append({
-                "url": url,
+                "url": video.get("url", ""),
                 "video_id": video_id,
-                "title": title,
+                "title": video["title"],
+                "title_resolved": video.get("title_resolved", True),
                 "thumbnail": f"https://img.youtube.com/vi/{video_id}/mqdefault.jpg" if video_id else None
             })
         
-        return jsonify({"videos": videos_with_info, "count": len(videos_with_info)}), 200
+        return jsonify({
+            "videos": videos_with_info,
+            "count": len(videos_with_info),
+            "pending": pending,
+            "job_id": job["job_id"]
+        }), 200
     except Exception as e:
         return jsonify({"error": f"Erreur lors de la lecture des URLs: {str(e)}"}), 500
 
-@app.route("/api/transcripts", methods=["GET"])
+@api.route("/api/transcripts", methods=["GET"])
+@user_required
 def list_transcripts():
-    """Liste tous les fichiers de transcription disponibles"""
+    """
+    Liste les transcriptions d'un job de l'utilisateur (par défaut son dernier) depuis le catalogue en base.
+    Pagination par curseur : ?limit=N&cursor=<next_cursor de la page précédente>
+    """
     try:
-        files = []
-        if TRANSCRIPTS_DIR.exists():
-            for file_path in TRANSCRIPTS_DIR.glob("*.txt"):
-                stat = file_path.stat()
-                files.append({
-                    "name": file_path.name,
-                    "path": str(file_path.relative_to(BASE_DIR)),
-                    "size": stat.st_size,
-                    "modified": stat.st_mtime
-                })
+        job, error_response = _load_job("transcribe", _request_job_id())
+        if error_response:
+            return error_response
+        job_id = job["job_id"]
+        try:
+            limit = int(request.args.get("limit", TRANSCRIPTS_PAGE_SIZE))
+            after = int(request.args["cursor"]) if request.args.get("cursor") else None
+        except ValueError:
+            return jsonify({"error": "limit et cursor doivent être des entiers"}), 400
         
-        return jsonify({"files": files}), 200
+        files, next_cursor = list_catalog(job_id, after=after, limit=limit)
+        return jsonify({
+            "files": files,
+            "count": count_transcripts(job_id),
+            "next_cursor": next_cursor,
+            "job_id": job_id
+        }), 200
         
     except Exception as e:
         return jsonify({"error": f"Erreur lors de la lecture des fichiers: {str(e)}"}), 500
 
-@app.route("/api/transcripts/content", methods=["GET"])
+@api.route("/api/transcripts/search", methods=["GET"])
+@user_required
+def search_transcripts_endpoint():
+    """
+    Recherche plein texte dans les transcriptions indexées (FTS5 / tsvector), sans lire de fichier.
+    ?q=<termes>&job_id=<optionnel>&limit=20 -> résultats classés avec extrait et offset
+    (octets UTF-8 : à passer tel quel à /api/transcripts/content?offset=)
+    Limitée aux jobs de l'appelant (toutes les transcriptions pour un appel d'administration).
+    """
+    query = (request.args.get("q") or "").strip()
+    if not query:
+        return jsonify({"error": "Paramètre q requis"}), 400
+    
+    try:
+        limit = int(request.args.get("limit", 20))
+    except ValueError:
+        return jsonify({"error": "limit doit être un entier"}), 400
+    
+    owner = None if is_admin() else _caller_email()
+    if not is_admin() and not owner:
+        return jsonify({"error": "Authentification requise"}), 401
+    job_id = request.args.get("job_id")
+    if job_id:
+        job = get_job(job_id)
+        if job is None or not _owns(job):
+            return jsonify({"error": "Job non trouvé"}), 404
+    
+    try:
+        started = time.perf_counter()
+        results = search_transcripts(query, job_id=job_id, limit=limit, owner=owner)
+        return jsonify({
+            "query": query,
+            "results": results,
+            "count": len(results),
+            "took_ms": round((time.perf_counter() - started) * 1000, 2)
+        }), 200
+    except Exception as e:
+        return jsonify({"error": f"Erreur lors de la recherche: {str(e)}"}), 500
+
+@api.route("/api/transcripts/content", methods=["GET"])
+@user_required
 def get_transcript_content():
-    """Récupère le contenu d'un fichier de transcription"""
+    """
+    Récupère le contenu d'un fichier de transcription.
+    - JSON paginé : ?offset=<octet>&length=<octets> -> {content, offset, next_offset, size, eof, header}
+      (sans offset/length : contenu complet, comme avant) ; `header` = titre/URL/date de l'exécution
+      de ce job (fichier annexe, cf. transcript_store.header_path ; le contenu ne porte que le texte)
+    - texte brut : ?raw=1, servi par send_file (sendfile, en-têtes Range, ETag/Last-Modified)
+    """
     path = request.args.get("path")
     
     if not path:
@@ -676,119 +795,182 @@ def get_transcript_content():
         if ".." in str(safe_path) or not str(safe_path).startswith("transcripts"):
             return jsonify({"error": "Chemin non autorisé"}), 400
         
-        file_path = BASE_DIR / safe_path
+        job, error_response = _load_job("transcribe", _request_job_id())
+        if error_response:
+            return error_response
+        # Les noms listés sont en .txt, le fichier stocké peut être compressé (.txt.gz)
+        file_path = resolve_transcript_path(_transcripts_base(job) / safe_path)
         
         if not file_path.exists() or not file_path.is_file():
             return jsonify({"error": "Fichier non trouvé"}), 404
         
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        # Les fichiers de transcription ne sont jamais modifiés en place (réécriture = nouveau lien) :
+        # inode + mtime + taille identifient une version
+        stat = file_path.stat()
+        etag = f"{stat.st_ino:x}-{stat.st_mtime_ns:x}-{stat.st_size:x}"
+        compressed = file_path.name.endswith(GZIP_SUFFIX)
+        
+        if request.args.get("raw"):
+            if not compressed:
+                response = send_file(file_path, mimetype="text/plain", conditional=True,
+                                     etag=etag, last_modified=stat.st_mtime, max_age=0)
+            elif request.accept_encodings.quality("gzip") > 0 and not request.range:
+                # Octets gzip servis tels quels (pas de décompression), via sendfile
+                response = send_file(file_path, mimetype="text/plain", conditional=True,
+                                     etag=f"{etag}-gz", last_modified=stat.st_mtime, max_age=0)
+                response.headers["Content-Encoding"] = "gzip"
+            else:
+                # Range sur un .gz ou client sans gzip : les plages portent sur le texte décompressé,
+                # lu en flux depuis le point d'accès deflate le plus proche (jamais tout le texte en mémoire)
+                response = Response(FileWrapper(open_transcript(file_path), READ_CHUNK_SIZE),
+                                    mimetype="text/plain", direct_passthrough=True)
+                size = transcript_size(file_path)
+                response.content_length = size
+                response.set_etag(etag)
+                response.last_modified = stat.st_mtime
+                response.cache_control.no_cache = True
+                try:
+                    response.make_conditional(request, accept_ranges=True, complete_length=size)
+                except RequestedRangeNotSatisfiable:
+                    response.close()
+                    raise
+            response.headers["Vary"] = "Accept-Encoding"
+            return response
         
-        return jsonify({"content": content}), 200
+        if "offset" not in request.args and "length" not in request.args:
+            response = jsonify({"content": read_transcript(file_path), "header": transcript_header(file_path)})
+        else:
+            try:
+                offset = max(0, int(request.args.get("offset", 0)))
+                length = max(1, min(int(request.args.get("length", CONTENT_PAGE_SIZE)), CONTENT_PAGE_MAX))
+            except ValueError:
+                return jsonify({"error": "Paramètres offset/length invalides"}), 400
+            content, next_offset = read_transcript_page(file_path, offset, length)
+            response = jsonify({
+                "content": content,
+                "offset": offset,
+                "next_offset": next_offset,
+                "size": transcript_size(file_path),
+                "eof": next_offset is None,
+                "header": transcript_header(file_path)
+            })
+        response.set_etag(etag)
+        response.last_modified = stat.st_mtime
+        response.cache_control.no_cache = True  # revalidation systématique (304 si inchangé)
+        return response.make_conditional(request)
         
+    except RequestedRangeNotSatisfiable as e:
+        return e.get_response()
     except Exception as e:
         return jsonify({"error": f"Erreur lors de la lecture du fichier: {str(e)}"}), 500
 
-@app.route("/api/transcripts/download", methods=["GET"])
+@api.route("/api/transcripts/download", methods=["GET", "POST"])
+@user_required
 def download_all_transcripts():
-    """Télécharge tous les fichiers de transcription dans un ZIP"""
+    """
+    Télécharge les transcriptions d'un job dans un ZIP généré en streaming (aucun fichier temporaire).
+    Sélection optionnelle : ?files=a.txt,b.txt (ou "files": [...] en JSON), ?level=0-9 pour la compression.
+    """
     try:
-        import zipfile
-        import tempfile
+        body = request.get_json(silent=True) or {}
+        job, error_response = _load_job("transcribe", _request_job_id())
+        if error_response:
+            return error_response
+        transcripts_dir = _transcripts_base(job) / "transcripts"
         
-        # Créer un fichier ZIP temporaire
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.zip') as temp_zip:
-            zip_path = temp_zip.name
+        selection = body.get("files") or [
+            name for value in request.args.getlist("files") for name in value.split(",")
+        ]
+        # Noms de fichiers uniquement : pas de sortie du dossier du job
+        selected = {Path(name).name for name in selection if name and name.strip()}
+        # Les .txt.gz sont intégrés au ZIP sans recompression (flux deflate réutilisé)
+        files = [(name, file_path) for name, file_path in _transcript_files(transcripts_dir)
+                 if not selected or name in selected]
         
-        # Créer le ZIP avec tous les fichiers de transcription
-        with zipfile.ZipFile(zip_path, 'w') as zipf:
-            if TRANSCRIPTS_DIR.exists():
-                for file_path in TRANSCRIPTS_DIR.glob("*.txt"):
-                    zipf.write(file_path, file_path.name)
+        try:
+            level = int(body.get("level", request.args.get("level", ZIP_COMPRESSLEVEL)))
+        except (TypeError, ValueError):
+            return jsonify({"error": "level doit être un entier entre 0 et 9"}), 400
         
-        # Retourner le fichier ZIP
-        return send_from_directory(
-            os.path.dirname(zip_path),
-            os.path.basename(zip_path),
-            as_attachment=True,
-            download_name="transcriptions.zip"
+        return Response(
+            stream_with_context(stream_zip(files, compresslevel=level)),
+            mimetype="application/zip",
+            headers={
+                "Content-Disposition": 'attachment; filename="transcriptions.zip"',
+                "Cache-Control": "no-store",
+                "X-Accel-Buffering": "no"  # pas de mise en tampon par un proxy nginx
+            }
         )
         
     except Exception as e:
         return jsonify({"error": f"Erreur lors de la création du ZIP: {str(e)}"}), 500
 
-@app.route("/api/logs", methods=["GET"])
+@api.route("/api/logs", methods=["GET"])
+@user_required
 def get_logs():
-    """Récupère les logs de la session actuelle"""
+    """
+    Récupère les derniers logs (enregistrements JSON de logger.py, lus depuis la fin du fichier).
+    ?n=500 lignes ; ?job_id=... ne garde que les messages de ce job ; ?level=ERROR filtre le niveau.
+    Hors administration, seuls les messages des jobs de l'utilisateur sont renvoyés.
+    """
     try:
-        log_file = BASE_DIR / "session_log.txt"
-        if log_file.exists():
-            with open(log_file, 'r', encoding='utf-8') as f:
-                logs = f.read()
-            return jsonify({"logs": logs}), 200
-        else:
-            return jsonify({"logs": "Aucun log disponible"}), 200
+        n = max(1, min(int(request.args.get("n", 500)), LOG_TAIL_MAX_LINES))
+        job_id = request.args.get("job_id")
+        level = request.args.get("level")
+        visible_jobs = None
+        if not is_admin():
+            owner = _caller_email()
+            visible_jobs = {job["job_id"] for job in list_jobs(owner, limit=200)} if owner else set()
+        logger.flush()
+        if not LOG_FILE.exists():
+            return jsonify({"logs": "Aucun log disponible", "records": []}), 200
+        
+        lines, _ = tail_lines(LOG_FILE, n)
+        records = []
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if job_id and record.get("job_id") != job_id:
+                continue
+            if visible_jobs is not None and record.get("job_id") not in visible_jobs:
+                continue
+            if level and record.get("level") != level.upper():
+                continue
+            records.append(record)
+        text = "\n".join(
+            f"[{(record.get('time') or '')[11:]}] [{record.get('level')}] {record.get('message')}" for record in records
+        )
+        return jsonify({"logs": text or "Aucun log disponible", "records": records}), 200
+    except ValueError:
+        return jsonify({"error": "Paramètre n invalide"}), 400
     except Exception as e:
         return jsonify({"error": f"Erreur lors de la lecture des logs: {str(e)}"}), 500
 
-@app.route("/api/scrape/status", methods=["GET"])
+@api.route("/api/scrape/status", methods=["GET"])
+@user_required
 def get_scrape_status():
-    """Vérifie le statut du scraping en cours"""
-    global SCRAPE_PROCESS
+    """Vérifie le statut d'un job de scraping de l'utilisateur (par défaut son dernier)"""
     try:
-        running = False
-        if SCRAPE_PROCESS is not None:
-            # Vérifier si le processus est encore en cours
-            poll_result = SCRAPE_PROCESS.poll()
-            if poll_result is None:
-                running = True
-            else:
-                # Processus terminé, nettoyer
-                print(f"DEBUG: Processus scraping terminé avec code: {poll_result}")
-                SCRAPE_PROCESS = None
-        
-        # Vérifier le signal de fin d'enrichissement
-        completion_file = BASE_DIR / "scraping_completed.txt"
-        if completion_file.exists():
-            try:
-                with open(completion_file, 'r', encoding='utf-8') as f:
-                    content = f.read().strip()
-                if content.startswith("completed:"):
-                    # Enrichissement terminé, nettoyer le signal
-                    completion_file.unlink()
-                    print("DEBUG: Signal de fin d'enrichissement détecté, processus terminé")
-                    running = False
-                    if SCRAPE_PROCESS is not None:
-                        try:
-                            SCRAPE_PROCESS.terminate()
-                            print("DEBUG: Processus de scraping terminé")
-                        except:
-                            pass
-                        SCRAPE_PROCESS = None
-            except Exception as e:
-                print(f"DEBUG: Erreur lecture signal de fin: {e}")
+        job, error_response = _load_job("scrape", _request_job_id())
+        if error_response:
+            return error_response
+        running = job["state"] in ACTIVE_STATES
         
-        # Compter les URLs dans urls.txt
+        # Compter les vidéos : flux incrémental en priorité, sinon urls.txt
+        feed_file, urls_file = _scrape_files(job)
         url_count = 0
         last_modified = None
-        if URLS_FILE.exists():
+        if feed_file.exists():
+            feed = _feed_state(feed_file)
+            feed.refresh()
+            url_count = feed.count()
+            last_modified = feed_file.stat().st_mtime
+        elif urls_file.exists():
             try:
-                with open(URLS_FILE, 'r', encoding='utf-8') as f:
-                    content = f.read().strip()
-                    # Essayer de lire comme JSON
-                    try:
-                        videos_data = json.loads(content)
-                        if isinstance(videos_data, list):
-                            url_count = len(videos_data)
-                        else:
-                            # Ancien format
-                            urls = [line.strip() for line in content.splitlines() if line.strip()]
-                            url_count = len(urls)
-                    except (json.JSONDecodeError, ValueError):
-                        # Ancien format
-                        urls = [line.strip() for line in content.splitlines() if line.strip()]
-                        url_count = len(urls)
-                last_modified = URLS_FILE.stat().st_mtime
+                url_count = len(_read_scraped_videos(urls_file) or [])
+                last_modified = urls_file.stat().st_mtime
                 print(f"DEBUG: {url_count} vidéos trouvées dans urls.txt")
             except Exception as e:
                 print(f"DEBUG: Erreur lecture urls.txt: {e}")
@@ -797,226 +979,322 @@ def get_scrape_status():
         return jsonify({
             "running": running,
             "count": url_count,
-            "lastModified": last_modified
+            "lastModified": last_modified,
+            "job_id": job["job_id"],
+            "state": job["state"]
         }), 200
     except Exception as e:
         return jsonify({"error": f"Erreur lors de la vérification du statut: {str(e)}"}), 500
 
-@app.route("/api/scrape/urls", methods=["GET"])
+def _file_etag(path):
+    """ETag faible basé sur inode + taille + mtime (None si le fichier n'existe pas)"""
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return f"{st.st_ino:x}-{st.st_size:x}-{st.st_mtime_ns:x}"
+
+def _format_video(video):
+    """Format de sortie commun d'une vidéo scrapée"""
+    video_id = video.get("video_id", "")
+    return {
+        "url": video.get("url", ""),
+        "video_id": video_id,
+        "title": video.get("title", "Titre non disponible"),
+        "thumbnail": video.get("thumbnail", f"https://img.youtube.com/vi/{video_id}/mqdefault.jpg" if video_id else None)
+    }
+
+@api.route("/api/scrape/urls", methods=["GET"])
+@user_required
 def get_scrape_urls():
-    """Récupère les URLs scrapées en temps réel avec titres réels"""
+    """
+    Récupère les URLs scrapées en temps réel avec titres réels (job_id, par défaut le dernier scraping).
+    ?since=<cursor> ne renvoie que les vidéos nouvelles ou modifiées depuis ce curseur,
+    et If-None-Match renvoie 304 tant que le fichier source n'a pas bougé.
+    """
     try:
+        job, error_response = _load_job("scrape", _request_job_id())
+        if error_response:
+            return error_response
+        job_id = job["job_id"]
+        feed_file, urls_file = _scrape_files(job)
+        source = feed_file if feed_file.exists() else urls_file
+        etag = _file_etag(source)
+        if etag and etag in request.if_none_match:
+            return "", 304, {"ETag": f'"{etag}"'}
+
+        since = request.args.get("since")
         videos_with_info = []
-        if URLS_FILE.exists():
-            with open(URLS_FILE, 'r', encoding='utf-8') as f:
-                content = f.read().strip()
-                
-            # Essayer de lire comme JSON d'abord (nouveau format)
-            try:
-                videos_data = json.loads(content)
-                if isinstance(videos_data, list):
-                    # Nouveau format JSON avec titres réels
-                    videos_with_info = []
-                    for video in videos_data:
-                        videos_with_info.append({
-                            "url": video.get("url", ""),
-                            "video_id": video.get("video_id", ""),
-                            "title": video.get("title", "Titre non disponible"),
-                            "thumbnail": video.get("thumbnail", f"https://img.youtube.com/vi/{video.get('video_id', '')}/mqdefault.jpg" if video.get('video_id') else None)
-                        })
-                    print(f"DEBUG: Lecture JSON de {len(videos_with_info)} vidéos avec titres réels")
-                else:
-                    raise ValueError("Format JSON invalide")
-            except (json.JSONDecodeError, ValueError, KeyError):
-                # Fallback: ancien format (une URL par ligne)
-                print("DEBUG: Format ancien détecté, conversion en cours...")
-                urls = [line.strip() for line in content.splitlines() if line.strip()]
-                for i, url in enumerate(urls):
-                    video_id = get_video_info_from_url(url)
-                    videos_with_info.append({
-                        "url": url,
-                        "video_id": video_id,
-                        "title": f"Vidéo {i + 1}",
-                        "thumbnail": f"https://img.youtube.com/vi/{video_id}/mqdefault.jpg" if video_id else None
-                    })
-                print(f"DEBUG: Conversion de {len(videos_with_info)} URLs (format ancien)")
+        if source == feed_file:
+            # Flux JSON Lines : seul le delta depuis la dernière lecture est parsé
+            feed = _feed_state(feed_file)
+            feed.refresh()
+            if since:
+                changed, reset = feed.changes_since(since)
+            else:
+                changed, reset = feed.snapshot(), True
+            response = jsonify({
+                "urls": [_format_video(video) for video in changed],
+                "count": feed.count(),
+                "cursor": feed.cursor(),
+                "delta": bool(since),
+                "reset": reset,
+                "lastModified": feed_file.stat().st_mtime,
+                "job_id": job_id
+            })
+            if etag:
+                response.set_etag(etag)
+            return response, 200
+        elif urls_file.exists():
+            for i, video in enumerate(_read_scraped_videos(urls_file)):
+                if "video_id" not in video:
+                    # Ancien format (une URL par ligne)
+                    video = {**video, "video_id": get_video_info_from_url(video["url"]), "title": f"Vidéo {i + 1}"}
+                videos_with_info.append(_format_video(video))
+            print(f"DEBUG: Lecture de {len(videos_with_info)} vidéos depuis urls.txt")
         else:
             print("DEBUG: urls.txt n'existe pas")
         
         print(f"DEBUG: Retour de {len(videos_with_info)} vidéos")
         
-        return jsonify({
-            "urls": videos_with_info,
+        # urls.txt n'a pas de journal : le curseur est l'etag du fichier, delta vide s'il n'a pas changé
+        unchanged = bool(since) and since == etag
+        response = jsonify({
+            "urls": [] if unchanged else videos_with_info,
             "count": len(videos_with_info),
-            "lastModified": URLS_FILE.stat().st_mtime if URLS_FILE.exists() else None
-        }), 200
+            "cursor": etag,
+            "delta": bool(since),
+            "reset": not unchanged,
+            "lastModified": urls_file.stat().st_mtime if urls_file.exists() else None,
+            "job_id": job_id
+        })
+        if etag:
+            response.set_etag(etag)
+        return response, 200
     except Exception as e:
         print(f"DEBUG: Erreur dans get_scrape_urls: {e}")
         return jsonify({"error": f"Erreur lors de la lecture des URLs: {str(e)}"}), 500
 
-@app.route("/api/transcribe/status", methods=["GET"])
+@api.route("/api/transcribe/status", methods=["GET"])
+@user_required
 def get_transcribe_status():
-    """Vérifie le statut de la transcription en cours"""
-    global TRANSCRIBE_PROCESS
+    """Vérifie le statut d'un job de transcription de l'utilisateur (par défaut son dernier)"""
     try:
-        running = False
-        if TRANSCRIBE_PROCESS is not None:
-            # Vérifier si le processus est encore en cours
-            poll_result = TRANSCRIBE_PROCESS.poll()
-            if poll_result is None:
-                running = True
-            else:
-                # Processus terminé, nettoyer
-                print(f"DEBUG: Processus transcription terminé avec code: {poll_result}")
-                TRANSCRIBE_PROCESS = None
+        job, error_response = _load_job("transcribe", _request_job_id())
+        if error_response:
+            return error_response
+        running = job["state"] in ACTIVE_STATES
         
-        # Compter les fichiers de transcription
-        files_count = 0
-        files = []
-        if TRANSCRIPTS_DIR.exists():
-            transcript_files = list(TRANSCRIPTS_DIR.glob("*.txt"))
-            files_count = len(transcript_files)
-            files = [f.name for f in transcript_files]
-            print(f"DEBUG: {files_count} fichiers de transcription trouvés: {files}")
-        else:
-            print("DEBUG: Dossier transcripts n'existe pas")
+        # Compter les transcriptions du job (catalogue indexé, sans parcourir le dossier)
+        job_id = job["job_id"]
+        files_count = count_transcripts(job_id)
+        files = recent_transcript_names(job_id)
         
         return jsonify({
             "running": running,
             "filesCount": files_count,
-            "files": files
+            "files": files,
+            "job_id": job_id,
+            "state": job["state"],
+            "result": job["result"],
+            "error": job["error"]
         }), 200
     except Exception as e:
         print(f"DEBUG: Erreur dans get_transcribe_status: {e}")
         return jsonify({"error": f"Erreur lors de la vérification du statut: {str(e)}"}), 500
 
-@app.route("/api/transcribe/log", methods=["GET"])
+@api.route("/api/transcribe/log", methods=["GET"])
+@user_required
 def transcribe_log():
-    """Permet de lire les dernières lignes du log de transcription."""
+    """
+    Permet de lire les dernières lignes du log de transcription d'un job.
+    - ?n=200 : dernières lignes (lecture depuis la fin du fichier, coût indépendant de sa taille)
+    - ?since_offset=<offset> : uniquement les lignes ajoutées depuis le précédent appel (champ `offset`)
+    - ?follow=1 : flux Server-Sent Events des nouvelles lignes (reprise via Last-Event-ID)
+    """
     try:
-        n = int(request.args.get("n", 200))
+        n = max(0, min(int(request.args.get("n", 200)), LOG_TAIL_MAX_LINES))
+        since = request.args.get("since_offset")
+        since = int(since) if since not in (None, "") else None
+        if since is not None and since < 0:
+            raise ValueError("since_offset négatif")
         
-        # Utiliser le fichier de log Render si disponible, sinon le local
-        log_file = RENDER_LOG_FILE if RENDER_LOG_FILE.exists() else TRANSCRIBE_LOG
+        job, error_response = _load_job("transcribe", _request_job_id())
+        if error_response:
+            return error_response
+        log_file = _transcribe_log(job)
+        
+        if request.args.get("follow") == "1":
+            last_id = request.headers.get("Last-Event-ID")
+            offset = int(last_id) if last_id and last_id.isdigit() else since
+            return _event_stream(stream_log(log_file, offset))
         
         if not log_file.exists():
-            return jsonify({"log": "<aucun log>", "log_file": str(log_file)}), 200
+            return jsonify({"log": "<aucun log>", "log_file": str(log_file), "offset": 0}), 200
         
-        with open(log_file, "r", encoding="utf-8") as f:
-            lines = f.readlines()
+        size = log_file.stat().st_size
+        # Curseur trop ancien (trop de retard) ou invalide (log recréé) : on repart des n dernières lignes
+        reset = since is not None and (since > size or size - since > LOG_SINCE_MAX_BYTES)
+        if since is not None and not reset:
+            lines, offset = read_since(log_file, since)
+        else:
+            lines, offset = tail_lines(log_file, n)
         
         return jsonify({
-            "log": "".join(lines[-n:]),
+            "log": "".join(line + "\n" for line in lines),
             "log_file": str(log_file),
-            "total_lines": len(lines)
+            "lines": len(lines),
+            "offset": offset,
+            "size": size,
+            "reset": reset,
+            "job_id": job["job_id"]
         }), 200
+    except ValueError:
+        return jsonify({"error": "Paramètres n/since_offset invalides"}), 400
     except Exception as e:
         return jsonify({"error": f"Erreur lors de la lecture du log: {str(e)}"}), 500
 
-@app.route("/api/transcription/status", methods=["GET"])
+@api.route("/api/events", methods=["GET"])
+@user_required
+def events_stream():
+    """
+    Flux Server-Sent Events des workers : video_found, title_resolved, transcript_saved,
+    job_finished, et les lignes du log de transcription avec ?logs=1.
+    Reprise via l'en-tête Last-Event-ID (ou ?since=<id>, "<inode>:<offset>") ; ?job_id=... filtre sur un job.
+    Seuls les événements des jobs de l'appelant sont transmis (tous pour un appel d'administration).
+    EventSource n'envoyant pas d'en-têtes, le jeton peut être passé en ?access_token= (cf. auth.py).
+    """
+    inode, offset = parse_event_id(request.headers.get("Last-Event-ID") or request.args.get("since"))
+    job_id = request.args.get("job_id")
+    log_file = None
+    if job_id:
+        job = get_job(job_id)
+        if job is None or not _owns(job):
+            return jsonify({"error": "Job non trouvé"}), 404
+        if request.args.get("logs") == "1" and job["kind"] == "transcribe":
+            log_file = _transcribe_log(job)
+        accept = lambda record: record.get("job_id") == job_id
+    elif is_admin():
+        accept = None
+    else:
+        accept = _owned_events(_caller_email())
+
+    return _event_stream(stream_events(offset, log_file, accept, inode))
+
+@api.route("/api/transcription/status", methods=["GET"])
+@user_required
 def get_transcription_status():
     """Vérifie le statut de la transcription en cours (legacy)"""
     try:
-        completion_file = BASE_DIR / "transcription_completed.txt"
-        if completion_file.exists():
-            with open(completion_file, 'r', encoding='utf-8') as f:
-                content = f.read().strip()
-            
-            if content.startswith("completed:"):
-                parts = content.split(":")
-                success_count = int(parts[1]) if len(parts) > 1 else 0
-                total_count = int(parts[2]) if len(parts) > 2 else 0
-                
-                # Supprimer le fichier de signal
-                completion_file.unlink()
-                
-                return jsonify({
-                    "status": "completed",
-                    "success_count": success_count,
-                    "total_count": total_count
-                }), 200
-            else:
-                return jsonify({"status": "unknown"}), 200
-        else:
-            return jsonify({"status": "running"}), 200
+        job, error_response = _load_job("transcribe", _request_job_id())
+        if error_response:
+            return jsonify({"status": "unknown"}), 200
+        if job["state"] in ACTIVE_STATES:
+            return jsonify({"status": "running", "job_id": job["job_id"]}), 200
+        
+        signal = read_completion_signal(job)
+        if signal is None:
+            return jsonify({"status": job["state"], "job_id": job["job_id"], "error": job["error"]}), 200
+        return jsonify({
+            "status": "completed",
+            "success_count": signal["count"],
+            "total_count": signal.get("total", 0),
+            "job_id": job["job_id"]
+        }), 200
     except Exception as e:
         return jsonify({"error": f"Erreur lors de la vérification du statut: {str(e)}"}), 500
 
-@app.route("/api/transcripts/clean", methods=["POST"])
+@api.route("/api/jobs", methods=["GET"])
+@user_required
+def get_jobs():
+    """Liste les derniers jobs de l'utilisateur (?kind=, ?limit= ; ?owner= réservé à l'administration)"""
+    try:
+        limit = min(int(request.args.get("limit", 50)), 200)
+        if is_admin():
+            jobs = list_jobs(request.args.get("owner"), request.args.get("kind"), limit)
+        else:
+            owner = _caller_email()
+            jobs = list_jobs(owner, request.args.get("kind"), limit) if owner else []
+        return jsonify({"jobs": jobs, "count": len(jobs), "queued": count_jobs("queued")}), 200
+    except Exception as e:
+        return jsonify({"error": f"Erreur lors de la lecture des jobs: {str(e)}"}), 500
+
+@api.route("/api/jobs/<job_id>", methods=["GET"])
+@user_required
+def get_job_status(job_id):
+    """État d'un job de l'utilisateur (file d'attente, tentatives, résultat)"""
+    job = get_job(job_id)
+    if job is None or not _owns(job):
+        return jsonify({"error": "Job non trouvé"}), 404
+    return jsonify(job), 200
+
+@api.route("/api/transcripts/clean", methods=["POST"])
+@auth_required
 def clean_old_transcripts():
-    """Nettoie les anciens fichiers de transcription"""
+    """Nettoie les fichiers de transcription d'un job de l'utilisateur (job_id obligatoire)"""
+    job_id = _request_job_id()
+    if not job_id:
+        return jsonify({"error": "Paramètre job_id requis"}), 400
     try:
-        if TRANSCRIPTS_DIR.exists():
-            # Supprimer tous les fichiers .txt dans le dossier transcripts
-            for file_path in TRANSCRIPTS_DIR.glob("*.txt"):
+        job, error_response = _load_job("transcribe", job_id)
+        if error_response:
+            return error_response
+        transcripts_dir = _transcripts_base(job) / "transcripts"
+        if transcripts_dir.exists():
+            # Supprimer tous les fichiers de transcription du job (le magasin partagé est conservé)
+            for _, file_path in _transcript_files(transcripts_dir):
                 file_path.unlink()
+                header_path(file_path).unlink(missing_ok=True)
                 logger.log_file_operation("SUPPRESSION", str(file_path), "Nettoyage anciens transcripts")
+        delete_transcripts(job["job_id"])
         
         return jsonify({"message": "Anciens fichiers de transcription supprimés"}), 200
     except Exception as e:
         return jsonify({"error": f"Erreur lors du nettoyage: {str(e)}"}), 500
 
-@app.route("/api/scrape/urls/enriched", methods=["GET"])
+@api.route("/api/scrape/urls/enriched", methods=["GET"])
+@user_required
 def get_scrape_urls_enriched():
     """Récupère les URLs avec titres enrichis (maintenant identique à /urls)"""
     try:
         # Maintenant que les titres sont directement dans le JSON, 
         # cet endpoint retourne la même chose que /urls
-        videos_with_info = []
-        if URLS_FILE.exists():
-            with open(URLS_FILE, 'r', encoding='utf-8') as f:
-                content = f.read().strip()
-                
-            # Essayer de lire comme JSON d'abord (nouveau format)
-            try:
-                videos_data = json.loads(content)
-                if isinstance(videos_data, list):
-                    # Nouveau format JSON avec titres réels
-                    videos_with_info = []
-                    for video in videos_data:
-                        videos_with_info.append({
-                            "url": video.get("url", ""),
-                            "video_id": video.get("video_id", ""),
-                            "title": video.get("title", "Titre non disponible"),
-                            "thumbnail": video.get("thumbnail", f"https://img.youtube.com/vi/{video.get('video_id', '')}/mqdefault.jpg" if video.get('video_id') else None)
-                        })
-                    print(f"DEBUG: Lecture JSON ENRICHI de {len(videos_with_info)} vidéos avec titres réels")
-                else:
-                    raise ValueError("Format JSON invalide")
-            except (json.JSONDecodeError, ValueError, KeyError):
-                # Fallback: ancien format (une URL par ligne) - enrichir avec API
-                print("DEBUG: Format ancien détecté, enrichissement avec API...")
-                urls = [line.strip() for line in content.splitlines() if line.strip()]
-                for i, url in enumerate(urls):
-                    video_id = get_video_info_from_url(url)
-                    title = get_video_title(video_id) if video_id else f"Vidéo {i + 1}"
-                    videos_with_info.append({
-                        "url": url,
-                        "video_id": video_id,
-                        "title": title,
-                        "thumbnail": f"https://img.youtube.com/vi/{video_id}/mqdefault.jpg" if video_id else None
-                    })
-                print(f"DEBUG: Enrichissement API de {len(videos_with_info)} URLs (format ancien)")
-        else:
-            print("DEBUG: urls.txt n'existe pas")
+        job, error_response = _load_job("scrape", _request_job_id())
+        if error_response:
+            return error_response
+        _, urls_file = _scrape_files(job)
+        videos = [
+            # Ancien format (une URL par ligne) : titres via le cache, résolus en arrière-plan
+            video if "video_id" in video else {**video, "video_id": get_video_info_from_url(video["url"])}
+            for video in _read_scraped_videos(urls_file) or []
+        ]
+        videos, pending = _with_cached_titles(videos, job["job_id"])
+        videos_with_info = [_format_video(video) for video in videos]
         
-        print(f"DEBUG: Retour ENRICHI de {len(videos_with_info)} vidéos")
+        print(f"DEBUG: Retour ENRICHI de {len(videos_with_info)} vidéos ({pending} titres en attente)")
         
         return jsonify({
             "urls": videos_with_info,
             "count": len(videos_with_info),
-            "lastModified": URLS_FILE.stat().st_mtime if URLS_FILE.exists() else None
+            "pending": pending,
+            "lastModified": urls_file.stat().st_mtime if urls_file.exists() else None,
+            "job_id": job["job_id"]
         }), 200
     except Exception as e:
         print(f"DEBUG: Erreur dans get_scrape_urls_enriched: {e}")
         return jsonify({"error": f"Erreur lors de la lecture des URLs: {str(e)}"}), 500
 
-@app.route("/api/debug/urls", methods=["GET"])
+@api.route("/api/debug/urls", methods=["GET"])
+@user_required
 def debug_urls():
-    """Debug endpoint pour vérifier le contenu de urls.txt"""
+    """Debug endpoint pour vérifier le contenu de urls.txt d'un job"""
     try:
-        if URLS_FILE.exists():
-            with open(URLS_FILE, 'r', encoding='utf-8') as f:
+        job, error_response = _load_job("scrape", _request_job_id())
+        if error_response:
+            return error_response
+        _, urls_file = _scrape_files(job)
+        if urls_file.exists():
+            with open(urls_file, 'r', encoding='utf-8') as f:
                 content = f.read()
                 lines = [line.strip() for line in content.splitlines() if line.strip()]
             
@@ -1026,7 +1304,7 @@ def debug_urls():
                 "lines": lines,
                 "count": len(lines),
                 "size": len(content),
-                "lastModified": URLS_FILE.stat().st_mtime
+                "lastModified": urls_file.stat().st_mtime
             }), 200
         else:
             return jsonify({
@@ -1036,32 +1314,31 @@ def debug_urls():
     except Exception as e:
         return jsonify({"error": f"Erreur: {str(e)}"}), 500
 
-@app.route("/api/debug/transcripts", methods=["GET"])
+@api.route("/api/debug/transcripts", methods=["GET"])
+@user_required
 def debug_transcripts():
-    """Debug endpoint pour vérifier les fichiers de transcription"""
+    """Debug endpoint pour vérifier les fichiers de transcription d'un job"""
     try:
-        transcript_files = []
-        if TRANSCRIPTS_DIR.exists():
-            for file_path in TRANSCRIPTS_DIR.glob("*.txt"):
-                stat = file_path.stat()
-                transcript_files.append({
-                    "name": file_path.name,
-                    "size": stat.st_size,
-                    "modified": stat.st_mtime
-                })
+        job, error_response = _load_job("transcribe", _request_job_id())
+        if error_response:
+            return error_response
+        job_id = job["job_id"]
+        transcripts_dir = _transcripts_base(job) / "transcripts"
+        transcript_files, next_cursor = list_catalog(job_id)
         
         return jsonify({
-            "transcripts_dir_exists": TRANSCRIPTS_DIR.exists(),
-            "transcripts_dir_path": str(TRANSCRIPTS_DIR),
+            "transcripts_dir_exists": transcripts_dir.exists(),
+            "transcripts_dir_path": str(transcripts_dir),
             "files": transcript_files,
-            "count": len(transcript_files)
+            "count": count_transcripts(job_id),
+            "next_cursor": next_cursor
         }), 200
     except Exception as e:
         return jsonify({"error": f"Erreur: {str(e)}"}), 500
 
 # ===== ROUTES D'ADMINISTRATION =====
 
-@app.route("/api/admin/set-premium", methods=["POST"])
+@api.route("/api/admin/set-premium", methods=["POST"])
 @admin_required
 def set_premium():
     """Active/désactive le statut premium d'un utilisateur"""
@@ -1072,15 +1349,14 @@ def set_premium():
     if not email:
         return jsonify({"error": "Email requis"}), 400
     
-    user = get_user_by_email(email)
-    if not user:
-        return jsonify({"error": "Utilisateur non trouvé"}), 404
-    
-    # Mettre à jour le statut premium
+    # Mettre à jour le statut premium (UPDATE direct : pas de lecture préalable de l'utilisateur)
     db = get_db()
     try:
-        user.premium = premium
+        updated = db.query(User).filter(User.email == email).update({User.premium: premium}, synchronize_session=False)
         db.commit()
+        invalidate_premium(email)
+        if not updated:
+            return jsonify({"error": "Utilisateur non trouvé"}), 404
         logger.log_success(f"Statut premium mis à jour pour {email}: {premium}")
         
         return jsonify({
@@ -1095,34 +1371,140 @@ def set_premium():
     finally:
         db.close()
 
-@app.route("/api/admin/users", methods=["GET"])
+# Colonnes exposées par la liste admin (jamais password_hash, pas d'objets ORM complets)
+USER_LIST_COLUMNS = (User.id, User.email, User.premium, User.trial_count, User.created_at)
+
+def _user_row_to_dict(row):
+    return {
+        "id": row.id,
+        "email": row.email,
+        "premium": bool(row.premium),
+        "trial_count": row.trial_count or 0,
+        "created_at": row.created_at.isoformat() if row.created_at else None
+    }
+
+def _user_cursor(row):
+    """Curseur opaque '<created_at ISO>|<id>' de la dernière ligne d'une page ('|<id>' sans created_at)"""
+    return f"{row.created_at.isoformat() if row.created_at else ''}|{row.id}"
+
+def _parse_user_cursor(cursor):
+    """(created_at ou None, id) d'un curseur produit par _user_cursor ; ValueError s'il est mal formé"""
+    created_at, separator, user_id = cursor.partition("|")
+    if not separator or not user_id:
+        raise ValueError("cursor")
+    return (datetime.fromisoformat(created_at) if created_at else None), user_id
+
+def _parse_bool_arg(name):
+    value = request.args.get(name)
+    if value in (None, ""):
+        return None
+    return value.lower() in ("1", "true", "yes")
+
+def _parse_datetime_arg(name):
+    value = request.args.get(name)
+    return datetime.fromisoformat(value) if value else None
+
+def _users_query(db, filters):
+    """Requête projetée + filtres (premium, essais épuisés, intervalle de création)"""
+    query = db.query(*USER_LIST_COLUMNS)
+    if filters.get("premium") is not None:
+        query = query.filter(User.premium.is_(True) if filters["premium"] else or_(User.premium.is_(False), User.premium.is_(None)))
+    if filters.get("trial_exhausted") is not None:
+        exhausted = and_(or_(User.premium.is_(False), User.premium.is_(None)), User.trial_count >= TRIAL_LIMIT)
+        query = query.filter(exhausted if filters["trial_exhausted"] else ~exhausted)
+    if filters.get("created_after"):
+        query = query.filter(User.created_at >= filters["created_after"])
+    if filters.get("created_before"):
+        query = query.filter(User.created_at < filters["created_before"])
+    return query
+
+def _users_page(db, filters, cursor=None, limit=ADMIN_USERS_PAGE_SIZE):
+    """
+    Page triée par (created_at, id) après `cursor` : (lignes, curseur suivant ou None).
+    Les comptes sans created_at viennent en dernier (NULLS LAST explicite, l'ordre de l'index
+    Postgres ; SQLite les mettrait en tête) et sont parcourus par id.
+    """
+    query = _users_query(db, filters)
+    if cursor:
+        created_at, user_id = _parse_user_cursor(cursor)
+        if created_at is None:
+            query = query.filter(User.created_at.is_(None), User.id > user_id)
+        else:
+            query = query.filter(or_(
+                tuple_(User.created_at, User.id) > tuple_(created_at, user_id),
+                User.created_at.is_(None)
+            ))
+    rows = query.order_by(User.created_at.asc().nulls_last(), User.id).limit(limit + 1).all()
+    next_cursor = _user_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+@api.route("/api/admin/users", methods=["GET"])
 @admin_required
 def list_users():
-    """Liste tous les utilisateurs (admin seulement)"""
-    db = get_db()
+    """
+    Liste paginée des utilisateurs (admin seulement), triée par date de création.
+    ?limit=100&cursor=<next_cursor> ; filtres premium=true|false, trial_exhausted=true|false,
+    created_after / created_before (ISO 8601) ; ?count=1 ajoute le total filtré.
+    ?format=ndjson : export de tous les utilisateurs filtrés, une ligne JSON par utilisateur (streaming).
+    """
     try:
-        users = db.query(User).all()
-        users_data = []
-        for user in users:
-            users_data.append({
-                "id": user.id,
-                "email": user.email,
-                "premium": user.premium,
-                "trial_count": user.trial_count,
-                "created_at": user.created_at.isoformat() if user.created_at else None
-            })
+        filters = {
+            "premium": _parse_bool_arg("premium"),
+            "trial_exhausted": _parse_bool_arg("trial_exhausted"),
+            "created_after": _parse_datetime_arg("created_after"),
+            "created_before": _parse_datetime_arg("created_before")
+        }
+        limit = max(1, min(int(request.args.get("limit", ADMIN_USERS_PAGE_SIZE)), ADMIN_USERS_PAGE_MAX))
+        cursor = request.args.get("cursor") or None
+        if cursor:
+            _parse_user_cursor(cursor)
+    except ValueError:
+        return jsonify({"error": "Paramètres de liste invalides"}), 400
+    
+    if request.args.get("format") == "ndjson":
+        def generate():
+            # Une courte session par lot : aucune connexion gardée pendant l'envoi au client
+            after = cursor
+            while True:
+                db = get_db()
+                try:
+                    rows, after = _users_page(db, filters, after, ADMIN_USERS_PAGE_MAX)
+                finally:
+                    db.close()
+                if rows:
+                    yield "".join(json.dumps(_user_row_to_dict(row), ensure_ascii=False) + "\n" for row in rows)
+                if after is None:
+                    return
         
-        return jsonify({
-            "users": users_data,
-            "total": len(users_data)
-        }), 200
+        return Response(
+            stream_with_context(generate()),
+            mimetype="application/x-ndjson",
+            headers={
+                "Content-Disposition": "attachment; filename=users.ndjson",
+                "Cache-Control": "no-store",
+                "X-Accel-Buffering": "no"
+            }
+        )
+    
+    db = get_db()
+    try:
+        rows, next_cursor = _users_page(db, filters, cursor, limit)
+        result = {
+            "users": [_user_row_to_dict(row) for row in rows],
+            "count": len(rows),
+            "limit": limit,
+            "next_cursor": next_cursor
+        }
+        if request.args.get("count") == "1":
+            result["total"] = _users_query(db, filters).order_by(None).count()
+        return jsonify(result), 200
     except Exception as e:
         logger.log_error(f"Erreur liste utilisateurs: {str(e)}")
         return jsonify({"error": "Erreur lors de la récupération des utilisateurs"}), 500
     finally:
         db.close()
 
-@app.route("/api/admin/reset-trial", methods=["POST"])
+@api.route("/api/admin/reset-trial", methods=["POST"])
 @admin_required
 def reset_trial():
     """Remet à zéro le compteur d'essais d'un utilisateur"""
@@ -1132,14 +1514,12 @@ def reset_trial():
     if not email:
         return jsonify({"error": "Email requis"}), 400
     
-    user = get_user_by_email(email)
-    if not user:
-        return jsonify({"error": "Utilisateur non trouvé"}), 404
-    
     db = get_db()
     try:
-        user.trial_count = 0
+        updated = db.query(User).filter(User.email == email).update({User.trial_count: 0}, synchronize_session=False)
         db.commit()
+        if not updated:
+            return jsonify({"error": "Utilisateur non trouvé"}), 404
         logger.log_success(f"Compteur d'essais remis à zéro pour {email}")
         
         return jsonify({
@@ -1154,25 +1534,215 @@ def reset_trial():
     finally:
         db.close()
 
+def _parse_flag(value, default=None):
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "yes", "oui", "premium")
+
+# Ligne rejetée (email ou valeur d'un type inattendu) : rapportée avec le statut invalid
+_INVALID_ROW = object()
+
+def _bulk_value(value, default):
+    return _INVALID_ROW if isinstance(value, (list, dict)) else _parse_flag(value, default)
+
+def _bulk_rows(value_field=None):
+    """
+    Lignes d'une opération groupée : [(email, valeur)], dans l'ordre, sans doublon (dernière valeur gardée).
+    Entrées acceptées :
+    - JSON {"emails": [...], "<value_field>": ...} ou {"users": [{"email": ..., "<value_field>": ...}]}
+    - CSV (fichier multipart "file" ou corps text/csv) : colonne email (+ colonne <value_field> optionnelle),
+      en-tête facultatif
+    ValueError si le corps JSON n'a pas cette forme (400) ; une ligne mal typée (email non texte,
+    entrée users qui n'est pas un objet, valeur non scalaire) est gardée et rapportée invalid.
+    """
+    payload = request.get_json(silent=True) if request.is_json else None
+    if request.is_json and payload is None:
+        raise ValueError("Corps JSON invalide")
+    if payload is not None and not isinstance(payload, dict):
+        raise ValueError('Corps JSON attendu : {"emails": [...]} ou {"users": [{"email": ...}]}')
+    default = _parse_flag(request.args.get(value_field)) if value_field else None
+    if value_field and payload is not None:
+        default = _bulk_value(payload.get(value_field), default)
+        if default is _INVALID_ROW:
+            raise ValueError(f"{value_field} doit être un booléen")
+    rows = []
+    if payload is not None:
+        emails, users = payload.get("emails") or [], payload.get("users") or []
+        if not isinstance(emails, list) or not isinstance(users, list):
+            raise ValueError("emails et users doivent être des listes")
+        for email in emails:
+            rows.append((email, default))
+        for user in users:
+            if not isinstance(user, dict):
+                rows.append((user, _INVALID_ROW))
+                continue
+            rows.append((user.get("email"), _bulk_value(user.get(value_field), default) if value_field else None))
+    else:
+        upload = request.files.get("file")
+        raw = upload.read() if upload else request.get_data()
+        reader = csv.reader(io.StringIO(raw.decode("utf-8-sig", errors="replace")))
+        columns = None
+        for record in reader:
+            if not record or not record[0].strip():
+                continue
+            if columns is None and "@" not in record[0]:
+                columns = [column.strip().lower() for column in record]  # en-tête
+                continue
+            columns = columns or ["email", value_field]
+            values = dict(zip(columns, record))
+            rows.append((values.get("email"), _parse_flag(values.get(value_field), default) if value_field else None))
+    
+    unique = {}
+    for email, value in rows:
+        if isinstance(email, str):
+            email = email.strip()
+        else:
+            # Email absent (null) ou d'un autre type : clé lisible dans les résultats, ligne invalide
+            email, value = json.dumps(email, ensure_ascii=False, default=str), _INVALID_ROW
+        unique.pop(email, None)
+        unique[email] = value
+    return list(unique.items())
+
+def _bulk_update(rows, values_for):
+    """
+    Applique les lignes par paquets : un UPDATE ... WHERE email IN (...) RETURNING email par paquet
+    (et par valeur). Retourne les résultats par email : updated / not_found / invalid.
+    """
+    results = {}
+    groups = {}
+    for email, value in rows:
+        if value is _INVALID_ROW or "@" not in email:
+            results[email] = "invalid"
+            continue
+        values = values_for(value)
+        if values is None:
+            results[email] = "invalid"
+            continue
+        groups.setdefault(value, (values, []))[1].append(email)
+    
+    db = get_db()
+    try:
+        for values, emails in groups.values():
+            for start in range(0, len(emails), ADMIN_BULK_CHUNK):
+                chunk = emails[start:start + ADMIN_BULK_CHUNK]
+                statement = update(User).where(User.email.in_(chunk)).values(**values).returning(User.email)
+                updated = {email for (email,) in db.execute(statement)}
+                for email in chunk:
+                    results[email] = "updated" if email in updated else "not_found"
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return [{"email": email, "status": results[email]} for email, _ in rows]
+
+def _bulk_response(results, **extra):
+    summary = {}
+    for result in results:
+        summary[result["status"]] = summary.get(result["status"], 0) + 1
+    return jsonify({"results": results, "summary": summary, "count": len(results), **extra}), 200
+
+@api.route("/api/admin/bulk/set-premium", methods=["POST"])
+@admin_required
+def bulk_set_premium():
+    """
+    Active/désactive le premium pour une liste d'utilisateurs (JSON emails/users ou CSV email,premium).
+    Un UPDATE ensembliste par paquet de ADMIN_BULK_CHUNK emails ; résultat par ligne.
+    """
+    try:
+        rows = _bulk_rows("premium")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not rows:
+        return jsonify({"error": "Aucun email fourni"}), 400
+    if len(rows) > ADMIN_BULK_MAX:
+        return jsonify({"error": f"Trop d'emails (max {ADMIN_BULK_MAX})"}), 400
+    
+    try:
+        results = _bulk_update(rows, lambda premium: None if premium is None else {"premium": premium})
+    except Exception as e:
+        logger.log_error(f"Erreur mise à jour premium groupée: {str(e)}")
+        return jsonify({"error": "Erreur lors de la mise à jour"}), 500
+    for result in results:
+        if result["status"] == "updated":
+            invalidate_premium(result["email"])
+    logger.log_success(f"Statut premium mis à jour en masse: {len(results)} ligne(s)")
+    return _bulk_response(results)
+
+@api.route("/api/admin/bulk/reset-trial", methods=["POST"])
+@admin_required
+def bulk_reset_trial():
+    """Remet à zéro le compteur d'essais d'une liste d'utilisateurs (JSON emails ou CSV email)"""
+    try:
+        rows = _bulk_rows()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not rows:
+        return jsonify({"error": "Aucun email fourni"}), 400
+    if len(rows) > ADMIN_BULK_MAX:
+        return jsonify({"error": f"Trop d'emails (max {ADMIN_BULK_MAX})"}), 400
+    
+    try:
+        results = _bulk_update(rows, lambda _: {"trial_count": 0})
+    except Exception as e:
+        logger.log_error(f"Erreur reset trial groupé: {str(e)}")
+        return jsonify({"error": "Erreur lors de la remise à zéro"}), 500
+    logger.log_success(f"Compteurs d'essais remis à zéro en masse: {len(results)} ligne(s)")
+    return _bulk_response(results)
+
 # ===== MODIFICATION DES ENDPOINTS DE TRANSCRIPTION =====
 
 # Modifier l'endpoint de transcription pour vérifier les limites
 def check_transcription_limit(email):
-    """Vérifie si l'utilisateur peut transcrire et incrémente le compteur si nécessaire"""
-    can_transcribe, message = can_user_transcribe(email)
+    """
+    Vérifie si l'utilisateur peut transcrire et consomme un essai s'il n'est pas premium.
+    Vérification + incrément atomiques en une requête (cf. quota.py).
+    """
+    can_transcribe, message = consume_trial(email)
+    if can_transcribe and message != "Compte premium":
+        logger.log_info(f"Compteur d'essais incrémenté pour {email}")
+    return can_transcribe, message
+
+def create_app():
+    """
+    Fabrique de l'application. Aucun accès réseau : clients Supabase et connexions à la base
+    sont créés à la première utilisation, le schéma par la commande migrate.
+    """
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = SECRET_KEY
+    # Créer le dossier transcripts s'il n'existe pas
+    TRANSCRIPTS_DIR.mkdir(exist_ok=True)
     
-    if not can_transcribe:
-        return False, message
+    # Configuration CORS pour les origines frontend (production + développement)
+    CORS(app, resources={r"/api/*": {"origins": ["*"]}},
+         supports_credentials=True, expose_headers=["ETag"])
     
-    # Incrémenter le compteur d'essais si l'utilisateur n'est pas premium
-    user = get_user_by_email(email)
-    if user and not user.premium:
-        increment_trial_count(email)
-        logger.log_info(f"Compteur d'essais incrémenté pour {email}")
+    # Jetons Supabase vérifiés localement à chaque requête -> flask.g.user (cf. auth.py)
+    init_auth(app)
+    app.register_blueprint(api)
+    
+    @app.cli.command("migrate")
+    def migrate_command():
+        """Crée les tables et index manquants"""
+        migrate()
+        print("✅ Schéma à jour")
     
-    return True, message
+    if DB_AUTO_MIGRATE:
+        migrate()
+    return app
+
+# Instance utilisée par gunicorn (app:app)
+app = create_app()
 
 if __name__ == "__main__":
+    if sys.argv[1:] == ["migrate"]:
+        migrate()
+        print("✅ Schéma à jour")
+        sys.exit(0)
+    
     # Configuration pour Render (production)
     port = int(os.getenv('PORT', 8000))
     debug = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
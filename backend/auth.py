@@ -0,0 +1,182 @@
+"""
+auth.py
+Vérification locale des jetons d'accès Supabase (aucun appel réseau par requête) :
+- HS256 : signature vérifiée avec le secret JWT du projet (SUPABASE_JWT_SECRET)
+- ES256/RS256 (clés asymétriques) : clé publique lue dans le JWKS du projet, mis en cache
+Les claims décodés sont gardés en cache jusqu'à leur `exp` ; l'utilisateur vérifié est placé
+dans flask.g.user pour toute la requête (middleware enregistré par init_auth). Un jeton invalide
+ou expiré laisse g.user à None (raison dans g.auth_error) : ce sont les décorateurs qui refusent,
+les routes publiques (santé, connexion, rafraîchissement) restent accessibles.
+
+Par défaut (AUTH_REQUIRED=true), les routes @user_required exigent un jeton vérifié et
+l'identité vient uniquement du jeton. AUTH_REQUIRED=false est un mode de compatibilité explicite :
+un appel sans jeton y est identifié par l'email du corps / de la requête (non vérifié).
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import g, jsonify, request
+
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+SUPABASE_JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+AUTH_REQUIRED = os.getenv("AUTH_REQUIRED", "true").lower() in ("1", "true", "yes")
+ADMIN_KEY = os.getenv("ADMIN_KEY", "dev-admin-key")
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+JWKS_TTL = int(os.getenv("JWKS_TTL", "600"))
+JWT_LEEWAY = 30  # secondes de tolérance d'horloge sur exp / iat
+
+_claims_cache = OrderedDict()  # jeton -> claims (jusqu'à exp)
+_cache_lock = threading.Lock()
+_jwks_client = None
+
+
+class AuthError(Exception):
+    pass
+
+
+def _jwks():
+    global _jwks_client
+    if _jwks_client is None:
+        import jwt
+        if not SUPABASE_URL:
+            raise AuthError("SUPABASE_URL non configuré (JWKS indisponible)")
+        _jwks_client = jwt.PyJWKClient(
+            f"{SUPABASE_URL.rstrip('/')}/auth/v1/.well-known/jwks.json", cache_keys=True, lifespan=JWKS_TTL
+        )
+    return _jwks_client
+
+
+def _cached_claims(token):
+    with _cache_lock:
+        claims = _claims_cache.get(token)
+        if claims is None:
+            return None
+        if claims.get("exp", 0) + JWT_LEEWAY < time.time():
+            del _claims_cache[token]
+            return None
+        _claims_cache.move_to_end(token)
+        return claims
+
+
+def _remember_claims(token, claims):
+    with _cache_lock:
+        _claims_cache[token] = claims
+        _claims_cache.move_to_end(token)
+        while len(_claims_cache) > AUTH_CACHE_SIZE:
+            _claims_cache.popitem(last=False)
+
+
+def verify_token(token):
+    """Claims d'un jeton d'accès Supabase valide ; AuthError sinon"""
+    claims = _cached_claims(token)
+    if claims is not None:
+        return claims
+    import jwt  # import différé (cryptography) : seulement quand un jeton doit être vérifié
+    try:
+        algorithm = jwt.get_unverified_header(token).get("alg")
+        if algorithm == "HS256":
+            if not SUPABASE_JWT_SECRET:
+                raise AuthError("SUPABASE_JWT_SECRET non configuré")
+            key = SUPABASE_JWT_SECRET
+        elif algorithm in ("ES256", "RS256"):
+            key = _jwks().get_signing_key_from_jwt(token).key
+        else:
+            raise AuthError(f"Algorithme non supporté: {algorithm}")
+        claims = jwt.decode(
+            token, key, algorithms=[algorithm], audience=SUPABASE_JWT_AUDIENCE,
+            leeway=JWT_LEEWAY, options={"require": ["exp", "sub"]}
+        )
+    except jwt.PyJWTError as e:
+        raise AuthError(f"Jeton invalide: {e}") from e
+    _remember_claims(token, claims)
+    return claims
+
+
+def _bearer_token():
+    header = request.headers.get("Authorization", "")
+    if header[:7].lower() == "bearer ":
+        return header[7:].strip() or None
+    # EventSource ne peut pas envoyer d'en-tête : ?access_token= accepté pour les flux SSE (GET) uniquement
+    if request.method == "GET" and "text/event-stream" in request.headers.get("Accept", ""):
+        return request.args.get("access_token") or None
+    return None
+
+
+def load_current_user():
+    """
+    Middleware (before_request) : g.user = {id, email, role, claims} si un jeton valide est fourni.
+    Jeton invalide : g.user = None et g.auth_error = raison (la décision revient aux décorateurs).
+    """
+    g.user = None
+    g.auth_error = None
+    token = _bearer_token()
+    if not token:
+        return None
+    try:
+        claims = verify_token(token)
+    except AuthError as e:
+        g.auth_error = str(e)
+        return None
+    g.user = {
+        "id": claims.get("sub"),
+        "email": claims.get("email"),
+        "role": claims.get("role"),
+        "claims": claims,
+    }
+    return None
+
+
+def init_auth(app):
+    app.before_request(load_current_user)
+
+
+def current_email(fallback=None):
+    """
+    Email de l'utilisateur authentifié. `fallback` (email du corps, non vérifié) n'est utilisé
+    que sans jeton et en mode de compatibilité AUTH_REQUIRED=false.
+    """
+    user = getattr(g, "user", None)
+    if user:
+        return user["email"]
+    if AUTH_REQUIRED or getattr(g, "auth_error", None):
+        return None
+    return fallback
+
+
+def is_admin():
+    """Appel d'administration (en-tête X-Admin-Key : admin_script.py, outils internes)"""
+    return request.headers.get("X-Admin-Key") == ADMIN_KEY
+
+
+def _unauthorized():
+    """401 ; la raison du refus du jeton (expiré, signature...) quand un jeton a été fourni"""
+    return jsonify({"error": getattr(g, "auth_error", None) or "Authentification requise"}), 401
+
+
+def auth_required(f):
+    """Refuse la requête sans jeton valide (401)"""
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        if not getattr(g, "user", None):
+            return _unauthorized()
+        return f(*args, **kwargs)
+    return wrapper
+
+
+def user_required(f):
+    """
+    Jeton valide exigé (sauf appel d'administration). Avec AUTH_REQUIRED=false, un appel sans
+    jeton passe (email du corps) ; un jeton fourni mais invalide est refusé dans tous les cas.
+    """
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        if not getattr(g, "user", None) and not is_admin():
+            if AUTH_REQUIRED or getattr(g, "auth_error", None):
+                return _unauthorized()
+        return f(*args, **kwargs)
+    return wrapper
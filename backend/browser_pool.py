@@ -0,0 +1,233 @@
+"""
+browser_pool.py
+Pool de navigateurs Chromium persistants pour bot_yttotranscript.py
+Chaque navigateur garde un contexte + une page déjà préparés (stealth + init script),
+prêtés puis rendus à chaque vidéo au lieu d'un lancement complet par URL.
+"""
+
+import os
+from contextlib import contextmanager
+
+from playwright.sync_api import sync_playwright
+from playwright_stealth import stealth_sync
+
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "1"))
+BROWSER_MAX_USES = int(os.getenv("BROWSER_MAX_USES", "50"))
+
+# Arguments Chromium en mode HEADLESS + STEALTH (invisible et anti-détection)
+CHROMIUM_ARGS = [
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-web-security',
+    '--disable-features=VizDisplayCompositor',
+    '--disable-blink-features=AutomationControlled',
+    '--disable-extensions',
+    '--no-first-run',
+    '--disable-default-apps',
+    '--disable-background-timer-throttling',
+    '--disable-backgrounding-occluded-windows',
+    '--disable-renderer-backgrounding'
+]
+
+# Contexte avec User-Agent réaliste
+CONTEXT_OPTIONS = {
+    "user_agent": 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    "viewport": {'width': 1920, 'height': 1080},
+    "locale": 'fr-FR',
+    "timezone_id": 'Europe/Paris'
+}
+
+# Techniques de stealth supplémentaires
+STEALTH_INIT_SCRIPT = """
+    // Masquer les propriétés d'automatisation
+    Object.defineProperty(navigator, 'webdriver', {
+        get: () => undefined,
+    });
+
+    // Masquer les propriétés Playwright
+    delete window.__playwright;
+    delete window.__pw_manual;
+    delete window.__pw_cleanup;
+
+    // Simuler un navigateur normal
+    Object.defineProperty(navigator, 'plugins', {
+        get: () => [1, 2, 3, 4, 5],
+    });
+
+    Object.defineProperty(navigator, 'languages', {
+        get: () => ['fr-FR', 'fr', 'en-US', 'en'],
+    });
+
+    // Masquer les traces d'automatisation
+    window.chrome = {
+        runtime: {},
+    };
+
+    // Simuler des permissions normales
+    const originalQuery = window.navigator.permissions.query;
+    window.navigator.permissions.query = (parameters) => (
+        parameters.name === 'notifications' ?
+            Promise.resolve({ state: Notification.permission }) :
+            originalQuery(parameters)
+    );
+"""
+
+
+class _PoolSlot:
+    """Un navigateur du pool avec son contexte et sa page préparée"""
+
+    def __init__(self):
+        self.browser = None
+        self.context = None
+        self.page = None
+        self.uses = 0
+        self.leased = False
+
+    def is_alive(self):
+        try:
+            return (
+                self.browser is not None
+                and self.browser.is_connected()
+                and self.page is not None
+                and not self.page.is_closed()
+            )
+        except Exception:
+            return False
+
+    def close(self):
+        try:
+            if self.browser is not None:
+                self.browser.close()
+        except Exception:
+            pass
+        self.browser = None
+        self.context = None
+        self.page = None
+        self.uses = 0
+
+
+class BrowserPool:
+    """
+    Pool de navigateurs longue durée.
+    Un navigateur est recyclé après `max_uses` prêts ou dès qu'il a planté.
+    Le pool n'est pas thread-safe : l'API sync de Playwright est liée à son thread,
+    chaque thread doit donc avoir son propre pool.
+    Sans `playwright` fourni, le pool démarre le sien au premier prêt (et l'arrête à close()),
+    si bien qu'aucun processus navigateur n'est lancé tant qu'on n'en a pas besoin.
+    """
+
+    def __init__(self, playwright=None, size: int = BROWSER_POOL_SIZE,
+                 max_uses: int = BROWSER_MAX_USES, headless: bool = True):
+        self.playwright = playwright
+        self._owned_playwright = None
+        self.max_uses = max(1, max_uses)
+        self.headless = headless
+        self.slots = [_PoolSlot() for _ in range(max(1, size))]
+        self._next = 0
+        self.metrics = {
+            "leases": 0,
+            "hits": 0,
+            "misses": 0,
+            "launches": 0,
+            "recycles": 0,
+            "crashes": 0,
+        }
+
+    def _prepare(self, slot: _PoolSlot):
+        """Lance un navigateur et prépare une page stealth"""
+        slot.close()
+        if self.playwright is None:
+            self._owned_playwright = sync_playwright().start()
+            self.playwright = self._owned_playwright
+        slot.browser = self.playwright.chromium.launch(headless=self.headless, args=CHROMIUM_ARGS)
+        slot.context = slot.browser.new_context(**CONTEXT_OPTIONS)
+        slot.page = slot.context.new_page()
+        # Appliquer les techniques de stealth pour contourner les détections anti-bot
+        stealth_sync(slot.page)
+        slot.page.add_init_script(STEALTH_INIT_SCRIPT)
+        self.metrics["launches"] += 1
+
+    def _pick_slot(self) -> _PoolSlot:
+        for i in range(len(self.slots)):
+            slot = self.slots[(self._next + i) % len(self.slots)]
+            if not slot.leased:
+                self._next = (self._next + i + 1) % len(self.slots)
+                return slot
+        raise RuntimeError("Aucun navigateur libre dans le pool")
+
+    @contextmanager
+    def lease(self):
+        """Prête une page prête à l'emploi, rendue automatiquement au pool"""
+        slot = self._pick_slot()
+        if slot.is_alive():
+            self.metrics["hits"] += 1
+        else:
+            if slot.browser is not None:
+                self.metrics["crashes"] += 1
+            self.metrics["misses"] += 1
+            self._prepare(slot)
+
+        slot.leased = True
+        self.metrics["leases"] += 1
+        try:
+            yield slot.page
+        finally:
+            slot.leased = False
+            self._release(slot)
+
+    def _release(self, slot: _PoolSlot):
+        """Remet la page dans un état neutre ou recycle le navigateur"""
+        slot.uses += 1
+        if not slot.is_alive():
+            self.metrics["crashes"] += 1
+            slot.close()
+            return
+
+        if slot.uses >= self.max_uses:
+            self.metrics["recycles"] += 1
+            slot.close()
+            return
+
+        try:
+            slot.context.clear_cookies()
+            slot.page.goto("about:blank")
+        except Exception:
+            self.metrics["crashes"] += 1
+            slot.close()
+
+    def stats(self) -> dict:
+        """Métriques du pool (taux de réutilisation des navigateurs)"""
+        stats = dict(self.metrics)
+        stats["hit_rate"] = round(stats["hits"] / stats["leases"], 3) if stats["leases"] else 0.0
+        return stats
+
+    def close(self):
+        for slot in self.slots:
+            slot.close()
+        if self._owned_playwright is not None:
+            try:
+                self._owned_playwright.stop()
+            except Exception:
+                pass
+            self._owned_playwright = None
+            self.playwright = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def combine_stats(stats_list) -> dict:
+    """Additionne les métriques de plusieurs pools (un par worker)"""
+    total = {}
+    for stats in stats_list:
+        for key, value in stats.items():
+            if key != "hit_rate":
+                total[key] = total.get(key, 0) + value
+    for key in ("leases", "hits", "misses", "launches", "recycles", "crashes"):
+        total.setdefault(key, 0)
+    total["hit_rate"] = round(total["hits"] / total["leases"], 3) if total["leases"] else 0.0
+    return total
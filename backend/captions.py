@@ -0,0 +1,78 @@
+"""
+captions.py
+Voie rapide : récupère directement la piste de sous-titres exposée par yt-dlp
+(subtitles / automatic_captions, json3 ou vtt) avec une simple requête HTTP,
+sans lancer de navigateur.
+"""
+
+import json
+import re
+from typing import Optional
+
+import requests
+
+from transcribe_engine import site_slot
+
+CAPTION_LANGS = ["fr", "en"]
+CAPTION_FORMATS = ["json3", "vtt"]
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept-Language': 'en-US,en;q=0.5',
+}
+
+
+def _pick_format(tracks: list) -> Optional[dict]:
+    """Choisit json3 puis vtt, sinon la première piste disponible"""
+    for ext in CAPTION_FORMATS:
+        for track in tracks:
+            if track.get("ext") == ext and track.get("url"):
+                return track
+    for track in tracks:
+        if track.get("url"):
+            return track
+    return None
+
+
+def pick_caption_track(subtitles: dict, automatic_captions: dict, langs=None) -> Optional[dict]:
+    """
+    Priorité: sous-titres manuels (fr, en) puis sous-titres automatiques (fr, en).
+    Retourne {"url", "ext", "lang", "auto"} ou None.
+    """
+    langs = langs or CAPTION_LANGS
+    for auto, source in ((False, subtitles or {}), (True, automatic_captions or {})):
+        for lang in langs:
+            track = _pick_format(source.get(lang) or [])
+            if track:
+                return {"url": track["url"], "ext": track.get("ext"), "lang": lang, "auto": auto}
+    return None
+
+
+def caption_to_text(content: str) -> str:
+    """Convertit un sous-titre json3 (ou VTT en fallback) en texte propre"""
+    try:
+        data = json.loads(content)
+        text_parts = []
+        for event in data.get('events', []):
+            for seg in event.get('segs', []):
+                if 'utf8' in seg:
+                    text_parts.append(seg['utf8'])
+        text = ' '.join(text_parts)
+    except (json.JSONDecodeError, ValueError, AttributeError):
+        # Fallback: traitement VTT classique
+        text = re.sub(r'<[^>]+>', '', content)
+        text = re.sub(r'^\d+$', '', text, flags=re.MULTILINE)
+        text = re.sub(r'^\d{2}:\d{2}:\d{2}\.\d{3} --> \d{2}:\d{2}:\d{2}\.\d{3}.*$', '', text, flags=re.MULTILINE)
+        text = re.sub(r'^WEBVTT.*$', '', text, flags=re.MULTILINE)
+        text = re.sub(r'^(Kind|Language):.*$', '', text, flags=re.MULTILINE)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def fetch_caption_text(track: dict, timeout: int = 15) -> Optional[str]:
+    """Télécharge une piste de sous-titres et retourne le texte, ou None"""
+    with site_slot(track["url"]):
+        response = requests.get(track["url"], headers=HEADERS, timeout=timeout)
+    if response.status_code != 200:
+        print(f"Erreur HTTP {response.status_code} sur la piste de sous-titres")
+        return None
+    return caption_to_text(response.text) or None
@@ -0,0 +1,53 @@
+"""
+database.py
+Moteur SQLAlchemy partagé entre l'API Flask et les workers (SQLite en local, Postgres Supabase en prod)
+"""
+
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+# Charger les variables d'environnement
+load_dotenv()
+
+# Configuration de la base de données Supabase
+DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///users.db')
+if DATABASE_URL.startswith('sqlite:///') and not DATABASE_URL.startswith('sqlite:////'):
+    # Chemin relatif résolu depuis backend/ : les scripts des jobs tournent dans leur propre dossier
+    DATABASE_URL = 'sqlite:///' + str(Path(__file__).resolve().parent / DATABASE_URL[len('sqlite:///'):])
+
+# Configuration SQLAlchemy (connexion sécurisée Supabase IPv4)
+# Détecter le type de base de données pour les arguments de connexion
+connect_args = {}
+if DATABASE_URL.startswith('postgresql://'):
+    connect_args = {"sslmode": "require"}
+
+engine = create_engine(
+    DATABASE_URL,
+    connect_args=connect_args,
+    pool_pre_ping=True,
+    pool_size=5,          # Taille modérée pour Render (évite surcharge)
+    max_overflow=10       # Connexions temporaires supplémentaires
+)
+if DATABASE_URL.startswith('sqlite'):
+    @event.listens_for(engine, "connect")
+    def _sqlite_pragmas(dbapi_connection, connection_record):
+        """WAL : les lectures (API) ne bloquent plus les écritures (worker) ; pas de fsync à chaque commit"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.close()
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+Base = declarative_base()
+
+
+def missing_tables(*names):
+    """Tables absentes de la base : le schéma est créé par `python app.py migrate`, jamais par les workers"""
+    from sqlalchemy import inspect
+    inspector = inspect(engine)
+    return [name for name in names if not inspector.has_table(name)]
@@ -0,0 +1,240 @@
+"""
+events.py
+Canal d'événements entre les workers (scraping, transcription) et l'API Flask.
+Les workers ajoutent une ligne JSON par événement dans events.jsonl (append-only) ;
+/api/events suit ce fichier depuis un offset et pousse les événements en Server-Sent Events.
+L'id SSE est "<inode>:<offset>" : après une rotation (nouvel inode), un Last-Event-ID de
+l'ancien fichier fait repartir du début du nouveau, jamais d'un offset de l'ancien.
+
+Types émis : video_found, title_resolved, transcript_saved, job_started, job_finished, log
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou inter-processus, la rotation reste best effort
+    fcntl = None
+
+EVENTS_FILE = Path(os.getenv("EVENTS_FILE", str(Path(__file__).resolve().parent / "events.jsonl")))
+EVENTS_MAX_BYTES = int(os.getenv("EVENTS_MAX_BYTES", str(5 * 1024 * 1024)))
+SSE_POLL_INTERVAL = float(os.getenv("SSE_POLL_INTERVAL", "0.25"))
+SSE_HEARTBEAT = float(os.getenv("SSE_HEARTBEAT", "15"))
+SSE_MAX_SECONDS = float(os.getenv("SSE_MAX_SECONDS", "300"))
+# Flux ouverts simultanément par processus : chacun occupe un thread gthread (--threads 8)
+SSE_MAX_CONNECTIONS = int(os.getenv("SSE_MAX_CONNECTIONS", "4"))
+TAIL_BLOCK_SIZE = 8192
+
+_stream_slots = threading.BoundedSemaphore(SSE_MAX_CONNECTIONS)
+
+
+def acquire_stream_slot() -> bool:
+    """Réserve une place de flux SSE (sans attendre) ; False si toutes sont prises"""
+    return _stream_slots.acquire(blocking=False)
+
+
+def release_stream_slot():
+    _stream_slots.release()
+
+
+def emit(event_type: str, **data):
+    """Publie un événement (une seule écriture O_APPEND, sûre entre processus)"""
+    record = {"type": event_type, "ts": time.time(), **data}
+    # Les scripts lancés pour un job reçoivent JOB_ID : chaque événement est rattaché à son job
+    if os.getenv("JOB_ID") and "job_id" not in record:
+        record["job_id"] = os.getenv("JOB_ID")
+    line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+    try:
+        # flock sur un fichier .lock (cf. logger.py) : un seul processus fait la rotation, et aucune
+        # écriture ne part dans le fichier qui vient d'être renommé
+        with open(EVENTS_FILE.with_suffix(".jsonl.lock"), "a") as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                # Rotation par taille : les lecteurs détectent le changement d'inode et repartent de zéro
+                if EVENTS_FILE.exists() and EVENTS_FILE.stat().st_size > EVENTS_MAX_BYTES:
+                    os.replace(EVENTS_FILE, EVENTS_FILE.with_suffix(".jsonl.1"))
+                fd = os.open(str(EVENTS_FILE), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+                try:
+                    os.write(fd, line)
+                finally:
+                    os.close(fd)
+            finally:
+                if fcntl:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+    except OSError as e:
+        print(f"Erreur publication événement {event_type}: {e}")
+
+
+def event_id(inode: int, offset: int) -> str:
+    """Id SSE d'un événement : offset dans le fichier identifié par son inode"""
+    return f"{inode or 0}:{offset}"
+
+
+def parse_event_id(value):
+    """
+    (inode, offset) d'un id SSE / ?since= ; inode None pour un ancien id (offset seul),
+    (None, None) si la valeur est absente ou mal formée.
+    """
+    inode, separator, offset = (value or "").partition(":")
+    if not separator:
+        return (None, int(inode)) if inode.isdigit() else (None, None)
+    if not (inode.isdigit() and offset.isdigit()):
+        return None, None
+    return int(inode), int(offset)
+
+
+def _sse(event_type: str, data: dict, event_id: str = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event_type}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class _Tail:
+    """
+    Suit un fichier texte depuis un offset (ne relit que les octets ajoutés).
+    Avec `inode` (curseur "<inode>:<offset>"), un offset d'un autre fichier (rotation) repart de 0.
+    """
+
+    def __init__(self, path: Path, offset: int = None, inode: int = None):
+        self.path = path
+        self.inode = None
+        self.offset = offset
+        try:
+            st = path.stat()
+            self.inode = st.st_ino
+            if inode is not None and (inode != st.st_ino or self.offset is None or self.offset > st.st_size):
+                # Fichier remplacé depuis le curseur : tout son contenu est postérieur
+                self.offset = 0
+            elif self.offset is None or self.offset > st.st_size:
+                # Par défaut on ne rejoue pas l'historique : on part de la fin
+                self.offset = st.st_size
+        except OSError:
+            self.offset = 0
+
+    def read_lines(self) -> list:
+        """Retourne [(ligne, offset_après_la_ligne)] pour les lignes complètes ajoutées"""
+        try:
+            st = self.path.stat()
+        except OSError:
+            return []
+        if st.st_ino != self.inode or st.st_size < self.offset:
+            self.inode = st.st_ino
+            self.offset = 0
+        if st.st_size == self.offset:
+            return []
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            chunk = f.read(st.st_size - self.offset)
+        end = chunk.rfind(b"\n")
+        if end < 0:
+            return []
+        lines = []
+        position = self.offset
+        for raw in chunk[:end + 1].split(b"\n")[:-1]:
+            position += len(raw) + 1
+            if raw.strip():
+                lines.append((raw.decode("utf-8", errors="replace"), position))
+        self.offset = position
+        return lines
+
+
+def tail_lines(path: Path, n: int, block_size: int = TAIL_BLOCK_SIZE):
+    """
+    Dernières `n` lignes complètes d'un fichier, lues par blocs depuis la fin :
+    coût proportionnel aux lignes demandées, pas à la taille du fichier.
+    Retourne ([lignes], offset après la dernière ligne) ; l'offset sert de curseur since_offset.
+    """
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        blocks = []
+        newlines = 0
+        # Une fin de ligne de plus que demandé : la première ligne lue peut être tronquée
+        while position > 0 and newlines <= n:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            block = f.read(step)
+            blocks.append(block)
+            newlines += block.count(b"\n")
+    data = b"".join(reversed(blocks))
+    end = data.rfind(b"\n") + 1  # ligne finale en cours d'écriture exclue (relue au prochain appel)
+    lines = data[:end].split(b"\n")[:-1]
+    if position > 0:
+        lines = lines[1:]
+    lines = lines[-n:] if n > 0 else []
+    return [line.decode("utf-8", errors="replace") for line in lines], position + end
+
+
+def read_since(path: Path, offset: int):
+    """Lignes complètes ajoutées depuis `offset` : ([lignes], nouvel offset)"""
+    tail = _Tail(path, offset)
+    lines = [line for line, _ in tail.read_lines()]
+    return lines, tail.offset
+
+
+def stream_log(path: Path, offset: int = None):
+    """Générateur SSE des nouvelles lignes d'un log (id = offset, reprise via Last-Event-ID)"""
+    tail = _Tail(path, offset)
+    started = last_sent = time.monotonic()
+
+    yield "retry: 2000\n\n"
+    while time.monotonic() - started < SSE_MAX_SECONDS:
+        sent = False
+        for line, position in tail.read_lines():
+            yield _sse("log", {"line": line}, event_id=str(position))
+            sent = True
+
+        now = time.monotonic()
+        if sent:
+            last_sent = now
+        elif now - last_sent >= SSE_HEARTBEAT:
+            yield ": ping\n\n"
+            last_sent = now
+        time.sleep(SSE_POLL_INTERVAL)
+
+
+def stream_events(offset: int = None, log_file: Path = None, accept=None, inode: int = None):
+    """
+    Générateur SSE : pousse les événements de events.jsonl (id = "<inode>:<offset>", utilisable
+    comme Last-Event-ID à la reconnexion, cf. parse_event_id) et, si `log_file` est fourni,
+    chaque nouvelle ligne de ce log en événement `log`.
+    Avec `accept(record)`, seuls les événements acceptés sont transmis (filtre par job / propriétaire).
+    Se termine après SSE_MAX_SECONDS ; EventSource se reconnecte automatiquement.
+    """
+    events = _Tail(EVENTS_FILE, offset, inode)
+    logs = _Tail(log_file) if log_file else None
+    started = last_sent = time.monotonic()
+
+    yield "retry: 2000\n\n"
+    while time.monotonic() - started < SSE_MAX_SECONDS:
+        sent = False
+        for raw, position in events.read_lines():
+            try:
+                record = json.loads(raw)
+            except ValueError:
+                continue
+            if accept and not accept(record):
+                continue
+            yield _sse(record.get("type", "message"), record, event_id=event_id(events.inode, position))
+            sent = True
+        if logs:
+            for line, _ in logs.read_lines():
+                yield _sse("log", {"line": line})
+                sent = True
+
+        now = time.monotonic()
+        if sent:
+            last_sent = now
+        elif now - last_sent >= SSE_HEARTBEAT:
+            yield ": ping\n\n"
+            last_sent = now
+        time.sleep(SSE_POLL_INTERVAL)
@@ -0,0 +1,405 @@
+"""
+jobs.py
+Registre et file d'attente des jobs de scraping / transcription, stockés dans la base SQLAlchemy.
+Chaque job a un ID, un propriétaire, un dossier de travail isolé (urls.txt, channels.txt,
+transcripts/, signaux de fin...), un état et des horodatages, partagés entre workers gunicorn.
+
+L'API ne fait qu'enregistrer les jobs ('queued') ; worker.py les prend en bail
+(SELECT ... FOR UPDATE SKIP LOCKED + UPDATE conditionnel), les exécute et les
+remet en file avec backoff en cas d'échec.
+"""
+
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import Column, String, Integer, DateTime, Text, and_, or_
+
+from database import Base, SessionLocal
+from events import emit
+
+if os.path.exists("/tmp"):
+    DEFAULT_JOBS_ROOT = "/tmp/jobs"
+else:
+    DEFAULT_JOBS_ROOT = str(Path(__file__).resolve().parent / "jobs")
+
+JOBS_ROOT = Path(os.getenv("JOBS_ROOT", DEFAULT_JOBS_ROOT))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_VISIBILITY_TIMEOUT = int(os.getenv("JOB_VISIBILITY_TIMEOUT", "120"))  # secondes sans heartbeat
+JOB_RETRY_BACKOFF = int(os.getenv("JOB_RETRY_BACKOFF", "30"))  # secondes, doublé à chaque tentative
+JOB_QUEUE_LIMIT = int(os.getenv("JOB_QUEUE_LIMIT", "100"))  # jobs en attente max avant refus (back-pressure)
+
+# Machine à états : état courant -> états autorisés (running -> queued = nouvelle tentative)
+JOB_TRANSITIONS = {
+    "queued": {"running", "failed", "cancelled"},
+    "running": {"queued", "succeeded", "failed", "cancelled"},
+    "succeeded": set(),
+    "failed": set(),
+    "cancelled": set(),
+}
+ACTIVE_STATES = ("queued", "running")
+LEASE_EXPIRED_ERROR = "Bail expiré (worker arrêté) après la dernière tentative"
+
+# Fichier de signal de fin écrit par chaque script dans son dossier de travail
+COMPLETION_SIGNALS = {
+    "scrape": "scraping_completed.txt",
+    "transcribe": "transcription_completed.txt",
+}
+
+# Script exécuté et fichier de log pour chaque type de job
+JOB_SCRIPTS = {
+    "scrape": ("scrape_channel_videos.py", "scrape.out"),
+    "transcribe": ("bot_yttotranscript.py", "transcribe.out"),
+}
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(String, primary_key=True)
+    kind = Column(String, nullable=False, index=True)
+    owner = Column(String, index=True)
+    state = Column(String, nullable=False, default="queued", index=True)
+    workdir = Column(String, nullable=False)
+    pid = Column(Integer)
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=JOB_MAX_ATTEMPTS)
+    available_at = Column(DateTime, default=datetime.utcnow, index=True)
+    lease_owner = Column(String)
+    lease_expires_at = Column(DateTime, index=True)
+    params = Column(Text)
+    result = Column(Text)
+    error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def job_to_dict(job: Job) -> dict:
+    return {
+        "job_id": job.id,
+        "kind": job.kind,
+        "owner": job.owner,
+        "state": job.state,
+        "workdir": job.workdir,
+        "pid": job.pid,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "available_at": _iso(job.available_at),
+        "lease_owner": job.lease_owner,
+        "params": json.loads(job.params) if job.params else {},
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error,
+        "created_at": _iso(job.created_at),
+        "started_at": _iso(job.started_at),
+        "finished_at": _iso(job.finished_at),
+        "updated_at": _iso(job.updated_at),
+    }
+
+
+def job_workdir(job: dict) -> Path:
+    return Path(job["workdir"])
+
+
+def create_job(kind: str, owner: str = None, params: dict = None, files: dict = None,
+               max_attempts: int = JOB_MAX_ATTEMPTS) -> dict:
+    """
+    Crée un job 'queued' et son dossier de travail.
+    `files` ({nom: contenu}) est écrit dans le dossier avant l'insertion, pour qu'un worker
+    ne puisse jamais prendre le job avant que ses entrées (channels.txt, urls.txt) existent.
+    """
+    job_id = uuid.uuid4().hex
+    workdir = JOBS_ROOT / job_id
+    workdir.mkdir(parents=True, exist_ok=True)
+    for name, content in (files or {}).items():
+        with open(workdir / name, 'w', encoding='utf-8', newline='\n') as f:
+            f.write(content)
+
+    now = datetime.utcnow()
+    job = Job(
+        id=job_id,
+        kind=kind,
+        owner=owner,
+        state="queued",
+        workdir=str(workdir),
+        attempts=0,
+        max_attempts=max_attempts,
+        available_at=now,
+        params=json.dumps(params or {}, ensure_ascii=False),
+        created_at=now,
+        updated_at=now,
+    )
+    # Tous les champs sont connus : pas de relecture de la ligne après le commit
+    record = job_to_dict(job)
+
+    db = SessionLocal()
+    try:
+        db.add(job)
+        db.commit()
+        return record
+    except Exception as e:
+        db.rollback()
+        raise e
+    finally:
+        db.close()
+
+
+def get_job(job_id: str) -> dict | None:
+    db = SessionLocal()
+    try:
+        job = db.get(Job, job_id)
+        return job_to_dict(job) if job else None
+    finally:
+        db.close()
+
+
+def latest_job(kind: str, owner: str = None) -> dict | None:
+    """Dernier job d'un type (et d'un propriétaire si fourni)"""
+    db = SessionLocal()
+    try:
+        query = db.query(Job).filter(Job.kind == kind)
+        if owner:
+            query = query.filter(Job.owner == owner)
+        job = query.order_by(Job.created_at.desc()).first()
+        return job_to_dict(job) if job else None
+    finally:
+        db.close()
+
+
+def list_jobs(owner: str = None, kind: str = None, limit: int = 50) -> list:
+    db = SessionLocal()
+    try:
+        query = db.query(Job)
+        if owner:
+            query = query.filter(Job.owner == owner)
+        if kind:
+            query = query.filter(Job.kind == kind)
+        return [job_to_dict(job) for job in query.order_by(Job.created_at.desc()).limit(limit)]
+    finally:
+        db.close()
+
+
+def count_jobs(state: str = "queued") -> int:
+    db = SessionLocal()
+    try:
+        return db.query(Job).filter(Job.state == state).count()
+    finally:
+        db.close()
+
+
+_queue_depth = {"value": 0, "at": 0.0}
+
+
+def queue_depth(max_age: float = 1.0) -> int:
+    """Nombre de jobs en attente, recompté au plus une fois par `max_age` secondes (chemin de soumission)"""
+    now = time.monotonic()
+    if now - _queue_depth["at"] >= max_age:
+        _queue_depth["value"] = count_jobs("queued")
+        _queue_depth["at"] = now
+    return _queue_depth["value"]
+
+
+def transition(job_id: str, state: str, **fields) -> dict:
+    """
+    Fait passer un job dans un nouvel état (ValueError si la transition est interdite).
+    `result` (dict) est sérialisé en JSON ; les horodatages started/finished sont posés automatiquement.
+    """
+    db = SessionLocal()
+    try:
+        job = db.get(Job, job_id)
+        if job is None:
+            raise ValueError(f"Job inconnu: {job_id}")
+        if state != job.state and state not in JOB_TRANSITIONS[job.state]:
+            raise ValueError(f"Transition interdite: {job.state} -> {state}")
+
+        job.state = state
+        now = datetime.utcnow()
+        if state == "running" and job.started_at is None:
+            job.started_at = now
+        if state not in ACTIVE_STATES and job.finished_at is None:
+            job.finished_at = now
+        for key, value in fields.items():
+            if key == "result":
+                value = json.dumps(value, ensure_ascii=False)
+            setattr(job, key, value)
+        db.commit()
+        return job_to_dict(job)
+    except Exception as e:
+        db.rollback()
+        raise e
+    finally:
+        db.close()
+
+
+def lease_job(worker_id: str, kinds=None, visibility_timeout: int = JOB_VISIBILITY_TIMEOUT) -> dict | None:
+    """
+    Prend en bail le plus ancien job disponible : 'queued' dont available_at est passé,
+    ou 'running' dont le bail a expiré (worker mort). Retourne le job passé en 'running', ou None.
+
+    Postgres : FOR UPDATE SKIP LOCKED évite que deux workers se disputent la même ligne.
+    SQLite ignore FOR UPDATE : l'UPDATE conditionnel sur (state, attempts) fait office de
+    verrou optimiste, un seul worker gagne.
+    """
+    now = datetime.utcnow()
+    expired = []  # jobs abandonnés par ce worker : job_finished publié après le commit
+    db = SessionLocal()
+    try:
+        query = db.query(Job).filter(or_(
+            and_(Job.state == "queued", Job.available_at <= now),
+            and_(Job.state == "running", Job.lease_expires_at < now),
+        ))
+        if kinds:
+            query = query.filter(Job.kind.in_(list(kinds)))
+        candidates = query.order_by(Job.available_at).limit(5).with_for_update(skip_locked=True).all()
+
+        for job in candidates:
+            attempts = job.attempts or 0
+            if attempts >= (job.max_attempts or 1):
+                # Bail expiré sur la dernière tentative : abandon
+                failed = db.query(Job).filter(Job.id == job.id, Job.state == job.state, Job.attempts == attempts).update({
+                    Job.state: "failed",
+                    Job.error: LEASE_EXPIRED_ERROR,
+                    Job.finished_at: now,
+                    Job.lease_owner: None,
+                    Job.lease_expires_at: None,
+                }, synchronize_session=False)
+                if failed == 1:
+                    expired.append((job.kind, job.id))
+                continue
+
+            won = db.query(Job).filter(
+                Job.id == job.id, Job.state == job.state, Job.attempts == attempts
+            ).update({
+                Job.state: "running",
+                Job.attempts: attempts + 1,
+                Job.lease_owner: worker_id,
+                Job.lease_expires_at: now + timedelta(seconds=visibility_timeout),
+                Job.started_at: job.started_at or now,
+                Job.error: None,
+                Job.updated_at: now,
+            }, synchronize_session=False)
+            if won == 1:
+                db.commit()
+                _announce_expired(expired)
+                db.expire_all()
+                return job_to_dict(db.get(Job, job.id))
+
+        db.commit()
+        _announce_expired(expired)
+        return None
+    except Exception as e:
+        db.rollback()
+        raise e
+    finally:
+        db.close()
+
+
+def _announce_expired(expired):
+    """job_finished pour les jobs passés en 'failed' par lease_job (comme worker.py pour un échec)"""
+    for kind, job_id in expired:
+        emit("job_finished", kind=kind, job_id=job_id, state="failed", error=LEASE_EXPIRED_ERROR)
+
+
+def _update_leased(job_id: str, worker_id: str, values: dict) -> bool:
+    """UPDATE d'un job encore tenu par ce worker ; False si le bail a été perdu"""
+    db = SessionLocal()
+    try:
+        values[Job.updated_at] = datetime.utcnow()
+        updated = db.query(Job).filter(
+            Job.id == job_id, Job.state == "running", Job.lease_owner == worker_id
+        ).update(values, synchronize_session=False)
+        db.commit()
+        return updated == 1
+    except Exception as e:
+        db.rollback()
+        raise e
+    finally:
+        db.close()
+
+
+def heartbeat(job_id: str, worker_id: str, visibility_timeout: int = JOB_VISIBILITY_TIMEOUT, pid: int = None) -> bool:
+    """Prolonge le bail d'un job en cours (et enregistre le PID du processus)"""
+    values = {Job.lease_expires_at: datetime.utcnow() + timedelta(seconds=visibility_timeout)}
+    if pid is not None:
+        values[Job.pid] = pid
+    return _update_leased(job_id, worker_id, values)
+
+
+def complete_job(job_id: str, worker_id: str, result: dict = None) -> bool:
+    return _update_leased(job_id, worker_id, {
+        Job.state: "succeeded",
+        Job.result: json.dumps(result or {}, ensure_ascii=False),
+        Job.finished_at: datetime.utcnow(),
+        Job.lease_owner: None,
+        Job.lease_expires_at: None,
+    })
+
+
+def retry_or_fail_job(job_id: str, worker_id: str, error: str, attempts: int, max_attempts: int,
+                      backoff: int = JOB_RETRY_BACKOFF) -> str:
+    """
+    Remet le job en file avec un backoff exponentiel (backoff * 2^(tentative-1)),
+    ou le passe en 'failed' après la dernière tentative. Retourne le nouvel état.
+    """
+    now = datetime.utcnow()
+    if attempts < max_attempts:
+        state = "queued"
+        values = {Job.available_at: now + timedelta(seconds=backoff * 2 ** (attempts - 1))}
+    else:
+        state = "failed"
+        values = {Job.finished_at: now}
+    values.update({
+        Job.state: state,
+        Job.error: error,
+        Job.lease_owner: None,
+        Job.lease_expires_at: None,
+    })
+    _update_leased(job_id, worker_id, values)
+    return state
+
+
+def release_job(job_id: str, worker_id: str) -> bool:
+    """Rend un job à la file sans consommer de tentative (arrêt propre du worker)"""
+    db = SessionLocal()
+    try:
+        updated = db.query(Job).filter(
+            Job.id == job_id, Job.state == "running", Job.lease_owner == worker_id
+        ).update({
+            Job.state: "queued",
+            Job.attempts: Job.attempts - 1,
+            Job.available_at: datetime.utcnow(),
+            Job.lease_owner: None,
+            Job.lease_expires_at: None,
+            Job.updated_at: datetime.utcnow(),
+        }, synchronize_session=False)
+        db.commit()
+        return updated == 1
+    except Exception as e:
+        db.rollback()
+        raise e
+    finally:
+        db.close()
+
+
+def read_completion_signal(job: dict) -> dict | None:
+    """Lit le signal de fin ('completed:<n>[:<total>]') écrit par le script dans son dossier"""
+    signal_file = job_workdir(job) / COMPLETION_SIGNALS.get(job["kind"], "")
+    try:
+        content = signal_file.read_text(encoding="utf-8").strip()
+    except OSError:
+        return None
+    if not content.startswith("completed:"):
+        return None
+    parts = content.split(":")
+    result = {"count": int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 0}
+    if len(parts) > 2 and parts[2].isdigit():
+        result["total"] = int(parts[2])
+    return result
@@ -1,78 +1,273 @@
 #!/usr/bin/env python3
 """
 Système de logs global pour l'application
+
+Enregistrements JSON (une ligne par message : ts, level, message, session, pid, job_id,
+video_id, duration_ms...) écrits dans LOG_FILE :
+- les appels log_* ne font qu'ajouter à une file (QueueHandler) ; un thread d'écoute
+  formate et écrit, l'appelant ne touche jamais au disque
+- écritures groupées : tampon vidé toutes les LOG_FLUSH_INTERVAL secondes, quand il est plein
+  ou dès un message de niveau LOG_FLUSH_LEVEL (WARNING par défaut)
+- chaque lot part en un seul write O_APPEND ; rotation par taille sous verrou fichier,
+  sûre entre l'API, le worker et les scripts qui partagent le même fichier
+Le fichier n'est plus supprimé au démarrage : chaque processus ouvre sa propre session.
 """
 
+import atexit
+import json
+import logging
 import os
+import queue
+import re
 import sys
-from pathlib import Path
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
-import json
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou inter-processus, la rotation reste best effort
+    fcntl = None
+
+LOG_FILE = Path(os.getenv("LOG_FILE", str(Path(__file__).resolve().parent / "session_log.jsonl")))
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "3"))
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "1"))
+LOG_FLUSH_LEVEL = os.getenv("LOG_FLUSH_LEVEL", "WARNING")
+LOG_BUFFER_SIZE = 200
+LOG_CONSOLE = os.getenv("LOG_CONSOLE", "true").lower() in ("1", "true", "yes")
+LOG_DATA_MAX_CHARS = 2000  # corps de requête tronqué dans log_api_call
+
+SUCCESS = 25
+logging.addLevelName(SUCCESS, "SUCCESS")
+
+_VIDEO_ID_RE = re.compile(r'(?:v=|\/)([0-9A-Za-z_-]{11})')
+
+
+class JsonFormatter(logging.Formatter):
+    """Une ligne JSON par enregistrement ; les champs structurés viennent de `record.fields`"""
+
+    def __init__(self, session_id):
+        super().__init__()
+        self.session_id = session_id
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "message": record.getMessage(),
+            "session": self.session_id,
+            "pid": record.process,
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class ConsoleFormatter(logging.Formatter):
+    """Format console historique : [HH:MM:SS.mmm] [LEVEL] message"""
+
+    def format(self, record):
+        timestamp = datetime.fromtimestamp(record.created).strftime("%H:%M:%S.%f")[:-3]
+        return f"[{timestamp}] [{record.levelname}] {record.getMessage()}"
+
+
+class BufferedJsonLinesHandler(logging.Handler):
+    """
+    Tampon de lignes JSON écrit par lots : un seul os.write en O_APPEND par lot,
+    rotation par taille (session_log.jsonl -> .1 -> .2...) sous flock sur un fichier .lock.
+    """
+
+    def __init__(self, path: Path, max_bytes: int = LOG_MAX_BYTES, backup_count: int = LOG_BACKUP_COUNT,
+                 capacity: int = LOG_BUFFER_SIZE, flush_level: int = logging.WARNING):
+        super().__init__()
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.capacity = capacity
+        self.flush_level = flush_level
+        self.buffer = []
+
+    def emit(self, record):
+        marker = getattr(record, "flush_event", None)
+        if marker is not None:
+            # Demande de vidage passée par la file : tout ce qui précède est déjà dans le tampon
+            self.flush()
+            marker.set()
+            return
+        try:
+            line = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        with self.lock:
+            self.buffer.append(line)
+            full = len(self.buffer) >= self.capacity
+        if full or record.levelno >= self.flush_level:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            if not self.buffer:
+                return
+            data = ("\n".join(self.buffer) + "\n").encode("utf-8")
+            self.buffer = []
+            try:
+                self._write(data)
+            except OSError as e:
+                print(f"Erreur écriture du log {self.path}: {e}", file=sys.stderr)
+
+    def _write(self, data: bytes):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, "a") as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                if self.max_bytes and self.path.exists() and self.path.stat().st_size + len(data) > self.max_bytes:
+                    self._rotate()
+                fd = os.open(str(self.path), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+                try:
+                    os.write(fd, data)
+                finally:
+                    os.close(fd)
+            finally:
+                if fcntl:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _rotate(self):
+        if self.backup_count <= 0:
+            self.path.unlink()
+            return
+        for index in range(self.backup_count - 1, 0, -1):
+            source = self.path.with_name(f"{self.path.name}.{index}")
+            if source.exists():
+                os.replace(source, self.path.with_name(f"{self.path.name}.{index + 1}"))
+        os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+
+    def close(self):
+        self.flush()
+        super().close()
+
 
 class GlobalLogger:
     def __init__(self):
-        self.log_file = Path("session_log.txt")
-        self.session_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.log_file = LOG_FILE
+        self.session_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}-{os.getpid()}"
+
+        flush_level = logging.getLevelName(LOG_FLUSH_LEVEL.upper())
+        self._file_handler = BufferedJsonLinesHandler(
+            self.log_file, flush_level=flush_level if isinstance(flush_level, int) else logging.WARNING
+        )
+        self._file_handler.setFormatter(JsonFormatter(self.session_id))
+        handlers = [self._file_handler]
+        if LOG_CONSOLE:
+            console = logging.StreamHandler(sys.stdout)
+            console.setFormatter(ConsoleFormatter())
+            console.addFilter(lambda record: not hasattr(record, "flush_event"))
+            handlers.append(console)
+
+        # Les appels log_* ne font que déposer l'enregistrement dans la file
+        self._queue = queue.SimpleQueue()
+        self._logger = logging.getLogger("yt_saas")
+        self._logger.setLevel(logging.DEBUG)
+        self._logger.propagate = False
+        self._logger.handlers = [QueueHandler(self._queue)]
+        self._listener = QueueListener(self._queue, *handlers)
+        self._listener.start()
+
+        self._stopped = threading.Event()
+        threading.Thread(target=self._flush_loop, name="log-flush", daemon=True).start()
+        atexit.register(self.close)
+
         self.start_new_session()
-    
+
+    def _flush_loop(self):
+        while not self._stopped.wait(LOG_FLUSH_INTERVAL):
+            self._file_handler.flush()
+
+    def flush(self, timeout: float = 1.0):
+        """Écrit immédiatement les messages en attente (y compris ceux encore dans la file)"""
+        if self._stopped.is_set():
+            return
+        done = threading.Event()
+        marker = logging.makeLogRecord({"msg": "flush", "flush_event": done})
+        self._queue.put_nowait(marker)
+        done.wait(timeout)
+
+    def close(self):
+        """Vide la file et le tampon (appelé à la sortie du processus)"""
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._listener.stop()
+        self._file_handler.close()
+
     def start_new_session(self):
-        """Démarre une nouvelle session de logs"""
-        if self.log_file.exists():
-            self.log_file.unlink()  # Supprimer l'ancien log
-        
-        self.log("=" * 80)
-        self.log(f"NOUVELLE SESSION DÉMARRÉE - {self.session_id}")
-        self.log("=" * 80)
-    
-    def log(self, message, level="INFO"):
-        """Ajoute un message au log"""
-        timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-        log_entry = f"[{timestamp}] [{level}] {message}"
-        
-        # Afficher dans la console
-        print(log_entry)
-        
-        # Écrire dans le fichier
-        with open(self.log_file, 'a', encoding='utf-8') as f:
-            f.write(log_entry + "\n")
-    
-    def log_error(self, message):
+        """Démarre une nouvelle session de logs (sans effacer celles des autres processus)"""
+        self.log(f"NOUVELLE SESSION DÉMARRÉE - {self.session_id}", event="session_start",
+                 argv=" ".join(sys.argv[:2]))
+
+    def log(self, message, level="INFO", **fields):
+        """Ajoute un message au log ; `fields` = champs structurés (video_id, duration_ms...)"""
+        levelno = logging.getLevelName(level)
+        if not isinstance(levelno, int):
+            levelno = logging.INFO
+        if os.getenv("JOB_ID") and "job_id" not in fields:
+            fields["job_id"] = os.getenv("JOB_ID")
+        self._logger.log(levelno, message, extra={"fields": {k: v for k, v in fields.items() if v is not None}})
+
+    @contextmanager
+    def timed(self, message, level="INFO", **fields):
+        """Mesure un bloc et log `message` avec duration_ms à la sortie"""
+        started = time.perf_counter()
+        try:
+            yield fields
+        finally:
+            self.log(message, level, duration_ms=round((time.perf_counter() - started) * 1000, 2), **fields)
+
+    def log_error(self, message, **fields):
         """Log une erreur"""
-        self.log(f"❌ {message}", "ERROR")
-    
-    def log_success(self, message):
+        self.log(f"❌ {message}", "ERROR", **fields)
+
+    def log_success(self, message, **fields):
         """Log un succès"""
-        self.log(f"✅ {message}", "SUCCESS")
-    
-    def log_warning(self, message):
+        self.log(f"✅ {message}", "SUCCESS", **fields)
+
+    def log_warning(self, message, **fields):
         """Log un avertissement"""
-        self.log(f"⚠️ {message}", "WARNING")
-    
-    def log_info(self, message):
+        self.log(f"⚠️ {message}", "WARNING", **fields)
+
+    def log_info(self, message, **fields):
         """Log une information"""
-        self.log(f"ℹ️ {message}", "INFO")
-    
+        self.log(f"ℹ️ {message}", "INFO", **fields)
+
     def log_api_call(self, endpoint, method, data=None):
-        """Log un appel API"""
-        self.log(f"[API] {method} {endpoint}")
+        """Log un appel API (corps compact et tronqué dans le champ data)"""
+        fields = {"event": "api", "endpoint": endpoint, "method": method}
         if data:
-            self.log(f"   Data: {json.dumps(data, ensure_ascii=False, indent=2)}")
-    
+            body = json.dumps(data, ensure_ascii=False, default=str)
+            fields["data"] = body if len(body) <= LOG_DATA_MAX_CHARS else body[:LOG_DATA_MAX_CHARS] + "…"
+        self.log(f"[API] {method} {endpoint}", **fields)
+
     def log_file_operation(self, operation, file_path, details=""):
         """Log une opération sur fichier"""
-        self.log(f"[FILE] {operation}: {file_path}")
-        if details:
-            self.log(f"   {details}")
-    
-    def log_transcription(self, video_url, status, details=""):
+        self.log(f"[FILE] {operation}: {file_path}", event="file", path=str(file_path), details=details or None)
+
+    def log_transcription(self, video_url, status, details="", **fields):
         """Log une opération de transcription"""
-        self.log(f"[TRANSCRIPTION] {status}: {video_url}")
-        if details:
-            self.log(f"   {details}")
-    
+        match = _VIDEO_ID_RE.search(video_url or "")
+        fields.setdefault("video_id", match.group(1) if match else None)
+        message = f"[TRANSCRIPTION] {status}: {video_url}" + (f" - {details}" if details else "")
+        self.log(message, event="transcription", status=status, url=video_url or None, **fields)
+
     def log_scraping(self, channel_url, video_count, status):
         """Log une opération de scraping"""
-        self.log(f"[SCRAPING] {status}: {channel_url} ({video_count} videos)")
+        self.log(f"[SCRAPING] {status}: {channel_url} ({video_count} videos)",
+                 event="scraping", status=status, channel=channel_url, video_count=video_count)
 
 # Instance globale
 logger = GlobalLogger()
@@ -0,0 +1,101 @@
+"""
+quota.py
+Quota d'essais gratuits : vérification et consommation d'un essai en une seule requête SQL
+(UPDATE conditionnel ... RETURNING), sans lecture préalable de l'utilisateur.
+Deux soumissions simultanées ne peuvent pas dépasser TRIAL_LIMIT : la condition est évaluée
+par la base au moment de l'écriture. Un essai consommé pour un job finalement refusé
+(file pleine) est rendu par refund_trial.
+
+Le statut premium est gardé en cache dans le processus (QUOTA_PREMIUM_TTL secondes) :
+un compte premium soumet sans aucun aller-retour vers la base.
+/api/admin/set-premium invalide l'entrée ; les autres processus (workers gunicorn)
+voient le changement au plus tard après le TTL.
+"""
+
+import os
+import threading
+import time
+
+from sqlalchemy import text
+
+from database import engine
+
+TRIAL_LIMIT = int(os.getenv('TRIAL_LIMIT', '3'))
+QUOTA_PREMIUM_TTL = float(os.getenv("QUOTA_PREMIUM_TTL", "60"))
+
+_premium_cache = {}  # email -> (premium, expiration monotonic)
+_premium_lock = threading.Lock()
+
+# Un essai consommé seulement pour un compte non premium sous la limite ; un compte premium
+# passe toujours (compteur inchangé). Aucune ligne retournée = refus (ou utilisateur inconnu).
+_CONSUME_SQL = text("""
+    UPDATE users
+    SET trial_count = COALESCE(trial_count, 0) + CASE WHEN COALESCE(premium, FALSE) THEN 0 ELSE 1 END
+    WHERE email = :email AND (COALESCE(premium, FALSE) OR COALESCE(trial_count, 0) < :limit)
+    RETURNING premium, trial_count
+""")
+
+_REFUND_SQL = text("""
+    UPDATE users
+    SET trial_count = trial_count - 1
+    WHERE email = :email AND NOT COALESCE(premium, FALSE) AND COALESCE(trial_count, 0) > 0
+""")
+
+
+def cached_premium(email):
+    """True/False si le statut est en cache et encore valide, sinon None"""
+    with _premium_lock:
+        entry = _premium_cache.get(email)
+        if entry is None:
+            return None
+        if entry[1] < time.monotonic():
+            del _premium_cache[email]
+            return None
+        return entry[0]
+
+
+def remember_premium(email, premium):
+    with _premium_lock:
+        _premium_cache[email] = (bool(premium), time.monotonic() + QUOTA_PREMIUM_TTL)
+
+
+def invalidate_premium(email=None):
+    """Oublie le statut d'un utilisateur (tous si email est None)"""
+    with _premium_lock:
+        if email is None:
+            _premium_cache.clear()
+        else:
+            _premium_cache.pop(email, None)
+
+
+def consume_trial(email):
+    """
+    Vérifie le quota et consomme un essai : (autorisé, message).
+    Une seule requête (aucune pour un compte premium en cache).
+    """
+    if cached_premium(email):
+        return True, "Compte premium"
+
+    with engine.begin() as conn:
+        row = conn.execute(_CONSUME_SQL, {"email": email, "limit": TRIAL_LIMIT}).first()
+        if row is None:
+            # Refus : distinguer utilisateur inconnu et limite atteinte (chemin rare, hors soumission normale)
+            exists = conn.execute(text("SELECT 1 FROM users WHERE email = :email"), {"email": email}).first()
+
+    if row is None:
+        if not exists:
+            return False, "Utilisateur non trouvé"
+        return False, f"Limite d'essais atteinte ({TRIAL_LIMIT})"
+
+    premium, trial_count = bool(row[0]), row[1]
+    remember_premium(email, premium)
+    if premium:
+        return True, "Compte premium"
+    # Message calculé comme avant la consommation de l'essai
+    return True, f"Essais restants: {TRIAL_LIMIT - (trial_count - 1)}"
+
+
+def refund_trial(email):
+    """Rend l'essai consommé par consume_trial quand le job n'a pas pu être créé (sans effet pour un premium)"""
+    with engine.begin() as conn:
+        conn.execute(_REFUND_SQL, {"email": email})
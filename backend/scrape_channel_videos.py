@@ -4,7 +4,8 @@ scrape_uploads.py
 Scrape toutes les vidéos d'une chaîne (onglet /videos).
 - Exclut les shorts
 - Inclut vidéos + lives
-- Sauvegarde dans urls.txt
+- Publie chaque vidéo et chaque titre au fil de l'eau dans scrape_feed.jsonl (append-only)
+- Sauvegarde l'instantané final dans urls.txt
 """
 
 from pathlib import Path
@@ -12,16 +13,21 @@ import sys
 import yt_dlp
 import time
 
+from events import emit
+from scrape_feed import SCRAPE_FEED_NAME, ScrapeFeedWriter
+from title_enricher import enrich_titles
+
 CHANNELS_FILE = Path("channels.txt")
 OUT_FILE = Path("urls.txt")
+FEED_FILE = Path(SCRAPE_FEED_NAME)
 
 def is_short(url: str) -> bool:
     return "/shorts/" in url
 
-def scrape_uploads(url: str, limit: int | None = None):
+def scrape_uploads(url: str, limit: int | None = None, feed: ScrapeFeedWriter | None = None):
     """
     Utilise yt-dlp pour extraire les vidéos de la playlist 'uploads' avec titres réels.
-    Version optimisée : extraction rapide + enrichissement des titres en parallèle.
+    Version optimisée : extraction rapide (titres inclus) + enrichissement concurrent des titres manquants.
     """
     videos = []
     seen = set()
@@ -64,51 +70,59 @@ def scrape_uploads(url: str, limit: int | None = None):
 
             seen.add(final_url)
             
-            # Créer l'objet vidéo avec infos basiques d'abord (RAPIDE)
+            # Créer l'objet vidéo avec le titre déjà fourni par extract_flat (RAPIDE)
+            flat_title = (e.get("title") or "").strip()
             video_data = {
                 "url": final_url,
-                "title": f"Vidéo {count + 1}",  # Titre temporaire
+                "title": flat_title or f"Vidéo {count + 1}",  # Titre temporaire si absent
+                "title_resolved": bool(flat_title),
                 "video_id": video_id,
                 "thumbnail": f"https://img.youtube.com/vi/{video_id}/mqdefault.jpg" if video_id else None
             }
             videos.append(video_data)
+            if feed:
+                feed.append_video(video_data)
+            emit("video_found", channel=url, **video_data)
 
             count += 1
             if limit and count >= limit:
                 break
 
-    # Phase 2: Enrichissement des titres en parallèle (sans bloquer)
-    print(f"[+] Enrichissement des titres pour {len(videos)} vidéos...")
-    
-    # Sauvegarder d'abord avec les titres temporaires pour l'affichage instantané
-    save_videos_to_file(videos)
+    # Phase 2: Enrichissement concurrent des seuls titres manquants
+    missing = {v["video_id"]: v for v in videos if not v["title_resolved"] and v["video_id"]}
+    print(f"[+] {len(videos) - len(missing)} titres fournis par yt-dlp, {len(missing)} à enrichir...")
     
-    for i, video in enumerate(videos):
-        try:
-            # Extraction rapide du titre depuis la page YouTube
-            title = get_video_title_fast(video["video_id"])
-            if title:
-                video["title"] = title
-                print(f"   [{i+1}/{len(videos)}] {title[:50]}...")
-            else:
-                print(f"   [{i+1}/{len(videos)}] Titre non trouvé, garde le titre temporaire")
-        except Exception as e:
-            print(f"   [{i+1}/{len(videos)}] Erreur enrichissement: {e}")
-            # Garde le titre temporaire en cas d'erreur
-        
-        # Sauvegarder après chaque enrichissement pour mise à jour en temps réel
-        save_videos_to_file(videos)
+    # Les titres arrivent au fil de l'eau, dans l'ordre de résolution
+    for i, (video_id, title) in enumerate(enrich_titles(missing), 1):
+        video = missing[video_id]
+        if title:
+            video["title"] = title
+            video["title_resolved"] = True
+            # Seul le delta est ajouté au flux (mise à jour en temps réel)
+            if feed:
+                feed.append_title(video_id, title)
+            emit("title_resolved", video_id=video_id, title=title)
+            print(f"   [{i}/{len(missing)}] {title[:50]}...")
+        else:
+            print(f"   [{i}/{len(missing)}] Titre non trouvé, garde le titre temporaire")
 
     # Enrichissement terminé
     print(f"[✓] Enrichissement terminé pour {len(videos)} vidéos")
 
     return videos
 
+# Champs internes au scraping (flux), absents de l'instantané urls.txt
+INTERNAL_FIELDS = ("title_resolved",)
+
 def save_videos_to_file(videos):
-    """Sauvegarde les vidéos dans urls.txt en JSON"""
+    """Sauvegarde l'instantané final dans urls.txt en JSON (fichier temporaire + rename atomique)"""
     import json
+    import os
     try:
-        OUT_FILE.write_text(json.dumps(videos, indent=2, ensure_ascii=False), encoding="utf-8")
+        rows = [{k: v for k, v in video.items() if k not in INTERNAL_FIELDS} for video in videos]
+        tmp_file = OUT_FILE.with_suffix(".tmp")
+        tmp_file.write_text(json.dumps(rows, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_file, OUT_FILE)
     except Exception as e:
         print(f"Erreur sauvegarde: {e}")
 
@@ -121,32 +135,6 @@ def create_completion_signal(video_count):
     except Exception as e:
         print(f"Erreur création signal: {e}")
 
-def get_video_title_fast(video_id):
-    """Récupère rapidement le titre d'une vidéo YouTube"""
-    try:
-        import requests
-        import re
-        
-        if not video_id:
-            return None
-            
-        # Utiliser l'API publique de YouTube (sans clé API)
-        url = f"https://www.youtube.com/watch?v={video_id}"
-        response = requests.get(url, timeout=3)  # Timeout court pour la rapidité
-        
-        if response.status_code == 200:
-            # Extraire le titre depuis la page HTML
-            title_match = re.search(r'<title>([^<]+)</title>', response.text)
-            if title_match:
-                title = title_match.group(1)
-                # Nettoyer le titre (enlever " - YouTube")
-                title = title.replace(' - YouTube', '').strip()
-                return title
-    except Exception as e:
-        print(f"Erreur récupération titre {video_id}: {e}")
-    
-    return None
-
 def main():
     if len(sys.argv) >= 2:
         channels = [sys.argv[1].strip()]
@@ -160,11 +148,12 @@ def main():
 
     all_videos = []
     seen = set()
+    feed = ScrapeFeedWriter(FEED_FILE)
 
     for ch in channels:
         print(f"[+] Scraping : {ch}")
         try:
-            found = scrape_uploads(ch, limit)
+            found = scrape_uploads(ch, limit, feed)
             print(f"   -> {len(found)} videos trouvees")
         except Exception as e:
             print(f"   ! Erreur : {e}")
@@ -177,16 +166,21 @@ def main():
 
         time.sleep(1.0)
 
+    feed.close()
+
     if all_videos:
-        # Les vidéos ont déjà été sauvegardées progressivement
+        # Le flux a été alimenté progressivement ; urls.txt reçoit l'instantané final
+        save_videos_to_file(all_videos)
         print(f"[OK] {len(all_videos)} video(s) avec titres reels ecrites dans {OUT_FILE.resolve()}")
         # Créer le signal de fin final
         create_completion_signal(len(all_videos))
+        emit("job_finished", kind="scrape", count=len(all_videos))
         print("[✓] Scraping et enrichissement complètement terminés")
     else:
         print("[!] Aucune video trouvee.")
         # Créer un signal de fin même si aucune vidéo
         create_completion_signal(0)
+        emit("job_finished", kind="scrape", count=0)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,165 @@
+"""
+scrape_feed.py
+Sortie incrémentale du scraping au format JSON Lines (append-only) :
+- {"type": "video", "url", "video_id", "title", "thumbnail", ...} une ligne par vidéo trouvée
+- {"type": "title", "video_id", "title"} une ligne par titre enrichi
+Le writer n'ajoute que le delta ; les lecteurs reprennent depuis un offset en octets.
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+
+SCRAPE_FEED_NAME = "scrape_feed.jsonl"
+
+
+class ScrapeFeedWriter:
+    """Ajoute des enregistrements en fin de fichier (une seule écriture O_APPEND par ligne)"""
+
+    def __init__(self, path: Path, reset: bool = True):
+        self.path = Path(path)
+        if reset and self.path.exists():
+            self.path.unlink()
+        self._fd = os.open(str(self.path), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self._lock = threading.Lock()
+
+    def _append(self, record: dict):
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            os.write(self._fd, line)
+
+    def append_video(self, video: dict):
+        self._append({"type": "video", **video})
+
+    def append_title(self, video_id: str, title: str):
+        self._append({"type": "title", "video_id": video_id, "title": title})
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def read_feed(path: Path, offset: int = 0):
+    """
+    Lit les enregistrements complets à partir de `offset`.
+    Retourne (records, new_offset) ; une ligne en cours d'écriture est laissée pour le prochain appel.
+    """
+    records = []
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            chunk = f.read()
+    except OSError:
+        return records, offset
+
+    end = chunk.rfind(b"\n")
+    if end < 0:
+        return records, offset
+
+    for raw in chunk[:end].split(b"\n"):
+        if not raw.strip():
+            continue
+        try:
+            records.append(json.loads(raw))
+        except ValueError:
+            continue
+    return records, offset + end + 1
+
+
+class ScrapeFeedState:
+    """
+    Vue matérialisée du flux, mise à jour en ne lisant que le delta depuis le dernier offset.
+    Si le fichier a été recréé (nouveau scraping), l'état est reconstruit depuis zéro.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.offset = 0
+        self.inode = None
+        self.videos = {}   # video_id/url -> vidéo, dans l'ordre de découverte
+        self.updated = {}  # video_id/url -> seq de la dernière modification
+        self.seq = 0       # nombre d'enregistrements appliqués
+        self._lock = threading.Lock()
+
+    def _reset(self, inode=None):
+        self.offset = 0
+        self.inode = inode
+        self.videos = {}
+        self.updated = {}
+        self.seq = 0
+
+    def refresh(self) -> list:
+        """Applique les nouveaux enregistrements ; retourne ceux qui viennent d'être lus"""
+        with self._lock:
+            try:
+                st = self.path.stat()
+            except OSError:
+                if self.inode is not None or self.videos:
+                    self._reset()
+                return []
+
+            if st.st_ino != self.inode or st.st_size < self.offset:
+                self._reset(st.st_ino)
+
+            if st.st_size == self.offset:
+                return []
+
+            records, self.offset = read_feed(self.path, self.offset)
+            for record in records:
+                self._apply(record)
+            return records
+
+    def _apply(self, record: dict):
+        self.seq += 1
+        kind = record.get("type")
+        if kind == "video":
+            key = record.get("video_id") or record.get("url")
+            video = {k: v for k, v in record.items() if k != "type"}
+            self.videos[key] = video
+            self.updated[key] = self.seq
+        elif kind == "title":
+            key = record.get("video_id")
+            video = self.videos.get(key)
+            if video is not None:
+                video["title"] = record.get("title")
+                video["title_resolved"] = True
+                self.updated[key] = self.seq
+
+    def snapshot(self) -> list:
+        with self._lock:
+            return [dict(v) for v in self.videos.values()]
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self.videos)
+
+    def cursor(self) -> str:
+        """Curseur opaque "<inode>:<seq>" ; l'inode invalide les curseurs d'un ancien scraping"""
+        with self._lock:
+            return f"{self.inode or 0}:{self.seq}"
+
+    def changes_since(self, cursor: str):
+        """
+        Retourne (vidéos nouvelles ou modifiées depuis `cursor`, reset).
+        reset=True quand le curseur vient d'un autre fichier : la liste complète est renvoyée.
+        """
+        with self._lock:
+            try:
+                inode, seq = (int(part) for part in str(cursor).split(":", 1))
+            except ValueError:
+                inode, seq = None, 0
+            if inode != (self.inode or 0) or seq > self.seq:
+                return [dict(v) for v in self.videos.values()], True
+            return [
+                dict(self.videos[key])
+                for key, updated in self.updated.items()
+                if updated > seq
+            ], False
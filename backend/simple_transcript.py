@@ -19,8 +19,14 @@ except ImportError:
     print("Erreur: yt-dlp non installé. Installez avec: pip install yt-dlp")
     sys.exit(1)
 
-OUT_DIR = Path("transcripts")
-OUT_DIR.mkdir(exist_ok=True)
+from captions import pick_caption_track, caption_to_text
+from events import emit
+from transcript_store import display_name, reuse_stored, save_transcript, transcript_filename
+from transcribe_engine import parse_workers_arg, run_workers, site_slot
+from video_metadata import get_video_metadata
+
+OUT_DIR = Path(os.getenv("TRANSCRIPTS_DIR", "transcripts"))
+OUT_DIR.mkdir(parents=True, exist_ok=True)
 
 URLS_FILE = Path("urls.txt")
 
@@ -30,30 +36,31 @@ def get_video_id(url):
     return video_id_match.group(1) if video_id_match else None
 
 def get_video_info(url):
-    """Récupère les infos vidéo via yt-dlp"""
-    ydl_opts = {
-        "quiet": True,
-        "skip_download": True,
-        "writesubtitles": True,
-        "writeautomaticsub": True,
-        "subtitleslangs": ["fr", "en"],
-        "subtitlesformat": "vtt"
-    }
-    
-    try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
-            return {
-                "id": info.get("id"),
-                "title": info.get("title"),
-                "subtitles": info.get("subtitles", {}),
-                "automatic_captions": info.get("automatic_captions", {})
-            }
-    except Exception as e:
-        print(f"Erreur yt-dlp: {e}")
+    """Récupère les infos vidéo via yt-dlp (une seule extraction par vidéo, mise en cache)"""
+    record = get_video_metadata(url)
+    if not record:
         return None
+    return {
+        "id": record.get("id"),
+        "title": record.get("title"),
+        "subtitles": record.get("subtitles", {}),
+        "automatic_captions": record.get("automatic_captions", {})
+    }
+
+def safe_filename(title):
+    """Nettoie le titre pour le nom de fichier (longueur limitée)"""
+    return re.sub(r'[\\/*?:"<>|]', '_', title)[:100]
 
-def download_subtitle(subtitle_url, video_title, video_url):
+def make_header(video_title, video_url):
+    """En-tête de cette exécution (fichier annexe du job, hors objet partagé)"""
+    return (
+        f"TITRE: {video_title}\n"
+        f"URL: {video_url}\n"
+        f"DATE: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+        + "=" * 80 + "\n\n"
+    )
+
+def download_subtitle(subtitle_url, video_title, video_url, video_id=None, language=None):
     """Télécharge et convertit un sous-titre en format texte propre"""
     try:
         import requests
@@ -66,59 +73,27 @@ def download_subtitle(subtitle_url, video_title, video_url):
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
         
-        response = requests.get(subtitle_url, timeout=15, headers=headers)
+        with site_slot(subtitle_url):
+            response = requests.get(subtitle_url, timeout=15, headers=headers)
         if response.status_code == 200:
             vtt_content = response.text
             logger.log_transcription(video_url, "VTT_RÉCUPÉRÉ", f"Taille: {len(vtt_content)} caractères")
             
-            # Extraire seulement le texte des sous-titres (format JSON)
-            try:
-                import json
-                data = json.loads(vtt_content)
-                
-                # Extraire le texte des segments
-                text_parts = []
-                if 'events' in data:
-                    for event in data['events']:
-                        if 'segs' in event:
-                            for seg in event['segs']:
-                                if 'utf8' in seg:
-                                    text_parts.append(seg['utf8'])
-                
-                # Joindre et nettoyer le texte
-                clean_text = ' '.join(text_parts)
-                clean_text = re.sub(r'\s+', ' ', clean_text).strip()
-                
-                logger.log_transcription(video_url, "TEXTE_EXTRAIT", f"Longueur: {len(clean_text)} caractères")
-                
-            except json.JSONDecodeError:
-                # Fallback: traitement VTT classique
-                logger.log_warning(f"Format VTT détecté pour {video_url}, conversion...")
-                clean_text = re.sub(r'<[^>]+>', '', vtt_content)
-                clean_text = re.sub(r'^\d+$', '', clean_text, flags=re.MULTILINE)
-                clean_text = re.sub(r'^\d{2}:\d{2}:\d{2}\.\d{3} --> \d{2}:\d{2}:\d{2}\.\d{3}$', '', clean_text, flags=re.MULTILINE)
-                clean_text = re.sub(r'^WEBVTT$', '', clean_text, flags=re.MULTILINE)
-                clean_text = re.sub(r'^\s*$', '', clean_text, flags=re.MULTILINE)
-                clean_text = re.sub(r'\s+', ' ', clean_text).strip()
+            # Extraire seulement le texte des sous-titres (json3, ou VTT en fallback)
+            clean_text = caption_to_text(vtt_content)
+            logger.log_transcription(video_url, "TEXTE_EXTRAIT", f"Longueur: {len(clean_text)} caractères")
             
             if not clean_text:
                 logger.log_error(f"Aucun texte extrait pour {video_url}")
                 return None
             
-            # Nettoyer le titre pour le nom de fichier
-            safe_title = re.sub(r'[\\/*?:"<>|]', '_', video_title)
-            safe_title = safe_title[:100]  # Limiter la longueur
-            
-            # Sauvegarder en format propre
-            file_path = OUT_DIR / f"{safe_title}.txt"
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(f"TITRE: {video_title}\n")
-                f.write(f"URL: {video_url}\n")
-                f.write(f"DATE: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                f.write("=" * 80 + "\n\n")
-                f.write(clean_text)
+            # Sauvegarder en format propre (magasin partagé par ID vidéo + langue, puis catalogue)
+            file_path = OUT_DIR / transcript_filename(safe_filename(video_title), video_id)
+            file_path = save_transcript(file_path, make_header(video_title, video_url), clean_text, url=video_url, title=video_title,
+                                        video_id=video_id, language=language, source="captions")
             
             logger.log_transcription(video_url, "SAUVEGARDÉ", f"Fichier: {file_path}")
+            emit("transcript_saved", url=video_url, title=video_title, file=display_name(file_path))
             return file_path
         else:
             logger.log_error(f"Erreur HTTP {response.status_code} pour {video_url}")
@@ -151,31 +126,17 @@ def process_video(url):
     subtitles = info.get("subtitles", {})
     auto_captions = info.get("automatic_captions", {})
     
-    # Priorité: sous-titres manuels français, puis anglais, puis auto-captions
-    subtitle_url = None
-    lang = None
-    
-    if "fr" in subtitles:
-        subtitle_url = subtitles["fr"][0]["url"]
-        lang = "français"
-    elif "en" in subtitles:
-        subtitle_url = subtitles["en"][0]["url"]
-        lang = "anglais"
-    elif "fr" in auto_captions:
-        subtitle_url = auto_captions["fr"][0]["url"]
-        lang = "français (auto)"
-    elif "en" in auto_captions:
-        subtitle_url = auto_captions["en"][0]["url"]
-        lang = "anglais (auto)"
-    
-    if not subtitle_url:
+    # Priorité: sous-titres manuels français, puis anglais, puis auto-captions (json3 puis vtt)
+    track = pick_caption_track(subtitles, auto_captions)
+    if not track:
         print(f"  ❌ Aucun sous-titre disponible")
         return False
     
-    print(f"  📝 Sous-titre trouvé ({lang})")
+    lang = f"{track['lang']} (auto)" if track["auto"] else track["lang"]
+    print(f"  📝 Sous-titre trouvé ({lang}, {track['ext']})")
     
     # Télécharger et sauvegarder
-    file_path = download_subtitle(subtitle_url, title, url)
+    file_path = download_subtitle(track["url"], title, url, video_id=video_id, language=track["lang"])
     if file_path:
         print(f"  ✅ Sauvegardé: {file_path}")
         return True
@@ -197,27 +158,40 @@ def main():
         logger.log_error("Aucune URL trouvée dans urls.txt")
         return
     
-    logger.log_info(f"Traitement de {len(urls)} vidéo(s)")
-    print(f"🎬 Traitement de {len(urls)} vidéo(s)")
+    # Vidéos déjà transcrites (magasin partagé) : reliées au job sans aucun accès réseau
+    total = len(urls)
+    urls, reused = reuse_stored(urls, OUT_DIR, safe_filename, make_header)
+    for url, path in reused:
+        emit("transcript_saved", url=url, file=display_name(path), cached=True)
+    if reused:
+        print(f"♻️ {len(reused)} vidéo(s) déjà transcrite(s), réutilisée(s)")
+    
+    workers = parse_workers_arg(sys.argv[1:])
+    logger.log_info(f"Traitement de {len(urls)} vidéo(s) avec {workers} worker(s)")
+    print(f"🎬 Traitement de {len(urls)} vidéo(s) avec {workers} worker(s)")
     
-    success_count = 0
-    for i, url in enumerate(urls, 1):
+    def handle(_ctx, item):
+        i, url = item
         logger.log_transcription(url, "DÉBUT", f"Vidéo {i}/{len(urls)}")
         print(f"\n[{i}/{len(urls)}] {url}")
         if process_video(url):
-            success_count += 1
             logger.log_transcription(url, "SUCCÈS", "Transcription terminée")
-        else:
-            logger.log_transcription(url, "ÉCHEC", "Transcription échouée")
+            return True
+        logger.log_transcription(url, "ÉCHEC", "Transcription échouée")
+        return False
+    
+    results = run_workers(list(enumerate(urls, 1)), handle, workers)
+    success_count = sum(1 for r in results if r) + len(reused)
     
-    logger.log_success(f"Terminé: {success_count}/{len(urls)} vidéos transcrites")
-    print(f"\n✅ Terminé: {success_count}/{len(urls)} vidéos transcrites")
+    logger.log_success(f"Terminé: {success_count}/{total} vidéos transcrites ({len(reused)} réutilisées)")
+    print(f"\n✅ Terminé: {success_count}/{total} vidéos transcrites ({len(reused)} réutilisées)")
     
     # Créer un fichier de signal de fin pour le frontend
     completion_file = Path("transcription_completed.txt")
     with open(completion_file, 'w', encoding='utf-8') as f:
-        f.write(f"completed:{success_count}:{len(urls)}")
+        f.write(f"completed:{success_count}:{total}")
     logger.log_info(f"Signal de fin créé: {completion_file}")
+    emit("job_finished", kind="transcribe", success_count=success_count, total_count=total, reused=len(reused))
 
 if __name__ == "__main__":
     main()
@@ -16,6 +16,7 @@ CREATE TABLE IF NOT EXISTS public.users (
 CREATE INDEX IF NOT EXISTS idx_users_email ON public.users(email);
 CREATE INDEX IF NOT EXISTS idx_users_premium ON public.users(premium);
 CREATE INDEX IF NOT EXISTS idx_users_created_at ON public.users(created_at);
+CREATE INDEX IF NOT EXISTS ix_users_created_at_id ON public.users(created_at, id);  -- liste admin paginée (keyset)
 
 -- Fonction pour mettre à jour automatiquement updated_at
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -32,6 +33,88 @@ CREATE TRIGGER update_users_updated_at
     FOR EACH ROW 
     EXECUTE FUNCTION update_updated_at_column();
 
+-- Registre des jobs de scraping / transcription (un dossier de travail isolé par job)
+CREATE TABLE IF NOT EXISTS public.jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    owner TEXT,
+    state TEXT NOT NULL DEFAULT 'queued',
+    workdir TEXT NOT NULL,
+    pid INTEGER,
+    attempts INTEGER DEFAULT 0,
+    max_attempts INTEGER DEFAULT 3,
+    available_at TIMESTAMP DEFAULT NOW(),
+    lease_owner TEXT,
+    lease_expires_at TIMESTAMP,
+    params TEXT,
+    result TEXT,
+    error TEXT,
+    created_at TIMESTAMP DEFAULT NOW(),
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_kind_created_at ON public.jobs(kind, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_jobs_owner ON public.jobs(owner);
+CREATE INDEX IF NOT EXISTS idx_jobs_state ON public.jobs(state);
+-- Prise de bail par worker.py : SELECT ... FOR UPDATE SKIP LOCKED sur (state, available_at)
+CREATE INDEX IF NOT EXISTS idx_jobs_state_available_at ON public.jobs(state, available_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_lease_expires_at ON public.jobs(lease_expires_at);
+
+-- Cache persistant des titres YouTube (title_cache.py) ; title NULL = introuvable, retenté plus tard
+CREATE TABLE IF NOT EXISTS public.video_titles (
+    video_id TEXT PRIMARY KEY,
+    title TEXT,
+    fetched_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Catalogue des transcriptions (transcript_catalog.py), écrit à chaque sauvegarde
+CREATE TABLE IF NOT EXISTS public.transcripts (
+    id SERIAL PRIMARY KEY,
+    job_id TEXT,
+    video_id VARCHAR(16),
+    url TEXT,
+    title TEXT,
+    language VARCHAR(16),
+    source VARCHAR(32),
+    name TEXT NOT NULL,
+    storage_path TEXT NOT NULL UNIQUE,
+    size INTEGER DEFAULT 0,
+    word_count INTEGER DEFAULT 0,
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Liste paginée par job (keyset sur id)
+CREATE INDEX IF NOT EXISTS ix_transcripts_job_id_id ON public.transcripts(job_id, id);
+CREATE INDEX IF NOT EXISTS ix_transcripts_video_id ON public.transcripts(video_id);
+
+-- Recherche plein texte (transcript_search.py) : tsvector généré + index GIN
+CREATE TABLE IF NOT EXISTS public.transcript_search (
+    transcript_id INTEGER PRIMARY KEY,
+    title TEXT,
+    body TEXT NOT NULL,
+    tsv tsvector GENERATED ALWAYS AS (
+        to_tsvector('simple', left(coalesce(title, '') || ' ' || body, 500000))
+    ) STORED
+);
+CREATE INDEX IF NOT EXISTS ix_transcript_search_tsv ON public.transcript_search USING GIN (tsv);
+
+-- Magasin de transcriptions adressé par contenu (transcript_store.py), partagé entre les jobs
+CREATE TABLE IF NOT EXISTS public.transcript_store (
+    video_id VARCHAR(16) NOT NULL,
+    language VARCHAR(16) NOT NULL,
+    content_hash VARCHAR(64) NOT NULL,
+    title TEXT,
+    url TEXT,
+    source VARCHAR(32),
+    size INTEGER DEFAULT 0,
+    word_count INTEGER DEFAULT 0,
+    created_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (video_id, language)
+);
+CREATE INDEX IF NOT EXISTS ix_transcript_store_content_hash ON public.transcript_store(content_hash);
+
 -- Politique RLS (Row Level Security) - optionnel pour la sécurité
 -- ALTER TABLE public.users ENABLE ROW LEVEL SECURITY;
 
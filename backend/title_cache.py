@@ -0,0 +1,191 @@
+"""
+title_cache.py
+Service de résolution des titres YouTube pour l'API :
+LRU en mémoire, cache persistant en base (table video_titles, clé = ID vidéo)
+et résolution des titres manquants par lots, en arrière-plan, via title_enricher.
+Une vidéo déjà vue ne repasse jamais par le réseau.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, DateTime, String, Text
+
+from database import Base, SessionLocal
+from events import emit
+from title_enricher import enrich_titles
+
+TITLE_LRU_SIZE = int(os.getenv("TITLE_LRU_SIZE", "10000"))
+TITLE_MISS_TTL = int(os.getenv("TITLE_MISS_TTL", "3600"))  # délai avant de retenter un titre introuvable
+TITLE_BATCH_SIZE = int(os.getenv("TITLE_BATCH_SIZE", "50"))
+TITLE_MAX_WAIT = float(os.getenv("TITLE_MAX_WAIT", "10"))  # attente max en mode synchrone (?wait=)
+
+_QUERY_CHUNK = 500  # taille des IN (...) vers la base
+
+
+class VideoTitle(Base):
+    __tablename__ = "video_titles"
+
+    video_id = Column(String(16), primary_key=True)
+    title = Column(Text, nullable=True)  # NULL = titre introuvable (retenté après TITLE_MISS_TTL)
+    fetched_at = Column(DateTime, default=datetime.utcnow)
+
+
+class _LRU:
+    """Dictionnaire borné, thread-safe : video_id -> (titre, horodatage)"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+
+
+_lru = _LRU(TITLE_LRU_SIZE)
+_inflight = {}  # video_id -> Event du lot qui le résout
+_inflight_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="title-batch")
+
+
+def _is_known(entry) -> bool:
+    """Titre connu, ou échec encore récent (pas de nouvelle requête avant TITLE_MISS_TTL)"""
+    title, fetched_at = entry
+    return title is not None or time.time() - fetched_at < TITLE_MISS_TTL
+
+
+def _lookup(video_ids) -> dict:
+    """video_id -> (titre, horodatage) depuis le LRU puis la base (requêtes groupées)"""
+    found = {}
+    missing = []
+    for video_id in video_ids:
+        entry = _lru.get(video_id)
+        if entry is not None:
+            found[video_id] = entry
+        else:
+            missing.append(video_id)
+
+    if missing:
+        db = SessionLocal()
+        try:
+            for start in range(0, len(missing), _QUERY_CHUNK):
+                chunk = missing[start:start + _QUERY_CHUNK]
+                rows = db.query(VideoTitle.video_id, VideoTitle.title, VideoTitle.fetched_at) \
+                    .filter(VideoTitle.video_id.in_(chunk)).all()
+                for video_id, title, fetched_at in rows:
+                    # fetched_at est stocké en UTC naïf (datetime.utcnow)
+                    entry = (title, fetched_at.replace(tzinfo=timezone.utc).timestamp() if fetched_at else 0.0)
+                    _lru.put(video_id, entry)
+                    found[video_id] = entry
+        except Exception as e:
+            print(f"Erreur lecture cache titres: {e}")
+        finally:
+            db.close()
+    return found
+
+
+def remember_titles(titles: dict):
+    """Enregistre des titres (None = introuvable) dans le LRU et en base"""
+    titles = {video_id: title for video_id, title in titles.items() if video_id}
+    if not titles:
+        return
+    now = datetime.utcnow()
+    for video_id, title in titles.items():
+        _lru.put(video_id, (title, time.time()))
+
+    db = SessionLocal()
+    try:
+        ids = list(titles)
+        for start in range(0, len(ids), _QUERY_CHUNK):
+            chunk = ids[start:start + _QUERY_CHUNK]
+            existing = {
+                row.video_id: row
+                for row in db.query(VideoTitle).filter(VideoTitle.video_id.in_(chunk)).all()
+            }
+            for video_id in chunk:
+                row = existing.get(video_id)
+                if row is None:
+                    db.add(VideoTitle(video_id=video_id, title=titles[video_id], fetched_at=now))
+                elif titles[video_id] or not row.title:
+                    # Un échec ponctuel n'efface pas un titre déjà connu
+                    row.title = titles[video_id]
+                    row.fetched_at = now
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Erreur écriture cache titres: {e}")
+    finally:
+        db.close()
+
+
+def _resolve_batch(video_ids, done: threading.Event, job_id=None):
+    """Résout un lot en parallèle, publie chaque titre en SSE puis persiste le lot"""
+    resolved = {}
+    try:
+        for video_id, title in enrich_titles(video_ids):
+            resolved[video_id] = title
+            # Visible tout de suite pour les requêtes suivantes (la base est écrite en fin de lot)
+            _lru.put(video_id, (title, time.time()))
+            if title:
+                emit("title_resolved", video_id=video_id, title=title, **({"job_id": job_id} if job_id else {}))
+        remember_titles(resolved)
+    except Exception as e:
+        print(f"Erreur résolution des titres: {e}")
+    finally:
+        with _inflight_lock:
+            for video_id in video_ids:
+                if _inflight.get(video_id) is done:
+                    del _inflight[video_id]
+        done.set()
+
+
+def resolve_titles(video_ids, wait: float = 0, job_id: str = None) -> dict:
+    """
+    Retourne immédiatement les titres en cache (video_id -> titre, None si introuvable) et lance la résolution
+    des manquants en arrière-plan (événements title_resolved rattachés à `job_id`).
+    Avec `wait` > 0, attend au plus `wait` secondes la fin des lots (mode synchrone).
+    """
+    video_ids = [v for v in dict.fromkeys(video_ids) if v]
+    known = _lookup(video_ids)
+    missing = [video_id for video_id in video_ids if video_id not in known or not _is_known(known[video_id])]
+
+    pending = []
+    with _inflight_lock:
+        to_fetch = []
+        for video_id in missing:
+            if video_id in _inflight:
+                pending.append(_inflight[video_id])
+            else:
+                to_fetch.append(video_id)
+        for start in range(0, len(to_fetch), TITLE_BATCH_SIZE):
+            batch = to_fetch[start:start + TITLE_BATCH_SIZE]
+            done = threading.Event()
+            for video_id in batch:
+                _inflight[video_id] = done
+            pending.append(done)
+            _executor.submit(_resolve_batch, batch, done, job_id)
+
+    if wait > 0 and pending:
+        deadline = time.monotonic() + min(wait, TITLE_MAX_WAIT)
+        for done in dict.fromkeys(pending):
+            if not done.wait(max(0.0, deadline - time.monotonic())):
+                break
+        known = _lookup(video_ids)
+
+    return {video_id: entry[0] for video_id, entry in known.items() if _is_known(entry)}
@@ -0,0 +1,98 @@
+"""
+title_enricher.py
+Enrichissement concurrent des titres YouTube :
+session HTTP keep-alive partagée, concurrence bornée et limitation de débit par hôte.
+Les titres sont rendus au fil de l'eau, dès qu'ils sont résolus.
+"""
+
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+TITLE_CONCURRENCY = int(os.getenv("TITLE_CONCURRENCY", "8"))
+TITLE_RATE_PER_HOST = float(os.getenv("TITLE_RATE_PER_HOST", "10"))  # requêtes / seconde
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept-Language': 'fr-FR,fr;q=0.9,en;q=0.8',
+}
+
+
+class HostRateLimiter:
+    """Espace les requêtes vers un même hôte (au plus `rate` par seconde)"""
+
+    def __init__(self, rate: float = TITLE_RATE_PER_HOST):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url: str):
+        if not self.interval:
+            return
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+def make_session(pool_size: int = TITLE_CONCURRENCY) -> requests.Session:
+    """Session keep-alive avec un pool de connexions dimensionné sur la concurrence"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(HEADERS)
+    return session
+
+
+def fetch_title(session: requests.Session, video_id: str, timeout: int = 5, limiter: HostRateLimiter = None):
+    """Récupère le titre d'une vidéo depuis sa page YouTube (None si introuvable)"""
+    if not video_id:
+        return None
+    url = f"https://www.youtube.com/watch?v={video_id}"
+    if limiter:
+        limiter.wait(url)
+    try:
+        response = session.get(url, timeout=timeout)
+        if response.status_code == 200:
+            # Extraire le titre depuis la page HTML
+            title_match = re.search(r'<title>([^<]+)</title>', response.text)
+            if title_match:
+                # Nettoyer le titre (enlever " - YouTube")
+                title = title_match.group(1).replace(' - YouTube', '').strip()
+                return title or None
+    except Exception as e:
+        print(f"Erreur récupération titre {video_id}: {e}")
+    return None
+
+
+def enrich_titles(video_ids, concurrency: int = TITLE_CONCURRENCY,
+                  rate_per_host: float = TITLE_RATE_PER_HOST, timeout: int = 5):
+    """
+    Résout les titres en parallèle et les rend au fil de l'eau : génère des (video_id, title).
+    `title` vaut None quand la page n'a pas pu être lue.
+    """
+    video_ids = [v for v in dict.fromkeys(video_ids) if v]
+    if not video_ids:
+        return
+
+    limiter = HostRateLimiter(rate_per_host)
+    workers = max(1, min(concurrency, len(video_ids)))
+    with make_session(workers) as session:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="title") as executor:
+            futures = {
+                executor.submit(fetch_title, session, video_id, timeout, limiter): video_id
+                for video_id in video_ids
+            }
+            for future in as_completed(futures):
+                yield futures[future], future.result()
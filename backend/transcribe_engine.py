@@ -0,0 +1,88 @@
+"""
+transcribe_engine.py
+Moteur de transcription concurrent : N workers traitent les vidéos en parallèle,
+avec un plafond de requêtes simultanées par site et des résultats rendus dans l'ordre d'entrée.
+"""
+
+import os
+import queue
+import threading
+from contextlib import contextmanager, nullcontext
+from urllib.parse import urlparse
+
+TRANSCRIBE_WORKERS = int(os.getenv("TRANSCRIBE_WORKERS", "2"))
+SITE_CONCURRENCY = int(os.getenv("SITE_CONCURRENCY", "2"))
+
+_site_semaphores = {}
+_site_lock = threading.Lock()
+
+
+def parse_workers_arg(argv, default: int = TRANSCRIBE_WORKERS) -> int:
+    """Lit `--workers N` (ou `--workers=N`) dans argv, sinon TRANSCRIBE_WORKERS"""
+    workers = default
+    for i, arg in enumerate(argv):
+        value = None
+        if arg == "--workers" and i + 1 < len(argv):
+            value = argv[i + 1]
+        elif arg.startswith("--workers="):
+            value = arg.split("=", 1)[1]
+        if value is not None and value.isdigit():
+            workers = int(value)
+    return max(1, workers)
+
+
+@contextmanager
+def site_slot(site: str):
+    """Limite le nombre de requêtes simultanées vers un même site"""
+    host = urlparse(site).netloc or site
+    with _site_lock:
+        sem = _site_semaphores.get(host)
+        if sem is None:
+            sem = threading.BoundedSemaphore(max(1, SITE_CONCURRENCY))
+            _site_semaphores[host] = sem
+    with sem:
+        yield
+
+
+def run_workers(items, handler, workers: int = TRANSCRIBE_WORKERS, worker_context=None):
+    """
+    Exécute handler(ctx, item) sur chaque élément avec `workers` threads.
+    `worker_context` est une fabrique de context manager appelée une fois par thread
+    (ex: sync_playwright + pool de navigateurs, qui ne peuvent pas changer de thread).
+    Retourne la liste des résultats dans l'ordre des éléments (None en cas d'erreur).
+    """
+    items = list(items)
+    results = [None] * len(items)
+    if not items:
+        return results
+
+    tasks = queue.Queue()
+    for index, item in enumerate(items):
+        tasks.put((index, item))
+
+    def worker():
+        factory = worker_context or nullcontext
+        try:
+            with factory() as ctx:
+                while True:
+                    try:
+                        index, item = tasks.get_nowait()
+                    except queue.Empty:
+                        return
+                    try:
+                        results[index] = handler(ctx, item)
+                    except Exception as e:
+                        print(f"Erreur worker sur {item}: {e}")
+        except Exception as e:
+            print(f"Erreur initialisation worker {threading.current_thread().name}: {e}")
+
+    threads = [
+        threading.Thread(target=worker, name=f"transcribe-worker-{n + 1}", daemon=True)
+        for n in range(max(1, min(workers, len(items))))
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    return results
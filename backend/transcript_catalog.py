@@ -0,0 +1,201 @@
+"""
+transcript_catalog.py
+Catalogue des transcriptions en base (table transcripts) : une ligne par fichier sauvegardé,
+écrite par save_txt / download_subtitle au moment de l'écriture.
+Les endpoints de liste et de statut lisent ce catalogue (requêtes indexées, paginées)
+au lieu de parcourir transcripts/ avec glob() + stat() à chaque appel.
+
+Réindexer un dossier existant : python transcript_catalog.py <dossier> [job_id]
+"""
+
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import Column, DateTime, Index, Integer, String, Text
+
+from database import Base, SessionLocal, missing_tables
+from transcript_search import index_transcript, unindex_transcripts
+
+TRANSCRIPTS_PAGE_SIZE = int(os.getenv("TRANSCRIPTS_PAGE_SIZE", "100"))
+TRANSCRIPTS_PAGE_MAX = 500
+
+
+class Transcript(Base):
+    __tablename__ = "transcripts"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    job_id = Column(String)  # NULL = exécution hors file de jobs
+    video_id = Column(String(16), index=True)
+    url = Column(Text)
+    title = Column(Text)
+    language = Column(String(16))
+    source = Column(String(32))  # captions, site externe...
+    name = Column(String, nullable=False)
+    storage_path = Column(Text, nullable=False, unique=True)
+    size = Column(Integer, default=0)
+    word_count = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Liste paginée d'un job (keyset sur id)
+        Index("ix_transcripts_job_id_id", "job_id", "id"),
+    )
+
+
+def transcript_to_dict(row: Transcript) -> dict:
+    return {
+        "id": row.id,
+        "name": row.name,
+        "path": f"transcripts/{row.name}",  # relatif au dossier du job (cf. /api/transcripts/content)
+        "size": row.size,
+        "modified": row.created_at.timestamp() if row.created_at else None,
+        "video_id": row.video_id,
+        "url": row.url,
+        "title": row.title,
+        "language": row.language,
+        "source": row.source,
+        "word_count": row.word_count,
+        "job_id": row.job_id,
+    }
+
+
+def record_transcript(path, text: str, url: str = None, title: str = None, video_id: str = None,
+                      language: str = None, source: str = None, job_id: str = None):
+    """
+    Enregistre (ou met à jour) le fichier sauvegardé dans le catalogue et l'index plein texte.
+    Une erreur de base n'empêche jamais la transcription : le fichier est déjà écrit.
+    """
+    path = Path(path).resolve()
+    fields = {
+        "job_id": job_id or os.getenv("JOB_ID"),
+        "video_id": video_id,
+        "url": url,
+        "title": title,
+        "language": language,
+        "source": source,
+        # Nom présenté sans l'extension de stockage .gz (cf. transcript_store)
+        "name": path.name[:-3] if path.name.endswith(".gz") else path.name,
+        "size": path.stat().st_size if path.exists() else len(text.encode("utf-8")),
+        "word_count": len(text.split()),
+        "created_at": datetime.utcnow(),
+    }
+    db = SessionLocal()
+    try:
+        row = db.query(Transcript).filter(Transcript.storage_path == str(path)).first()
+        if row is None:
+            row = Transcript(storage_path=str(path), **fields)
+            db.add(row)
+        else:
+            # Même fichier réécrit (titre identique) : la ligne suit le contenu
+            for key, value in fields.items():
+                setattr(row, key, value)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        db.close()
+        print(f"Erreur catalogue transcriptions ({path.name}): {e}")
+        return
+
+    try:
+        index_transcript(db, row.id, title, text)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Erreur index de recherche ({path.name}): {e}")
+    finally:
+        db.close()
+
+
+def _job_filter(query, job_id):
+    if job_id:
+        return query.filter(Transcript.job_id == job_id)
+    return query.filter(Transcript.job_id.is_(None))
+
+
+def list_transcripts(job_id: str = None, after: int = None, limit: int = TRANSCRIPTS_PAGE_SIZE):
+    """Page de transcriptions d'un job, dans l'ordre d'écriture : (lignes, curseur suivant ou None)"""
+    limit = max(1, min(limit, TRANSCRIPTS_PAGE_MAX))
+    db = SessionLocal()
+    try:
+        query = _job_filter(db.query(Transcript), job_id)
+        if after:
+            query = query.filter(Transcript.id > after)
+        rows = query.order_by(Transcript.id).limit(limit + 1).all()
+        next_cursor = rows[limit - 1].id if len(rows) > limit else None
+        return [transcript_to_dict(row) for row in rows[:limit]], next_cursor
+    finally:
+        db.close()
+
+
+def count_transcripts(job_id: str = None, all_jobs: bool = False) -> int:
+    db = SessionLocal()
+    try:
+        query = db.query(Transcript)
+        if not all_jobs:
+            query = _job_filter(query, job_id)
+        return query.count()
+    finally:
+        db.close()
+
+
+def recent_transcript_names(job_id: str = None, limit: int = 50) -> list:
+    """Noms des derniers fichiers d'un job (statut de transcription)"""
+    db = SessionLocal()
+    try:
+        query = _job_filter(db.query(Transcript.name), job_id)
+        return [name for (name,) in query.order_by(Transcript.id.desc()).limit(limit)]
+    finally:
+        db.close()
+
+
+def delete_transcripts(job_id: str = None) -> int:
+    """Retire du catalogue les transcriptions d'un job (après suppression des fichiers)"""
+    db = SessionLocal()
+    try:
+        ids = [transcript_id for (transcript_id,) in _job_filter(db.query(Transcript.id), job_id)]
+        unindex_transcripts(db, ids)
+        deleted = _job_filter(db.query(Transcript), job_id).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+    finally:
+        db.close()
+
+
+def reindex_directory(directory, job_id: str = None) -> int:
+    """
+    Catalogue les transcriptions d'un dossier écrit avant l'introduction du catalogue :
+    .txt (anciens fichiers) et .txt.gz (magasin compressé, métadonnées lues dans l'en-tête gzip).
+    Un .txt.gz remplace le .txt de même nom.
+    """
+    from transcript_store import GZIP_SUFFIX, read_metadata, read_transcript  # import circulaire (store -> catalogue)
+    directory = Path(directory)
+    files = {file_path.name: file_path for file_path in sorted(directory.glob("*.txt"))}
+    for file_path in sorted(directory.glob("*.txt" + GZIP_SUFFIX)):
+        files[file_path.name[:-len(GZIP_SUFFIX)]] = file_path
+    count = 0
+    for name, file_path in sorted(files.items()):
+        try:
+            text = read_transcript(file_path)
+        except (OSError, EOFError) as e:
+            print(f"Erreur lecture {file_path.name}: {e}")
+            continue
+        metadata = read_metadata(file_path)
+        record_transcript(file_path, text, url=metadata.get("url"), title=metadata.get("title") or name[:-4],
+                          video_id=metadata.get("video_id"), language=metadata.get("language"),
+                          source=metadata.get("source"), job_id=job_id)
+        count += 1
+    return count
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python transcript_catalog.py <dossier> [job_id]")
+        sys.exit(1)
+    missing = missing_tables("transcripts", "transcript_store")
+    if missing:
+        print(f"❌ Tables absentes ({', '.join(missing)}) : lancer d'abord python app.py migrate")
+        sys.exit(1)
+    total = reindex_directory(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
+    print(f"✅ {total} transcription(s) cataloguée(s)")
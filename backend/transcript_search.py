@@ -0,0 +1,184 @@
+"""
+transcript_search.py
+Recherche plein texte dans les transcriptions, indexées à l'écriture (record_transcript) :
+- SQLite (local) : table virtuelle FTS5 transcripts_fts, classement bm25, snippet()
+- Postgres (Supabase) : table transcript_search avec colonne tsvector générée + index GIN,
+  classement ts_rank, extraits ts_headline
+La recherche ne lit aucun fichier : le texte indexé sert aussi aux extraits et à l'offset
+de chaque résultat (octets UTF-8, comme /api/transcripts/content?offset=).
+"""
+
+import os
+import re
+import threading
+
+from sqlalchemy import text
+
+from database import engine
+
+SEARCH_CONFIG = os.getenv("TRANSCRIPT_SEARCH_CONFIG", "simple")  # configuration Postgres (simple, french...)
+SEARCH_LIMIT_MAX = 100
+SNIPPET_WORDS = 16
+MARK_START, MARK_END = "<mark>", "</mark>"
+
+_ready = False
+_ready_lock = threading.Lock()
+
+
+def _is_postgres() -> bool:
+    return engine.dialect.name == "postgresql"
+
+
+def ensure_search_index():
+    """Crée la structure d'index une fois par processus (idempotent, aussi sur une base existante)"""
+    global _ready
+    if _ready:
+        return
+    with _ready_lock:
+        if _ready:
+            return
+        with engine.begin() as conn:
+            if _is_postgres():
+                conn.execute(text(f"""
+                    CREATE TABLE IF NOT EXISTS transcript_search (
+                        transcript_id INTEGER PRIMARY KEY,
+                        title TEXT,
+                        body TEXT NOT NULL,
+                        tsv tsvector GENERATED ALWAYS AS (
+                            to_tsvector('{SEARCH_CONFIG}', left(coalesce(title, '') || ' ' || body, 500000))
+                        ) STORED
+                    )"""))
+                conn.execute(text(
+                    "CREATE INDEX IF NOT EXISTS ix_transcript_search_tsv ON transcript_search USING GIN (tsv)"
+                ))
+            else:
+                conn.execute(text(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS transcripts_fts USING fts5("
+                    "title, body, tokenize = 'unicode61 remove_diacritics 2')"
+                ))
+        _ready = True
+
+
+def index_transcript(db, transcript_id: int, title: str, body: str):
+    """(Ré)indexe une transcription dans la transaction `db` de l'appelant"""
+    ensure_search_index()
+    params = {"id": transcript_id, "title": title or "", "body": body or ""}
+    if _is_postgres():
+        db.execute(text(
+            "INSERT INTO transcript_search (transcript_id, title, body) VALUES (:id, :title, :body) "
+            "ON CONFLICT (transcript_id) DO UPDATE SET title = EXCLUDED.title, body = EXCLUDED.body"
+        ), params)
+    else:
+        db.execute(text("DELETE FROM transcripts_fts WHERE rowid = :id"), params)
+        db.execute(text("INSERT INTO transcripts_fts (rowid, title, body) VALUES (:id, :title, :body)"), params)
+
+
+def unindex_transcripts(db, transcript_ids):
+    """Retire des transcriptions de l'index (dans la transaction `db` de l'appelant)"""
+    if not transcript_ids:
+        return
+    ensure_search_index()
+    table, column = ("transcript_search", "transcript_id") if _is_postgres() else ("transcripts_fts", "rowid")
+    for start in range(0, len(transcript_ids), 500):
+        chunk = list(transcript_ids[start:start + 500])
+        placeholders = ", ".join(f":id{i}" for i in range(len(chunk)))
+        db.execute(text(f"DELETE FROM {table} WHERE {column} IN ({placeholders})"),
+                   {f"id{i}": value for i, value in enumerate(chunk)})
+
+
+def _terms(query: str) -> list:
+    return re.findall(r"\w+", query or "", flags=re.UNICODE)
+
+
+def _hit_offset(body: str, snippet: str):
+    """
+    Offset en octets UTF-8 du premier terme surligné de l'extrait dans le texte indexé.
+    Le mot surligné est celui qu'a trouvé l'index (accents, casse, racine Postgres) : on le
+    cherche avec le contexte qui le précède dans l'extrait, sinon seul. None si introuvable.
+    """
+    start = (snippet or "").find(MARK_START)
+    end = snippet.find(MARK_END, start) if start >= 0 else -1
+    if end < 0 or not body:
+        return None
+    hit = snippet[start + len(MARK_START):end]
+    before = snippet[:start].lstrip("…")
+    position = body.find(before + hit) if before else -1
+    if position >= 0:
+        position += len(before)
+    else:
+        position = body.find(hit)
+    if position < 0:
+        return None
+    return len(body[:position].encode("utf-8"))
+
+
+def search_transcripts(query: str, job_id: str = None, limit: int = 20, owner: str = None) -> list:
+    """
+    Résultats classés : [{id, name, title, video_id, job_id, rank, snippet, offset}].
+    `offset` = position en octets UTF-8 du terme surligné dans l'extrait, à passer tel quel
+    à /api/transcripts/content?offset= (None si introuvable).
+    Avec `owner`, seules les transcriptions des jobs de cet utilisateur (jointure sur jobs.owner).
+    """
+    terms = _terms(query)
+    if not terms:
+        return []
+    ensure_search_index()
+    limit = max(1, min(limit, SEARCH_LIMIT_MAX))
+    params = {"limit": limit, "job_id": job_id, "owner": owner}
+    job_clause = "AND t.job_id = :job_id" if job_id else ""
+    owner_join = "JOIN jobs j ON j.id = t.job_id AND j.owner = :owner" if owner else ""
+
+    if _is_postgres():
+        params["q"] = " ".join(terms)
+        # Classement sur l'index GIN, extraits calculés seulement pour la page retournée
+        sql = f"""
+            SELECT hits.id, t.name, t.title, t.video_id, t.job_id, hits.rank,
+                   ts_headline('{SEARCH_CONFIG}', s.body, websearch_to_tsquery('{SEARCH_CONFIG}', :q),
+                               'StartSel={MARK_START}, StopSel={MARK_END}, MaxWords={SNIPPET_WORDS}, MinWords=6')
+                       AS snippet,
+                   s.body
+            FROM (
+                SELECT s.transcript_id AS id, ts_rank(s.tsv, websearch_to_tsquery('{SEARCH_CONFIG}', :q)) AS rank
+                FROM transcript_search s
+                JOIN transcripts t ON t.id = s.transcript_id
+                {owner_join}
+                WHERE s.tsv @@ websearch_to_tsquery('{SEARCH_CONFIG}', :q) {job_clause}
+                ORDER BY rank DESC
+                LIMIT :limit
+            ) hits
+            JOIN transcript_search s ON s.transcript_id = hits.id
+            JOIN transcripts t ON t.id = hits.id
+            ORDER BY hits.rank DESC
+        """
+    else:
+        # Chaque terme entre guillemets (pas de syntaxe FTS5 injectée), préfixe sur le dernier
+        params["q"] = " ".join(f'"{term}"' for term in terms[:-1]) + f' "{terms[-1]}"*'
+        sql = f"""
+            SELECT t.id, t.name, t.title, t.video_id, t.job_id, -f.rank AS rank,
+                   snippet(transcripts_fts, 1, '{MARK_START}', '{MARK_END}', '…', {SNIPPET_WORDS}) AS snippet,
+                   f.body
+            FROM transcripts_fts f
+            JOIN transcripts t ON t.id = f.rowid
+            {owner_join}
+            WHERE transcripts_fts MATCH :q {job_clause}
+            ORDER BY f.rank
+            LIMIT :limit
+        """
+
+    with engine.connect() as conn:
+        rows = conn.execute(text(sql), params).mappings().all()
+    return [
+        {
+            "id": row["id"],
+            "name": row["name"],
+            "path": f"transcripts/{row['name']}",
+            "title": row["title"],
+            "video_id": row["video_id"],
+            "job_id": row["job_id"],
+            # -bm25 (SQLite) ou ts_rank (Postgres) : plus grand = meilleur
+            "rank": float(row["rank"]) if row["rank"] is not None else None,
+            "snippet": row["snippet"],
+            "offset": _hit_offset(row["body"], row["snippet"]),
+        }
+        for row in rows
+    ]
@@ -0,0 +1,449 @@
+"""
+transcript_store.py
+Magasin de transcriptions adressé par contenu, partagé entre tous les jobs :
+- contenu : objects/<sha256[:2]>/<sha256>.txt.gz, écrit une seule fois (déduplication par hash du texte,
+  cf. content_key)
+- index : table transcript_store, une ligne par (video_id, langue) -> hash du contenu
+Le fichier d'un job (transcripts/<titre> [<video_id>].txt.gz) est un lien dur vers l'objet
+(copie si le lien est impossible). Avant tout accès réseau, la transcription cherche
+les vidéos déjà présentes dans le magasin et se contente de les relier au job.
+
+Stockage gzip standard (lisible par gzip -d, servi tel quel avec Content-Encoding: gzip) ;
+les métadonnées (ID vidéo, langue, titre, URL, source) sont dans le champ FEXTRA de l'en-tête.
+Points d'accès : le flux deflate est vidé (Z_FULL_FLUSH) tous les TRANSCRIPT_SEEK_SPAN octets de
+texte et la table (offset texte, offset compressé) est rangée dans les métadonnées ("seek") ;
+TranscriptReader s'y positionne sans décompresser ce qui précède (pages, requêtes Range).
+L'objet ne contient que le texte normalisé de la transcription ; l'en-tête propre à chaque
+exécution (titre, URL, date) est un fichier annexe du job (<nom>.txt.header, cf. header_path) :
+dans l'objet partagé, il figerait pour tous les jobs l'en-tête de la première exécution.
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import Column, DateTime, Integer, String, Text
+
+from captions import CAPTION_LANGS
+from database import Base, SessionLocal
+from transcript_catalog import record_transcript
+from zip_stream import gzip_layout
+
+if os.path.exists("/tmp"):
+    DEFAULT_STORE_DIR = "/tmp/transcript_store"
+else:
+    DEFAULT_STORE_DIR = str(Path(__file__).resolve().parent / "transcript_store")
+
+TRANSCRIPT_STORE_DIR = Path(os.getenv("TRANSCRIPT_STORE_DIR", DEFAULT_STORE_DIR))
+TRANSCRIBE_FORCE = os.getenv("TRANSCRIBE_FORCE", "").lower() in ("1", "true", "yes")  # ignorer le magasin
+TRANSCRIPT_GZIP_LEVEL = int(os.getenv("TRANSCRIPT_GZIP_LEVEL", "6"))
+GZIP_SUFFIX = ".gz"
+TRANSCRIPT_SEEK_SPAN = int(os.getenv("TRANSCRIPT_SEEK_SPAN", str(64 * 1024)))  # octets de texte entre deux points
+SEEK_POINTS_MAX = 2000  # table "seek" bien en deçà des 64 Ko du champ FEXTRA (l'écart double au-delà)
+READ_CHUNK_SIZE = 64 * 1024
+_METADATA_SUBFIELD = b"YT"  # identifiant du sous-champ FEXTRA des métadonnées
+UNKNOWN_LANGUAGE = "und"  # transcription récupérée sur un site externe, langue non précisée
+
+
+class StoredTranscript(Base):
+    __tablename__ = "transcript_store"
+
+    video_id = Column(String(16), primary_key=True)
+    language = Column(String(16), primary_key=True)
+    content_hash = Column(String(64), nullable=False, index=True)
+    title = Column(Text)
+    url = Column(Text)
+    source = Column(String(32))
+    size = Column(Integer, default=0)
+    word_count = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+VIDEO_ID_RE = re.compile(r"[0-9A-Za-z_-]{11}")
+
+
+def extract_video_id(url: str):
+    match = re.search(r'(?:v=|\/)([0-9A-Za-z_-]{11}).*', url or "")
+    return match.group(1) if match else None
+
+
+def transcript_filename(safe_title: str, video_id: str = None) -> str:
+    """Nom du fichier dans le job : l'ID vidéo évite que deux titres identiques s'écrasent"""
+    return f"{safe_title} [{video_id}].txt" if video_id else f"{safe_title}.txt"
+
+
+def object_path(content_hash: str) -> Path:
+    return TRANSCRIPT_STORE_DIR / "objects" / content_hash[:2] / f"{content_hash}.txt{GZIP_SUFFIX}"
+
+
+def encode_transcript(data: bytes, metadata: dict, level: int = TRANSCRIPT_GZIP_LEVEL) -> bytes:
+    """
+    Membre gzip unique : en-tête avec métadonnées JSON (FEXTRA), flux deflate, CRC32 + taille.
+    Un Z_FULL_FLUSH tous les `span` octets rend le flux décodable à partir de chaque point noté.
+    """
+    span = TRANSCRIPT_SEEK_SPAN
+    while len(data) > span * SEEK_POINTS_MAX:
+        span *= 2
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    parts, seek, compressed = [], [], 0
+    for start in range(0, len(data), span):
+        if start:
+            seek.append([start, compressed])
+        part = compressor.compress(data[start:start + span])
+        if start + span < len(data):
+            part += compressor.flush(zlib.Z_FULL_FLUSH)
+        parts.append(part)
+        compressed += len(part)
+    parts.append(compressor.flush())
+    if seek:
+        metadata = {**metadata, "seek": seek}
+
+    payload = json.dumps(metadata, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    subfield = _METADATA_SUBFIELD + struct.pack("<H", len(payload)) + payload
+    header = b"\x1f\x8b\x08\x04" + struct.pack("<I", int(time.time())) + b"\x00\xff"
+    header += struct.pack("<H", len(subfield)) + subfield
+    return header + b"".join(parts) + struct.pack("<II", zlib.crc32(data), len(data) & 0xFFFFFFFF)
+
+
+def read_metadata(path) -> dict:
+    """Métadonnées de l'en-tête gzip ({} pour un .txt ou un gzip sans métadonnées)"""
+    try:
+        with open(path, "rb") as f:
+            header = f.read(10)
+            if header[:3] != b"\x1f\x8b\x08" or not header[3] & 0x04:
+                return {}
+            (xlen,) = struct.unpack("<H", f.read(2))
+            extra = f.read(xlen)
+    except OSError:
+        return {}
+    position = 0
+    while position + 4 <= len(extra):
+        subfield_id = extra[position:position + 2]
+        (length,) = struct.unpack("<H", extra[position + 2:position + 4])
+        if subfield_id == _METADATA_SUBFIELD:
+            try:
+                return json.loads(extra[position + 4:position + 4 + length].decode("utf-8"))
+            except ValueError:
+                return {}
+        position += 4 + length
+    return {}
+
+
+def read_transcript(path) -> str:
+    """Contenu texte d'une transcription, compressée (.gz) ou non"""
+    path = Path(path)
+    if path.name.endswith(GZIP_SUFFIX):
+        with gzip.open(path, "rt", encoding="utf-8", errors="replace") as f:
+            return f.read()
+    return path.read_text(encoding="utf-8", errors="replace")
+
+
+def transcript_size(path) -> int:
+    """Taille du texte décompressé (champ ISIZE du trailer gzip, modulo 4 Go), sans lire le contenu"""
+    path = Path(path)
+    if not path.name.endswith(GZIP_SUFFIX):
+        return path.stat().st_size
+    with open(path, "rb") as f:
+        f.seek(-4, os.SEEK_END)
+        return struct.unpack("<I", f.read(4))[0]
+
+
+class TranscriptReader(io.RawIOBase):
+    """
+    Texte décompressé d'un .txt.gz, lisible par blocs et positionnable.
+    seek() repart du point d'accès le plus proche (table "seek" des métadonnées) : seul l'écart
+    jusqu'à l'offset demandé est décompressé. Sans table (fichier plus ancien), depuis le début.
+    """
+
+    def __init__(self, path, layout):
+        super().__init__()
+        self._file = open(path, "rb")
+        self._body_start, self._body_length, _, self.size = layout
+        self._points = [(0, 0)] + [tuple(point) for point in read_metadata(path).get("seek") or []]
+        self._restart(0, 0)
+
+    def _restart(self, position: int, compressed: int):
+        self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+        self._file.seek(self._body_start + compressed)
+        self._remaining = self._body_length - compressed
+        self._position = position
+        self._pending = b""
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        offset = max(0, offset)
+        point = max(point for point in self._points if point[0] <= offset)
+        if offset < self._position or point[0] > self._position:
+            self._restart(*point)
+        while self._position < offset and self._take(min(READ_CHUNK_SIZE, offset - self._position)):
+            pass
+        return self._position
+
+    def _take(self, n: int) -> bytes:
+        while len(self._pending) < n and self._remaining > 0:
+            raw = self._file.read(min(READ_CHUNK_SIZE, self._remaining))
+            if not raw:
+                break
+            self._remaining -= len(raw)
+            self._pending += self._decompressor.decompress(raw)
+        data, self._pending = self._pending[:n], self._pending[n:]
+        self._position += len(data)
+        return data
+
+    def readinto(self, buffer):
+        data = self._take(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            self._file.close()
+        super().close()
+
+
+def open_transcript(path):
+    """Octets UTF-8 du texte d'une transcription, positionnable : .txt tel quel, .txt.gz via TranscriptReader"""
+    path = Path(path)
+    if path.name.endswith(GZIP_SUFFIX):
+        layout = gzip_layout(path)
+        if layout is not None:
+            return TranscriptReader(path, layout)
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def read_transcript_page(path, offset: int = 0, length: int = 64 * 1024):
+    """
+    Page du texte à partir de l'octet `offset` (texte UTF-8 décompressé) :
+    (texte, offset de la page suivante ou None en fin de fichier).
+    La page est coupée sur une fin de ligne ou un espace quand c'est possible, jamais
+    au milieu d'un caractère ; un offset tombant dans un caractère avance au suivant.
+    """
+    with open_transcript(path) as f:
+        # .txt.gz : décompression depuis le point d'accès le plus proche de l'offset (cf. TranscriptReader)
+        f.seek(offset)
+        data = f.read(length + 1)
+        while data[:1] and 0x80 <= data[0] < 0xC0:
+            data = data[1:] + f.read(1)
+            offset += 1
+    if len(data) <= length:
+        return data.decode("utf-8", errors="replace"), None
+    data = data[:length]
+    cut = max(data.rfind(b"\n"), data.rfind(b" "))
+    if cut >= length // 2:
+        data = data[:cut + 1]
+    else:
+        # Pas de séparateur : on recule jusqu'au début d'un caractère UTF-8
+        end = len(data)
+        while end > 0 and 0x80 <= data[end - 1] < 0xC0:
+            end -= 1
+        if end > 0 and data[end - 1] >= 0xC0:
+            end -= 1
+        data = data[:end or len(data)]
+    return data.decode("utf-8", errors="replace"), offset + len(data)
+
+
+def resolve_transcript_path(path) -> Path:
+    """transcripts/<nom>.txt -> fichier réel (<nom>.txt.gz depuis la compression, .txt pour l'existant)"""
+    path = Path(path)
+    if path.exists() or path.name.endswith(GZIP_SUFFIX):
+        return path
+    compressed = path.with_name(path.name + GZIP_SUFFIX)
+    return compressed if compressed.exists() else path
+
+
+def display_name(path) -> str:
+    """Nom présenté aux utilisateurs (liste, export ZIP) : sans l'extension .gz de stockage"""
+    name = Path(path).name
+    return name[:-len(GZIP_SUFFIX)] if name.endswith(GZIP_SUFFIX) else name
+
+
+def content_key(video_id: str, data: bytes) -> str:
+    """
+    Hash de déduplication : texte normalisé de la vidéo (ni en-tête ni date d'exécution).
+    L'ID vidéo en préfixe : deux vidéos au texte identique ("[Musique]") gardent chacune
+    leurs métadonnées (titre, URL).
+    """
+    return hashlib.sha256(video_id.encode("ascii") + b"\0" + data).hexdigest()
+
+
+def _write_object(content_hash: str, data: bytes, metadata: dict):
+    """Écrit le contenu compressé sous `content_hash` s'il n'existe pas encore (rename atomique)"""
+    path = object_path(content_hash)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}-{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(encode_transcript(data, metadata))
+        os.replace(tmp_path, path)
+
+
+def _link_into(content_hash: str, dest: Path):
+    """Relie l'objet au dossier du job (jamais d'écriture en place : l'objet est partagé)"""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    if dest.exists() or dest.is_symlink():
+        dest.unlink()
+    try:
+        os.link(object_path(content_hash), dest)
+    except OSError:
+        # Autre système de fichiers (JOBS_ROOT partagé...) : copie
+        shutil.copyfile(object_path(content_hash), dest)
+
+
+def normalize_text(text: str) -> str:
+    """Texte tel que stocké et hashé : fins de ligne \\n, sans espaces en fin de ligne ni lignes vides aux bords"""
+    return "\n".join(line.rstrip() for line in (text or "").replace("\r\n", "\n").split("\n")).strip("\n")
+
+
+def header_path(path) -> Path:
+    """Fichier annexe de l'en-tête d'exécution : transcripts/<nom>.txt(.gz) -> transcripts/<nom>.txt.header"""
+    path = Path(path)
+    return path.with_name(display_name(path) + ".header")
+
+
+def write_header(path, header: str):
+    """En-tête propre au job (jamais dans l'objet partagé) ; aucun fichier si l'en-tête est vide"""
+    target = header_path(path)
+    if header:
+        target.write_text(header[:2000], encoding="utf-8")
+    elif target.exists():
+        target.unlink()
+
+
+def transcript_header(path) -> str:
+    """En-tête d'exécution (titre, URL, date) de ce job ; "" s'il n'y en a pas"""
+    try:
+        return header_path(path).read_text(encoding="utf-8")
+    except OSError:
+        return ""
+
+
+def save_transcript(out_path: Path, header: str, text: str, url: str = None, title: str = None,
+                    video_id: str = None, language: str = None, source: str = None) -> Path:
+    """
+    Sauvegarde une transcription compressée : objet dans le magasin (si video_id), lien dans le job,
+    puis catalogue + index de recherche. Le fichier contient `text` (hash de déduplication) ;
+    `header` (titre, URL, date de l'exécution) va dans le fichier annexe du job (header_path).
+    Retourne le chemin réel (`out_path` + .gz).
+    """
+    out_path = Path(out_path)
+    out_path = out_path.with_name(out_path.name + GZIP_SUFFIX)
+    text = normalize_text(text)
+    data = text.encode("utf-8")
+    metadata = {"video_id": video_id, "language": language, "title": (title or "")[:500],
+                "url": url, "source": source}
+    if not video_id or not VIDEO_ID_RE.fullmatch(video_id):
+        out_path.write_bytes(encode_transcript(data, metadata))
+    else:
+        content_hash = content_key(video_id, data)
+        _write_object(content_hash, data, metadata)
+        _link_into(content_hash, out_path)
+        db = SessionLocal()
+        try:
+            key = (video_id, language or UNKNOWN_LANGUAGE)
+            row = db.get(StoredTranscript, key)
+            if row is None:
+                row = StoredTranscript(video_id=key[0], language=key[1])
+                db.add(row)
+            row.content_hash = content_hash
+            row.title = title
+            row.url = url
+            row.source = source
+            row.size = len(data)
+            row.word_count = len(text.split())
+            row.created_at = datetime.utcnow()
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Erreur magasin de transcriptions ({video_id}): {e}")
+        finally:
+            db.close()
+
+    write_header(out_path, header)
+    record_transcript(out_path, text, url=url, title=title, video_id=video_id, language=language, source=source)
+    return out_path
+
+
+def find_stored(video_ids) -> dict:
+    """video_id -> meilleure transcription stockée (langues CAPTION_LANGS d'abord), en requêtes groupées"""
+    video_ids = [v for v in dict.fromkeys(video_ids) if v]
+    preference = {lang: i for i, lang in enumerate(CAPTION_LANGS)}
+    best = {}
+    db = SessionLocal()
+    try:
+        for start in range(0, len(video_ids), 500):
+            chunk = video_ids[start:start + 500]
+            for row in db.query(StoredTranscript).filter(StoredTranscript.video_id.in_(chunk)):
+                current = best.get(row.video_id)
+                rank = preference.get(row.language, len(preference))
+                if current is None or rank < preference.get(current.language, len(preference)):
+                    best[row.video_id] = row
+        # Objet supprimé à la main (/tmp vidé...) : la vidéo sera retranscrite
+        return {
+            video_id: {
+                "video_id": row.video_id, "language": row.language, "content_hash": row.content_hash,
+                "title": row.title, "url": row.url, "source": row.source
+            }
+            for video_id, row in best.items()
+            if object_path(row.content_hash).exists()
+        }
+    finally:
+        db.close()
+
+
+def reuse_stored(urls, out_dir: Path, name_for_title, header_for=None):
+    """
+    Relie au job les vidéos déjà transcrites (aucun accès réseau) et retourne
+    (urls restant à transcrire, [(url, chemin)] des transcriptions réutilisées).
+    `name_for_title(title)` donne le nom de fichier nettoyé utilisé par le script,
+    `header_for(title, url)` l'en-tête de cette exécution (comme pour une nouvelle transcription).
+    """
+    if TRANSCRIBE_FORCE:
+        return list(urls), []
+    try:
+        stored = find_stored(extract_video_id(url) for url in urls)
+    except Exception as e:
+        print(f"Erreur lecture du magasin de transcriptions: {e}")
+        return list(urls), []
+    remaining, reused = [], []
+    for url in urls:
+        entry = stored.get(extract_video_id(url))
+        if entry is None:
+            remaining.append(url)
+            continue
+        title = entry["title"] or entry["video_id"]
+        dest = Path(out_dir) / (transcript_filename(name_for_title(title), entry["video_id"]) + GZIP_SUFFIX)
+        try:
+            _link_into(entry["content_hash"], dest)
+            text = read_transcript(dest)
+        except OSError as e:
+            print(f"Erreur réutilisation {entry['video_id']}: {e}")
+            remaining.append(url)
+            continue
+        write_header(dest, header_for(title, url) if header_for else "")
+        record_transcript(dest, text, url=url, title=title, video_id=entry["video_id"],
+                          language=None if entry["language"] == UNKNOWN_LANGUAGE else entry["language"],
+                          source=entry["source"])
+        reused.append((url, dest))
+    return remaining, reused
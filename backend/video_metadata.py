@@ -0,0 +1,138 @@
+"""
+video_metadata.py
+Un seul enregistrement de métadonnées par vidéo (titre, durée, pistes de sous-titres, langues),
+extrait une fois par yt-dlp puis partagé par les scripts de transcription.
+Le scraping n'y écrit rien : extract_flat ne fournit pas les pistes de sous-titres,
+seules utiles à la transcription.
+Cache local : un fichier JSON par ID vidéo, avec TTL (les URLs de sous-titres YouTube expirent).
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from captions import CAPTION_LANGS
+
+if os.path.exists("/tmp"):
+    DEFAULT_CACHE_DIR = "/tmp/video_cache"
+else:
+    DEFAULT_CACHE_DIR = "video_cache"
+
+VIDEO_CACHE_DIR = Path(os.getenv("VIDEO_CACHE_DIR", DEFAULT_CACHE_DIR))
+VIDEO_CACHE_TTL = int(os.getenv("VIDEO_CACHE_TTL", str(3 * 3600)))
+
+_memory_cache = {}
+_memory_lock = threading.Lock()
+
+
+def extract_video_id(url: str) -> Optional[str]:
+    """Extrait l'ID vidéo depuis l'URL YouTube"""
+    match = re.search(r'(?:v=|\/)([0-9A-Za-z_-]{11}).*', url or "")
+    return match.group(1) if match else None
+
+
+def _cache_path(video_id: str) -> Path:
+    return VIDEO_CACHE_DIR / f"{video_id}.json"
+
+
+def _is_fresh(record: dict) -> bool:
+    return time.time() - record.get("fetched_at", 0) < VIDEO_CACHE_TTL
+
+
+def _slim_tracks(tracks: dict) -> dict:
+    """Ne garde que les langues utiles et les champs ext/url (le JSON yt-dlp complet pèse plusieurs Mo)"""
+    slim = {}
+    for lang in CAPTION_LANGS:
+        formats = [
+            {"ext": t.get("ext"), "url": t.get("url")}
+            for t in (tracks or {}).get(lang) or []
+            if t.get("url")
+        ]
+        if formats:
+            slim[lang] = formats
+    return slim
+
+
+def load_metadata(video_id: str) -> Optional[dict]:
+    """Lit l'enregistrement en mémoire puis sur disque (None si absent ou expiré)"""
+    if not video_id:
+        return None
+    with _memory_lock:
+        record = _memory_cache.get(video_id)
+    if record and _is_fresh(record):
+        return record
+
+    path = _cache_path(video_id)
+    try:
+        record = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not _is_fresh(record):
+        return None
+    with _memory_lock:
+        _memory_cache[video_id] = record
+    return record
+
+
+def save_metadata(record: dict):
+    """Écrit l'enregistrement de façon atomique (fichier temporaire + rename)"""
+    video_id = record.get("id")
+    if not video_id:
+        return
+    with _memory_lock:
+        _memory_cache[video_id] = record
+    try:
+        VIDEO_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        path = _cache_path(video_id)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(record, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"Erreur écriture cache vidéo {video_id}: {e}")
+
+
+def record_from_info(info: dict) -> dict:
+    """Construit l'enregistrement partagé depuis un extract_info complet"""
+    subtitles = info.get("subtitles") or {}
+    auto_captions = info.get("automatic_captions") or {}
+    return {
+        "id": info.get("id"),
+        "title": info.get("title"),
+        "duration": info.get("duration"),
+        "subtitles": _slim_tracks(subtitles),
+        "automatic_captions": _slim_tracks(auto_captions),
+        "languages": sorted(subtitles.keys()),
+        "auto_languages": sorted(auto_captions.keys()),
+        "complete": True,
+        "fetched_at": time.time(),
+    }
+
+
+def get_video_metadata(url: str, require_captions: bool = True) -> Optional[dict]:
+    """
+    Retourne l'enregistrement de la vidéo, en appelant yt-dlp seulement s'il est absent,
+    expiré, ou incomplet alors que les pistes de sous-titres sont demandées.
+    Retourne None si yt-dlp échoue et que rien n'est en cache.
+    """
+    video_id = extract_video_id(url)
+    cached = load_metadata(video_id)
+    if cached and (cached.get("complete") or not require_captions):
+        return cached
+
+    import yt_dlp
+
+    ydl_opts = {"quiet": True, "skip_download": True}
+    try:
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(url, download=False)
+    except Exception as e:
+        print(f"Erreur yt-dlp: {e}")
+        return cached
+
+    record = record_from_info(info)
+    save_metadata(record)
+    return record
@@ -0,0 +1,186 @@
+"""
+worker.py
+Worker autonome de la file de jobs (jobs.py) : prend les jobs en bail dans la base,
+exécute le script correspondant dans le dossier du job, prolonge le bail tant que le
+processus tourne, puis marque le job réussi ou le remet en file avec backoff.
+
+La capacité se règle indépendamment de gunicorn : lancer autant de workers que voulu
+(sur la même machine que l'API, ou avec JOBS_ROOT sur un disque partagé).
+
+Usage : python worker.py [--concurrency N] [--kinds scrape,transcribe] [--once]
+"""
+
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from database import missing_tables
+from events import emit
+from jobs import (
+    COMPLETION_SIGNALS, JOB_SCRIPTS, JOB_VISIBILITY_TIMEOUT,
+    complete_job, heartbeat, job_workdir, lease_job, read_completion_signal,
+    release_job, retry_or_fail_job
+)
+
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "2"))
+WORKER_POLL_INTERVAL = float(os.getenv("WORKER_POLL_INTERVAL", "1"))
+JOB_TIMEOUT = int(os.getenv("JOB_TIMEOUT", "3600"))  # durée max d'exécution d'une tentative
+
+BASE_DIR = Path(__file__).resolve().parent
+STOP = threading.Event()
+
+
+def _terminate(process: subprocess.Popen):
+    """Arrête le script (SIGTERM puis SIGKILL après 10 s)"""
+    if process.poll() is not None:
+        return
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def run_job(job: dict, worker_id: str):
+    """Exécute une tentative d'un job pris en bail"""
+    job_id = job["job_id"]
+    workdir = job_workdir(job)
+    script_name, log_name = JOB_SCRIPTS[job["kind"]]
+    script_path = BASE_DIR / script_name
+
+    transcripts_dir = workdir / "transcripts"
+    transcripts_dir.mkdir(parents=True, exist_ok=True)
+    # Un signal laissé par une tentative précédente ne doit pas valider celle-ci
+    signal_file = workdir / COMPLETION_SIGNALS[job["kind"]]
+    if signal_file.exists():
+        signal_file.unlink()
+
+    print(f"▶️ [{worker_id}] Job {job_id} ({job['kind']}) - tentative {job['attempts']}/{job['max_attempts']}")
+    env = dict(os.environ, JOB_ID=job_id, TRANSCRIPTS_DIR=str(transcripts_dir), PYTHONUNBUFFERED="1")
+    with open(workdir / log_name, 'a', encoding='utf-8') as log_file:
+        process = subprocess.Popen(
+            [sys.executable, str(script_path)],
+            cwd=str(workdir),
+            stdout=log_file,
+            stderr=subprocess.STDOUT,  # Rediriger stderr vers stdout
+            env=env
+        )
+    heartbeat(job_id, worker_id, pid=process.pid)
+    emit("job_started", kind=job["kind"], job_id=job_id, attempt=job["attempts"])
+
+    started = last_beat = time.monotonic()
+    beat_every = max(1.0, JOB_VISIBILITY_TIMEOUT / 3)
+    error = None
+    while True:
+        try:
+            returncode = process.wait(timeout=WORKER_POLL_INTERVAL)
+            break
+        except subprocess.TimeoutExpired:
+            pass
+
+        now = time.monotonic()
+        if STOP.is_set():
+            # Arrêt du worker : le job retourne en file sans consommer de tentative
+            _terminate(process)
+            release_job(job_id, worker_id)
+            print(f"⏸️ [{worker_id}] Job {job_id} rendu à la file (arrêt du worker)")
+            return
+        if now - started > JOB_TIMEOUT:
+            _terminate(process)
+            returncode = process.returncode
+            error = f"Délai dépassé ({JOB_TIMEOUT}s)"
+            break
+        if now - last_beat >= beat_every:
+            if not heartbeat(job_id, worker_id):
+                # Bail perdu (expiré et repris ailleurs) : ne pas exécuter le job en double
+                _terminate(process)
+                print(f"⚠️ [{worker_id}] Bail perdu pour le job {job_id}, processus arrêté")
+                return
+            last_beat = now
+
+    result = read_completion_signal(job) if error is None else None
+    if result is not None:
+        complete_job(job_id, worker_id, {**result, "returncode": returncode})
+        print(f"✅ [{worker_id}] Job {job_id} terminé: {result}")
+        return
+
+    error = error or f"Processus terminé (code {returncode}) sans signal de fin"
+    state = retry_or_fail_job(job_id, worker_id, error, job["attempts"], job["max_attempts"])
+    print(f"❌ [{worker_id}] Job {job_id}: {error} -> {state}")
+    if state == "failed":
+        emit("job_finished", kind=job["kind"], job_id=job_id, state="failed", error=error)
+
+
+def worker_loop(worker_id: str, kinds, once: bool = False):
+    """Boucle d'un slot : prend un job en bail, l'exécute, recommence"""
+    while not STOP.is_set():
+        try:
+            job = lease_job(worker_id, kinds)
+        except Exception as e:
+            print(f"❌ [{worker_id}] Erreur lors de la prise de bail: {e}")
+            STOP.wait(WORKER_POLL_INTERVAL * 5)
+            continue
+
+        if job is None:
+            if once:
+                return
+            STOP.wait(WORKER_POLL_INTERVAL)
+            continue
+
+        try:
+            run_job(job, worker_id)
+        except Exception as e:
+            print(f"❌ [{worker_id}] Erreur job {job['job_id']}: {e}")
+            try:
+                retry_or_fail_job(job["job_id"], worker_id, str(e), job["attempts"], job["max_attempts"])
+            except Exception as retry_error:
+                print(f"❌ [{worker_id}] Impossible de replanifier {job['job_id']}: {retry_error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker de la file de jobs scraping / transcription")
+    parser.add_argument("--concurrency", type=int, default=WORKER_CONCURRENCY,
+                        help="nombre de jobs exécutés en parallèle")
+    parser.add_argument("--kinds", default=",".join(JOB_SCRIPTS),
+                        help="types de jobs traités (séparés par des virgules)")
+    parser.add_argument("--once", action="store_true",
+                        help="s'arrêter quand la file est vide")
+    args = parser.parse_args()
+
+    kinds = [kind.strip() for kind in args.kinds.split(",") if kind.strip() in JOB_SCRIPTS]
+    # Le worker ne crée pas le schéma (pas de DDL concurrent avec l'API) : arrêt immédiat s'il manque
+    missing = missing_tables("jobs", "transcripts", "transcript_store")
+    if missing:
+        print(f"❌ Tables absentes ({', '.join(missing)}) : lancer d'abord python app.py migrate")
+        sys.exit(1)
+
+    def stop(signum, frame):
+        print("🛑 Arrêt demandé, les jobs en cours retournent en file...")
+        STOP.set()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    prefix = f"{socket.gethostname()}-{os.getpid()}"
+    print(f"🚀 Worker {prefix}: {args.concurrency} slot(s), jobs {kinds}")
+    threads = [
+        threading.Thread(target=worker_loop, args=(f"{prefix}-{i}", kinds, args.once), daemon=True)
+        for i in range(max(1, args.concurrency))
+    ]
+    for thread in threads:
+        thread.start()
+    # join avec délai : le thread principal reste réactif aux signaux
+    while any(thread.is_alive() for thread in threads):
+        for thread in threads:
+            thread.join(timeout=0.5)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+zip_stream.py
+Archive ZIP générée au fil de l'eau : chaque entrée est écrite directement dans la réponse
+pendant la lecture du fichier source (aucun fichier temporaire).
+Le premier octet part dès la première entrée, quelle que soit la taille de l'archive.
+
+Les fichiers déjà compressés en gzip (magasin de transcriptions) sont recopiés tels quels :
+le flux deflate d'un .gz est exactement celui d'une entrée ZIP « deflate », seuls
+l'en-tête et le CRC/tailles (lus dans le trailer gzip) changent. Pas de recompression.
+"""
+
+import os
+import struct
+import time
+import zlib
+from pathlib import Path
+
+ZIP_CHUNK_SIZE = 64 * 1024
+ZIP_COMPRESSLEVEL = int(os.getenv("ZIP_COMPRESSLEVEL", "6"))  # 0 = stockage sans compression
+
+_STORED, _DEFLATED = 0, 8
+_FLAG_DATA_DESCRIPTOR = 0x08
+_FLAG_UTF8 = 0x800
+_ZIP32_LIMIT = 0xFFFFFFFF
+
+# Drapeaux de l'en-tête gzip (RFC 1952)
+_GZ_FHCRC, _GZ_FEXTRA, _GZ_FNAME, _GZ_FCOMMENT = 0x02, 0x04, 0x08, 0x10
+
+
+def gzip_layout(path: Path):
+    """
+    Décrit un fichier gzip à un seul membre : (début du flux deflate, longueur, crc32, taille décompressée).
+    None si le fichier n'est pas un gzip deflate.
+    """
+    with open(path, "rb") as f:
+        header = f.read(10)
+        if len(header) < 10 or header[:3] != b"\x1f\x8b\x08":
+            return None
+        flags = header[3]
+        if flags & _GZ_FEXTRA:
+            (xlen,) = struct.unpack("<H", f.read(2))
+            f.seek(xlen, os.SEEK_CUR)
+        for flag in (_GZ_FNAME, _GZ_FCOMMENT):
+            if flags & flag:
+                while f.read(1) not in (b"\x00", b""):
+                    pass
+        if flags & _GZ_FHCRC:
+            f.seek(2, os.SEEK_CUR)
+        start = f.tell()
+        f.seek(-8, os.SEEK_END)
+        end = f.tell()
+        crc, isize = struct.unpack("<II", f.read(8))
+    return start, end - start, crc, isize
+
+
+def _dos_datetime(timestamp: float):
+    t = time.localtime(timestamp)
+    if t.tm_year < 1980:
+        return 0, (1 << 5) | 1
+    return (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2), ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+
+
+def _read_chunks(path: Path, start: int = 0, length: int = None, chunk_size: int = ZIP_CHUNK_SIZE):
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = length
+        while remaining is None or remaining > 0:
+            chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+            if not chunk:
+                return
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+
+
+def _plain_chunks(path: Path, chunk_size: int):
+    """Contenu décompressé (fichier .gz décompressé au vol, sinon lu tel quel)"""
+    if gzip_layout(path) is None:
+        yield from _read_chunks(path, chunk_size=chunk_size)
+        return
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for chunk in _read_chunks(path, chunk_size=chunk_size):
+        data = decompressor.decompress(chunk)
+        if data:
+            yield data
+    tail = decompressor.flush()
+    if tail:
+        yield tail
+
+
+def _local_header(name: bytes, flags: int, method: int, dos_time: int, dos_date: int,
+                  crc: int = 0, csize: int = 0, usize: int = 0) -> bytes:
+    return struct.pack("<IHHHHHIIIHH", 0x04034B50, 20, flags, method, dos_time, dos_date,
+                       crc, csize, usize, len(name), 0) + name
+
+
+def stream_zip(files, compresslevel: int = ZIP_COMPRESSLEVEL, chunk_size: int = ZIP_CHUNK_SIZE):
+    """
+    Génère les octets d'un ZIP à partir de `files` : itérable de (nom_dans_l_archive, chemin).
+    Un chemin .gz est inclus décompressé dans l'archive (son flux deflate est réutilisé
+    quand compresslevel > 0). Les fichiers disparus entre le listage et la lecture sont ignorés.
+    Pas de ZIP64 : archive limitée à 4 Go (largement au-delà d'un export de transcriptions).
+    """
+    compresslevel = max(0, min(9, compresslevel))
+    offset = 0
+    central = []
+
+    for arcname, path in files:
+        path = Path(path)
+        try:
+            stat = path.stat()
+            layout = gzip_layout(path)
+        except OSError:
+            continue
+        name = arcname.encode("utf-8")
+        dos_time, dos_date = _dos_datetime(stat.st_mtime)
+        flags = _FLAG_UTF8
+        entry_start = offset
+
+        try:
+            if layout is not None and compresslevel:
+                # Flux deflate du .gz recopié sans recompression, CRC et taille lus dans le trailer gzip
+                start, csize, crc, usize = layout
+                method = _DEFLATED
+                header = _local_header(name, flags, method, dos_time, dos_date, crc, csize, usize)
+                yield header
+                offset += len(header)
+                for chunk in _read_chunks(path, start, csize, chunk_size):
+                    yield chunk
+                offset += csize
+            elif compresslevel:
+                # Compression au vol : CRC et tailles connus à la fin -> descripteur de données
+                method = _DEFLATED
+                flags |= _FLAG_DATA_DESCRIPTOR
+                header = _local_header(name, flags, method, dos_time, dos_date)
+                yield header
+                offset += len(header)
+                compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -zlib.MAX_WBITS)
+                crc = usize = csize = 0
+                for chunk in _plain_chunks(path, chunk_size):
+                    crc = zlib.crc32(chunk, crc)
+                    usize += len(chunk)
+                    data = compressor.compress(chunk)
+                    if data:
+                        csize += len(data)
+                        yield data
+                data = compressor.flush()
+                csize += len(data)
+                yield data
+                descriptor = struct.pack("<IIII", 0x08074B50, crc, csize, usize)
+                yield descriptor
+                offset += csize + len(descriptor)
+            else:
+                # Stockage : une première lecture calcule le CRC (en-tête complet, lisible partout)
+                method = _STORED
+                crc = usize = 0
+                for chunk in _plain_chunks(path, chunk_size):
+                    crc = zlib.crc32(chunk, crc)
+                    usize += len(chunk)
+                csize = usize
+                header = _local_header(name, flags, method, dos_time, dos_date, crc, csize, usize)
+                yield header
+                offset += len(header)
+                for chunk in _plain_chunks(path, chunk_size):
+                    yield chunk
+                offset += csize
+        except OSError as e:
+            # Fichier supprimé pendant l'export : l'archive déjà envoyée ne peut plus être corrigée
+            raise RuntimeError(f"Lecture impossible pendant l'export ZIP: {path.name}: {e}") from e
+
+        if offset > _ZIP32_LIMIT:
+            raise RuntimeError("Archive ZIP supérieure à 4 Go (ZIP64 non supporté)")
+        central.append(struct.pack(
+            "<IHHHHHHIIIHHHHHII", 0x02014B50, 0x031E, 20, flags, method, dos_time, dos_date,
+            crc, csize, usize, len(name), 0, 0, 0, 0, (0o100644 << 16), entry_start
+        ) + name)
+
+    directory = b"".join(central)
+    yield directory
+    yield struct.pack("<IHHHHIIH", 0x06054B50, 0, 0, len(central), len(central), len(directory), offset, 0)
@@ -3,6 +3,85 @@
 
 import { API_URL } from './config';
 
+// Ajoute ?job_id=... à un endpoint (sans job_id, le backend prend le dernier job)
+export const withJob = (endpoint, jobId) => {
+  if (!jobId) return endpoint;
+  const separator = endpoint.includes('?') ? '&' : '?';
+  return `${endpoint}${separator}job_id=${encodeURIComponent(jobId)}`;
+};
+
+// En-têtes JSON + jeton Supabase (vérifié localement par le backend, cf. backend/auth.py)
+export const authHeaders = (user) => {
+  const headers = { 'Content-Type': 'application/json' };
+  // "dummy-token" : ancienne session locale sans vrai jeton
+  if (user?.token && user.token !== 'dummy-token') headers.Authorization = `Bearer ${user.token}`;
+  return headers;
+};
+
+// Session courante ({email, token, refresh_token, expires_at}) : tenue à jour par AuthProvider
+let currentSession = null;
+let sessionListener = null;
+let pendingRefresh = null;
+const REFRESH_MARGIN_SECONDS = 60;
+
+export const setSession = (user) => {
+  currentSession = user;
+};
+
+// Appelé avec la nouvelle session après chaque rafraîchissement du jeton
+export const onSessionRefresh = (listener) => {
+  sessionListener = listener;
+};
+
+// Nouveau jeton via /api/auth/refresh ; un seul appel à la fois, null si la session est perdue
+const refreshSession = () => {
+  if (!currentSession?.refresh_token) return Promise.resolve(null);
+  if (!pendingRefresh) {
+    pendingRefresh = fetch(`${API_URL}/api/auth/refresh`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ refresh_token: currentSession.refresh_token }),
+    })
+      .then(async (response) => {
+        if (!response.ok) return null;
+        const data = await response.json();
+        currentSession = {
+          ...currentSession,
+          token: data.token,
+          refresh_token: data.refresh_token,
+          expires_at: data.expires_at,
+        };
+        if (sessionListener) sessionListener(currentSession);
+        return currentSession;
+      })
+      .catch(() => null)
+      .finally(() => {
+        pendingRefresh = null;
+      });
+  }
+  return pendingRefresh;
+};
+
+const expiresSoon = (session) =>
+  Boolean(session?.expires_at) && session.expires_at - Date.now() / 1000 < REFRESH_MARGIN_SECONDS;
+
+// fetch vers le backend avec le jeton courant : rafraîchi avant son expiration,
+// ou après un 401 (une seule nouvelle tentative)
+export const authFetch = async (url, options = {}) => {
+  if (expiresSoon(currentSession)) await refreshSession();
+  const send = () => {
+    const headers = { ...(options.headers || {}) };
+    const token = currentSession?.token;
+    if (token && token !== 'dummy-token') headers.Authorization = `Bearer ${token}`;
+    return fetch(url, { ...options, headers });
+  };
+  let response = await send();
+  if (response.status === 401 && currentSession?.refresh_token && (await refreshSession())) {
+    response = await send();
+  }
+  return response;
+};
+
 // Fonction utilitaire pour les appels API
 const apiCall = async (endpoint, options = {}) => {
   const url = `${API_URL}${endpoint}`;
@@ -12,7 +91,7 @@ const apiCall = async (endpoint, options = {}) => {
     },
   };
   
-  const response = await fetch(url, { ...defaultOptions, ...options });
+  const response = await authFetch(url, { ...defaultOptions, ...options });
   
   if (!response.ok) {
     const errorData = await response.json().catch(() => ({ error: 'Erreur de connexion' }));
@@ -45,11 +124,12 @@ export const scrapeAPI = {
       body: JSON.stringify({ channel }),
     }),
   
-  getUrls: () => apiCall('/api/scrape/urls'),
+  getUrls: (since, jobId) =>
+    apiCall(withJob(`/api/scrape/urls${since ? `?since=${encodeURIComponent(since)}` : ''}`, jobId)),
   
-  getStatus: () => apiCall('/api/scrape/status'),
+  getStatus: (jobId) => apiCall(withJob('/api/scrape/status', jobId)),
   
-  getScrapedUrls: () => apiCall('/api/scraped-urls'),
+  getScrapedUrls: (jobId) => apiCall(withJob('/api/scraped-urls', jobId)),
 };
 
 // API de transcription
@@ -60,24 +140,30 @@ export const transcribeAPI = {
       body: JSON.stringify({ urls, email }),
     }),
   
-  transcribeBulk: (email) => 
+  transcribeBulk: (email, scrapeJobId) => 
     apiCall('/api/transcribe/bulk', {
       method: 'POST',
-      body: JSON.stringify({ email }),
+      body: JSON.stringify({ email, scrape_job_id: scrapeJobId }),
     }),
   
-  getStatus: () => apiCall('/api/transcribe/status'),
+  getStatus: (jobId) => apiCall(withJob('/api/transcribe/status', jobId)),
 };
 
 // API des fichiers de transcription
 export const transcriptsAPI = {
-  list: () => apiCall('/api/transcripts'),
+  list: (jobId) => apiCall(withJob('/api/transcripts', jobId)),
   
-  getContent: (filePath) => apiCall(`/api/transcripts/content?path=${encodeURIComponent(filePath)}`),
+  // Sans offset : contenu complet ; avec offset/length : une page (next_offset = null en fin de fichier)
+  getContent: (filePath, jobId, offset = null, length = 65536) =>
+    apiCall(withJob(`/api/transcripts/content?path=${encodeURIComponent(filePath)}${
+      offset === null ? '' : `&offset=${offset}&length=${length}`}`, jobId)),
   
-  download: () => apiCall('/api/transcripts/download'),
+  download: (jobId) => apiCall(withJob('/api/transcripts/download', jobId)),
   
-  clean: () => apiCall('/api/transcripts/clean', { method: 'POST' }),
+  clean: (jobId) => apiCall(withJob('/api/transcripts/clean', jobId), { method: 'POST' }),
+  
+  search: (query, jobId, limit = 20) =>
+    apiCall(withJob(`/api/transcripts/search?q=${encodeURIComponent(query)}&limit=${limit}`, jobId)),
 };
 
 // API de debug
@@ -91,6 +177,30 @@ export const debugAPI = {
   testTranscription: () => apiCall('/api/test-transcription', { method: 'POST' }),
 };
 
+// API des jobs (scraping / transcription)
+export const jobsAPI = {
+  get: (jobId) => apiCall(`/api/jobs/${encodeURIComponent(jobId)}`),
+  
+  list: () => apiCall('/api/jobs'),
+};
+
+// Flux d'événements temps réel (Server-Sent Events), filtré sur un job si jobId est fourni.
+// EventSource ne peut pas envoyer d'en-tête Authorization : le jeton passe en ?access_token=
+export const eventsAPI = {
+  subscribe: (handlers, { logs = false, jobId = null, token = currentSession?.token } = {}) => {
+    const params = new URLSearchParams();
+    if (logs) params.set('logs', '1');
+    if (jobId) params.set('job_id', jobId);
+    if (token && token !== 'dummy-token') params.set('access_token', token);
+    const query = params.toString();
+    const source = new EventSource(`${API_URL}/api/events${query ? `?${query}` : ''}`);
+    Object.entries(handlers).forEach(([type, handler]) => {
+      source.addEventListener(type, (e) => handler(JSON.parse(e.data)));
+    });
+    return source;
+  },
+};
+
 // API de santé
 export const healthAPI = {
   check: () => apiCall('/api/health'),
@@ -103,5 +213,7 @@ export default {
   transcribe: transcribeAPI,
   transcripts: transcriptsAPI,
   debug: debugAPI,
+  jobs: jobsAPI,
+  events: eventsAPI,
   health: healthAPI,
 };
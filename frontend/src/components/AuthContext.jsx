@@ -1,5 +1,6 @@
 // src/components/AuthContext.jsx
 import React, { createContext, useState, useContext, useEffect } from "react";
+import { onSessionRefresh, setSession } from "../api";
 
 const AuthContext = createContext();
 
@@ -9,8 +10,15 @@ export function AuthProvider({ children }) {
   useEffect(() => {
     const storedUser = localStorage.getItem("user");
     if (storedUser) {
-      setUser(JSON.parse(storedUser));
+      const parsed = JSON.parse(storedUser);
+      setSession(parsed);
+      setUser(parsed);
     }
+    // Jeton rafraîchi par authFetch : on garde la nouvelle session (état + localStorage)
+    onSessionRefresh((session) => {
+      setUser(session);
+      localStorage.setItem("user", JSON.stringify(session));
+    });
   }, []);
 
   const login = (userData) => {
@@ -20,14 +28,16 @@ export function AuthProvider({ children }) {
       return;
     }
     if (!userData?.token) {
-      userData.token = "dummy-token"; // fallback si backend n’envoie rien
+      userData.token = null; // pas de jeton : le backend retombe sur l'email (seulement si AUTH_REQUIRED=false)
     }
 
+    setSession(userData);
     setUser(userData);
     localStorage.setItem("user", JSON.stringify(userData));
   };
 
   const logout = () => {
+    setSession(null);
     setUser(null);
     localStorage.removeItem("user");
   };
@@ -1,6 +1,7 @@
 import { useState, useEffect } from "react";
 import toast from "react-hot-toast";
 import { API_URL } from "../config";
+import { authFetch, authHeaders, eventsAPI, withJob } from "../api";
 import { useAuth } from "../components/AuthContext";
 
 function Dashboard() {
@@ -15,6 +16,9 @@ function Dashboard() {
   const [transcriptionProgress, setTranscriptionProgress] = useState(0);
   const [transcriptionCompleted, setTranscriptionCompleted] = useState(false);
   const [transcriptionStarted, setTranscriptionStarted] = useState(false);
+  // Jobs en cours : chaque scraping / transcription a son propre dossier côté backend
+  const [scrapeJobId, setScrapeJobId] = useState(null);
+  const [transcribeJobId, setTranscribeJobId] = useState(null);
 
   // Ne pas charger les URLs scrapées au chargement - dashboard vierge
   useEffect(() => {
@@ -45,9 +49,9 @@ function Dashboard() {
     setScrapingProgress(0);
 
     try {
-      const res = await fetch(`${API_URL}/api/scrape/channel`, {
+      const res = await authFetch(`${API_URL}/api/scrape/channel`, {
         method: "POST",
-        headers: { "Content-Type": "application/json" },
+        headers: authHeaders(user),
         body: JSON.stringify({ channel: channelUrl }),
       });
 
@@ -57,6 +61,8 @@ function Dashboard() {
       }
 
       const data = await res.json();
+      const jobId = data.job_id;
+      setScrapeJobId(jobId);
       
       if (data.status === "started") {
         toast.success("Scraping démarré ! Les vidéos apparaîtront au fur et à mesure...");
@@ -64,24 +70,32 @@ function Dashboard() {
         // Progression initiale
         setScrapingProgress(5);
         
+        // Vidéos connues, indexées par video_id (fusion des deltas et des événements)
+        const videosByKey = new Map();
+        const renderVideos = () => {
+          const videoList = Array.from(videosByKey.values()).map((video, index) => ({
+            id: index,
+            url: video.url,
+            title: video.title,
+            videoId: video.video_id,
+            thumbnail: video.thumbnail
+          }));
+          setVideos(videoList);
+          return videoList;
+        };
+        
         // Charger immédiatement les URLs existantes (avec titres réels)
         const loadInitialUrls = async () => {
           try {
-            const urlsRes = await fetch(`${API_URL}/api/scrape/urls`);
+            const urlsRes = await authFetch(`${API_URL}${withJob("/api/scrape/urls", jobId)}`, { headers: authHeaders(user) });
             if (urlsRes.ok) {
               const urlsData = await urlsRes.json();
               if (urlsData.urls && urlsData.urls.length > 0) {
-                const videoList = urlsData.urls.map((video, index) => ({
-                  id: index,
-                  url: video.url,
-                  title: video.title,
-                  videoId: video.video_id,
-                  thumbnail: video.thumbnail
-                }));
-                setVideos(videoList);
-                const progress = Math.min(95, Math.max(10, (urlsData.urls.length / 30) * 100));
+                urlsData.urls.forEach((video) => videosByKey.set(video.video_id || video.url, video));
+                const videoList = renderVideos();
+                const progress = Math.min(95, Math.max(10, (videoList.length / 30) * 100));
                 setScrapingProgress(progress);
-                console.log(`🚀 URLs initiales chargées INSTANTANÉMENT avec titres réels: ${urlsData.urls.length}`);
+                console.log(`🚀 URLs initiales chargées INSTANTANÉMENT avec titres réels: ${videoList.length}`);
               }
             }
           } catch (err) {
@@ -90,29 +104,79 @@ function Dashboard() {
         };
         loadInitialUrls();
         
+        // Mode push : les workers poussent video_found / title_resolved / job_finished en SSE
+        if (typeof EventSource !== "undefined") {
+          const source = eventsAPI.subscribe({
+            video_found: (video) => {
+              videosByKey.set(video.video_id || video.url, video);
+              const videoList = renderVideos();
+              setScrapingProgress(Math.min(95, Math.max(10, (videoList.length / 30) * 100)));
+            },
+            title_resolved: (event) => {
+              const video = videosByKey.get(event.video_id);
+              if (video) {
+                videosByKey.set(event.video_id, { ...video, title: event.title });
+                renderVideos();
+              }
+            },
+            job_finished: (event) => {
+              if (event.kind !== "scrape") return;
+              source.close();
+              setScrapingProgress(100);
+              setIsScraping(false);
+              if (event.state === "failed") {
+                toast.error(`Échec du scraping: ${event.error}`);
+                return;
+              }
+              toast.success(`Scraping terminé ! ${event.count} vidéos trouvées avec titres réels.`);
+            },
+          }, { jobId });
+          
+          // Arrêter l'écoute après 3 minutes maximum
+          setTimeout(() => {
+            if (source.readyState !== EventSource.CLOSED) {
+              source.close();
+              setIsScraping(false);
+              setScrapingProgress(100);
+            }
+          }, 180000);
+          return;
+        }
+        
         let pollUrls, pollStatus, progressInterval;
         
-        // Démarrer le polling pour les URLs (plus fréquent) - VERSION RAPIDE
+        // Polling incrémental : on ne reçoit que les vidéos nouvelles/modifiées depuis le curseur,
+        // et un 304 quand rien n'a changé (ETag)
+        let urlsCursor = null;
+        let urlsEtag = null;
+        
         pollUrls = setInterval(async () => {
           try {
-            const urlsRes = await fetch(`${API_URL}/api/scrape/urls`);
+            const query = urlsCursor ? `?since=${encodeURIComponent(urlsCursor)}` : "";
+            const headers = urlsEtag ? { "If-None-Match": urlsEtag } : {};
+            const urlsRes = await authFetch(`${API_URL}${withJob(`/api/scrape/urls${query}`, jobId)}`, { headers: { ...authHeaders(user), ...headers }, cache: "no-store" });
+            if (urlsRes.status === 304) {
+              return;
+            }
             if (urlsRes.ok) {
               const urlsData = await urlsRes.json();
-              console.log(`DEBUG Frontend: Réponse API RAPIDE - ${urlsData.urls ? urlsData.urls.length : 0} URLs`);
+              urlsEtag = urlsRes.headers.get("ETag");
+              urlsCursor = urlsData.cursor || null;
+              console.log(`DEBUG Frontend: Delta API - ${urlsData.urls ? urlsData.urls.length : 0} URLs`);
               
-              if (urlsData.urls && urlsData.urls.length > 0) {
-                const videoList = urlsData.urls.map((video, index) => ({
-                  id: index,
-                  url: video.url,
-                  title: video.title,
-                  videoId: video.video_id,
-                  thumbnail: video.thumbnail
-                }));
-                setVideos(videoList);
+              if (urlsData.reset) {
+                videosByKey.clear();
+              }
+              (urlsData.urls || []).forEach((video) => {
+                videosByKey.set(video.video_id || video.url, video);
+              });
+              
+              if (videosByKey.size > 0) {
+                const videoList = renderVideos();
                 // Mettre à jour la progression basée sur le nombre d'URLs trouvées
-                const progress = Math.min(95, Math.max(10, (urlsData.urls.length / 30) * 100)); // Minimum 10%, max 95%
+                const progress = Math.min(95, Math.max(10, (videoList.length / 30) * 100)); // Minimum 10%, max 95%
                 setScrapingProgress(progress);
-                console.log(`⚡ URLs affichées INSTANTANÉMENT avec titres réels: ${urlsData.urls.length}, Progression: ${progress}%`);
+                console.log(`⚡ URLs affichées avec titres réels: ${videoList.length}, Progression: ${progress}%`);
               } else {
                 // Aucune URL encore trouvée, progression minimale
                 setScrapingProgress(5);
@@ -129,7 +193,7 @@ function Dashboard() {
         // Démarrer le polling pour le statut
         pollStatus = setInterval(async () => {
           try {
-            const statusRes = await fetch(`${API_URL}/api/scrape/status`);
+            const statusRes = await authFetch(`${API_URL}${withJob("/api/scrape/status", jobId)}`, { headers: authHeaders(user) });
             if (statusRes.ok) {
               const statusData = await statusRes.json();
               
@@ -149,7 +213,7 @@ function Dashboard() {
                 setIsScraping(false);
                 
                 // Charger les URLs finales une dernière fois
-                const finalUrlsRes = await fetch(`${API_URL}/api/scrape/urls`);
+                const finalUrlsRes = await authFetch(`${API_URL}${withJob("/api/scrape/urls", jobId)}`, { headers: authHeaders(user) });
                 if (finalUrlsRes.ok) {
                   const finalUrlsData = await finalUrlsRes.json();
                   if (finalUrlsData.urls && finalUrlsData.urls.length > 0) {
@@ -228,6 +292,41 @@ function Dashboard() {
     setSelectedVideos([]);
   };
 
+  /** Suivre la transcription via le flux d'événements (SSE) au lieu du polling */
+  const watchTranscriptionEvents = (total, jobId) => {
+    let saved = 0;
+    const source = eventsAPI.subscribe({
+      transcript_saved: () => {
+        saved += 1;
+        setTranscriptionProgress(Math.min(95, (saved / total) * 100));
+      },
+      job_finished: async (event) => {
+        if (event.kind !== "transcribe") return;
+        source.close();
+        setTranscriptionProgress(100);
+        setTranscriptionCompleted(true);
+        setIsTranscribing(false);
+        if (event.state === "failed") {
+          toast.error(`Échec transcription: ${event.error}`);
+          return;
+        }
+        await listFiles(jobId);
+        toast.success(`🎉 Transcription terminée ! ${event.success_count} fichier(s) généré(s).`);
+      },
+    }, { jobId });
+
+    // Arrêter l'écoute après 15 minutes maximum
+    setTimeout(() => {
+      if (source.readyState !== EventSource.CLOSED) {
+        source.close();
+        setTranscriptionProgress(100);
+        setTranscriptionCompleted(true);
+        setIsTranscribing(false);
+        listFiles(jobId);
+      }
+    }, 900000);
+  };
+
   /** Transcrire les vidéos sélectionnées */
   const transcribe = async () => {
     if (selectedVideos.length === 0) {
@@ -243,20 +342,14 @@ function Dashboard() {
     setTranscriptionProgress(0);
 
     try {
-      // Nettoyer les anciens fichiers de transcription
-      await fetch(`${API_URL}/api/transcripts/clean`, {
-        method: "POST",
-        headers: { "Content-Type": "application/json" }
-      });
-
       // Récupérer les URLs des vidéos sélectionnées
       const selectedUrls = videos
         .filter(video => selectedVideos.includes(video.id))
         .map(video => video.url);
 
-      const res = await fetch(`${API_URL}/api/transcribe/selected`, {
+      const res = await authFetch(`${API_URL}/api/transcribe/selected`, {
         method: "POST",
-        headers: { "Content-Type": "application/json" },
+        headers: authHeaders(user),
         body: JSON.stringify({ urls: selectedUrls }),
       });
 
@@ -267,14 +360,21 @@ function Dashboard() {
       }
 
       const data = await res.json();
+      const jobId = data.job_id;
+      setTranscribeJobId(jobId);
       
       if (data.status === "started") {
         toast.success(`Transcription démarrée ! Le navigateur va s'ouvrir pour traiter ${selectedVideos.length} vidéo(s).`);
         
-        // Démarrer le polling pour le statut de transcription
+        if (typeof EventSource !== "undefined") {
+          watchTranscriptionEvents(selectedVideos.length, jobId);
+          return;
+        }
+        
+        // Sans EventSource : polling du statut de transcription
         const pollTranscribe = setInterval(async () => {
           try {
-            const statusRes = await fetch(`${API_URL}/api/transcribe/status`);
+            const statusRes = await authFetch(`${API_URL}${withJob("/api/transcribe/status", jobId)}`, { headers: authHeaders(user) });
             if (statusRes.ok) {
               const statusData = await statusRes.json();
               
@@ -290,7 +390,7 @@ function Dashboard() {
                 setIsTranscribing(false);
                 
                 // Recharger la liste des fichiers
-      await listFiles();
+      await listFiles(jobId);
                 
                 toast.success(`🎉 Transcription terminée ! ${statusData.filesCount} fichier(s) généré(s).`);
               }
@@ -308,7 +408,7 @@ function Dashboard() {
             setTranscriptionCompleted(true);
             setIsTranscribing(false);
             toast.info("Transcription terminée (timeout)");
-            listFiles(); // Recharger les fichiers
+            listFiles(jobId); // Recharger les fichiers
           }
         }, 900000); // 15 minutes
 
@@ -341,16 +441,10 @@ function Dashboard() {
     setTranscriptionProgress(0);
 
     try {
-      // Nettoyer les anciens fichiers de transcription
-      await fetch(`${API_URL}/api/transcripts/clean`, {
-        method: "POST",
-        headers: { "Content-Type": "application/json" }
-      });
-
-      const res = await fetch(`${API_URL}/api/transcribe/bulk`, {
+      const res = await authFetch(`${API_URL}/api/transcribe/bulk`, {
         method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({}),
+        headers: authHeaders(user),
+        body: JSON.stringify({ scrape_job_id: scrapeJobId }),
       });
 
       if (!res.ok) {
@@ -360,14 +454,21 @@ function Dashboard() {
       }
 
       const data = await res.json();
+      const jobId = data.job_id;
+      setTranscribeJobId(jobId);
       
       if (data.status === "started") {
         toast.success(`Transcription démarrée ! Le navigateur va s'ouvrir pour traiter ${videos.length} vidéo(s).`);
         
-        // Démarrer le polling pour le statut de transcription
+        if (typeof EventSource !== "undefined") {
+          watchTranscriptionEvents(videos.length, jobId);
+          return;
+        }
+        
+        // Sans EventSource : polling du statut de transcription
         const pollTranscribe = setInterval(async () => {
           try {
-            const statusRes = await fetch(`${API_URL}/api/transcribe/status`);
+            const statusRes = await authFetch(`${API_URL}${withJob("/api/transcribe/status", jobId)}`, { headers: authHeaders(user) });
             if (statusRes.ok) {
               const statusData = await statusRes.json();
               
@@ -383,7 +484,7 @@ function Dashboard() {
                 setIsTranscribing(false);
                 
                 // Recharger la liste des fichiers
-                await listFiles();
+                await listFiles(jobId);
                 
                 toast.success(`🎉 Transcription terminée ! ${statusData.filesCount} fichier(s) généré(s).`);
               }
@@ -401,7 +502,7 @@ function Dashboard() {
             setTranscriptionCompleted(true);
             setIsTranscribing(false);
             toast.info("Transcription terminée (timeout)");
-            listFiles(); // Recharger les fichiers
+            listFiles(jobId); // Recharger les fichiers
           }
         }, 900000); // 15 minutes
         
@@ -419,16 +520,25 @@ function Dashboard() {
   };
 
   /** Lister les fichiers */
-  const listFiles = async () => {
+  const listFiles = async (jobId = transcribeJobId) => {
     try {
-      const res = await fetch(`${API_URL}/api/transcripts`);
-      if (!res.ok) {
-        const errorData = await res.json();
-        throw new Error(errorData.error || "Erreur API list_files");
-      }
+      // Liste paginée (curseur) : on suit next_cursor jusqu'à la dernière page
+      let allFiles = [];
+      let cursor = null;
+      do {
+        const endpoint = withJob("/api/transcripts", jobId);
+        const page = cursor ? `${endpoint}${endpoint.includes("?") ? "&" : "?"}cursor=${cursor}` : endpoint;
+        const res = await authFetch(`${API_URL}${page}`, { headers: authHeaders(user) });
+        if (!res.ok) {
+          const errorData = await res.json();
+          throw new Error(errorData.error || "Erreur API list_files");
+        }
 
-      const data = await res.json();
-      setFiles(data.files || []);
+        const data = await res.json();
+        allFiles = allFiles.concat(data.files || []);
+        cursor = data.next_cursor;
+      } while (cursor);
+      setFiles(allFiles);
     } catch (err) {
       toast.error(`Impossible de lister les fichiers: ${err.message}`);
       console.error(err);
@@ -438,7 +548,7 @@ function Dashboard() {
   /** Rafraîchir la liste des vidéos scrapées */
   const refreshScrapedVideos = async () => {
     try {
-      const res = await fetch(`${API_URL}/api/scraped-urls`);
+      const res = await authFetch(`${API_URL}${withJob("/api/scraped-urls", scrapeJobId)}`, { headers: authHeaders(user) });
       if (res.ok) {
         const data = await res.json();
         if (data.videos && data.videos.length > 0) {
@@ -467,9 +577,9 @@ function Dashboard() {
   };
 
   /** Charger les URLs scrapées existantes */
-  const loadScrapedUrls = async () => {
+  const loadScrapedUrls = async (retries = 5) => {
     try {
-      const res = await fetch(`${API_URL}/api/scraped-urls`);
+      const res = await authFetch(`${API_URL}${withJob("/api/scraped-urls", scrapeJobId)}`, { headers: authHeaders(user) });
       if (res.ok) {
         const data = await res.json();
         if (data.videos && data.videos.length > 0) {
@@ -482,6 +592,10 @@ function Dashboard() {
           }));
           setVideos(videoList);
         }
+        // Titres manquants résolus en arrière-plan côté serveur : on repasse les chercher
+        if (data.pending > 0 && retries > 0) {
+          setTimeout(() => loadScrapedUrls(retries - 1), 2000);
+        }
       }
     } catch (err) {
       console.error("Erreur lors du chargement des URLs:", err);
@@ -489,8 +603,22 @@ function Dashboard() {
   };
 
   /** Télécharger tous les fichiers de transcription */
-  const downloadTranscripts = () => {
-    window.open(`${API_URL}/api/transcripts/download`, '_blank');
+  const downloadTranscripts = async () => {
+    // fetch + Blob : window.open ne peut pas envoyer l'en-tête Authorization
+    try {
+      const res = await authFetch(`${API_URL}${withJob("/api/transcripts/download", transcribeJobId)}`, { headers: authHeaders(user) });
+      if (!res.ok) {
+        const errorData = await res.json().catch(() => ({}));
+        throw new Error(errorData.error || "Erreur API download");
+      }
+      const link = document.createElement("a");
+      link.href = URL.createObjectURL(await res.blob());
+      link.download = "transcriptions.zip";
+      link.click();
+      URL.revokeObjectURL(link.href);
+    } catch (err) {
+      toast.error(`Téléchargement impossible: ${err.message}`);
+    }
   };
 
   /** Voir les logs de la session */
@@ -499,7 +627,7 @@ function Dashboard() {
 
   const fetchLogs = async () => {
     try {
-      const res = await fetch(`${API_URL}/api/logs`);
+      const res = await authFetch(`${API_URL}/api/logs`, { headers: authHeaders(user) });
       if (res.ok) {
         const data = await res.json();
         setLogs(data.logs);
@@ -518,7 +646,7 @@ function Dashboard() {
       console.log("🔧 Debug transcription...");
       
       // Vérifier les URLs
-      const urlsRes = await fetch(`${API_URL}/api/debug/urls`);
+      const urlsRes = await authFetch(`${API_URL}${withJob("/api/debug/urls", scrapeJobId)}`, { headers: authHeaders(user) });
       if (urlsRes.ok) {
         const urlsData = await urlsRes.json();
         console.log("URLs debug:", urlsData);
@@ -526,7 +654,7 @@ function Dashboard() {
       }
       
       // Vérifier les transcripts
-      const transcriptsRes = await fetch(`${API_URL}/api/debug/transcripts`);
+      const transcriptsRes = await authFetch(`${API_URL}${withJob("/api/debug/transcripts", transcribeJobId)}`, { headers: authHeaders(user) });
       if (transcriptsRes.ok) {
         const transcriptsData = await transcriptsRes.json();
         console.log("Transcripts debug:", transcriptsData);
@@ -534,7 +662,7 @@ function Dashboard() {
       }
       
       // Vérifier le statut de transcription
-      const statusRes = await fetch(`${API_URL}/api/transcribe/status`);
+      const statusRes = await authFetch(`${API_URL}${withJob("/api/transcribe/status", transcribeJobId)}`, { headers: authHeaders(user) });
       if (statusRes.ok) {
         const statusData = await statusRes.json();
         console.log("Status transcription:", statusData);
@@ -548,24 +676,60 @@ function Dashboard() {
   };
 
 
-  /** Afficher le contenu d'un fichier */
+  /** Afficher le contenu d'un fichier (chargé par pages au défilement) */
+  const CONTENT_PAGE_BYTES = 64 * 1024;
   const [selectedFile, setSelectedFile] = useState(null);
   const [fileContent, setFileContent] = useState("");
+  const [contentNextOffset, setContentNextOffset] = useState(null);
+  const [loadingContent, setLoadingContent] = useState(false);
+
+  const fetchContentPage = async (filePath, offset) => {
+    const query = `path=${encodeURIComponent(filePath)}&offset=${offset}&length=${CONTENT_PAGE_BYTES}`;
+    const res = await authFetch(`${API_URL}${withJob(`/api/transcripts/content?${query}`, transcribeJobId)}`, { headers: authHeaders(user) });
+    if (!res.ok) {
+      const errorData = await res.json();
+      throw new Error(errorData.error || "Erreur lors de la lecture du fichier");
+    }
+    return res.json();
+  };
 
   const viewFileContent = async (filePath) => {
     try {
-      const res = await fetch(`${API_URL}/api/transcripts/content?path=${encodeURIComponent(filePath)}`);
-      if (!res.ok) {
-        const errorData = await res.json();
-        throw new Error(errorData.error || "Erreur lors de la lecture du fichier");
-      }
-
-      const data = await res.json();
+      setLoadingContent(true);
+      const data = await fetchContentPage(filePath, 0);
       setSelectedFile(filePath);
-      setFileContent(data.content);
+      // Titre / URL / date de l'exécution : métadonnées du fichier, hors du texte paginé
+      setFileContent((data.header || "") + data.content);
+      setContentNextOffset(data.next_offset);
     } catch (err) {
       toast.error(`Impossible de lire le fichier: ${err.message}`);
       console.error(err);
+    } finally {
+      setLoadingContent(false);
+    }
+  };
+
+  const loadMoreContent = async () => {
+    if (loadingContent || contentNextOffset === null || !selectedFile) return;
+    const filePath = selectedFile;
+    try {
+      setLoadingContent(true);
+      const data = await fetchContentPage(filePath, contentNextOffset);
+      setFileContent((prev) => prev + data.content);
+      setContentNextOffset(data.next_offset);
+    } catch (err) {
+      toast.error(`Impossible de lire la suite du fichier: ${err.message}`);
+      console.error(err);
+    } finally {
+      setLoadingContent(false);
+    }
+  };
+
+  const onContentScroll = (e) => {
+    const el = e.currentTarget;
+    // Page suivante quand on approche du bas de la zone
+    if (el.scrollHeight - el.scrollTop - el.clientHeight < 200) {
+      loadMoreContent();
     }
   };
 
@@ -807,8 +971,13 @@ function Dashboard() {
                 Fermer
               </button>
             </div>
-            <div className="bg-gray-100 p-4 rounded max-h-96 overflow-y-auto">
+            <div className="bg-gray-100 p-4 rounded max-h-96 overflow-y-auto" onScroll={onContentScroll}>
               <pre className="text-sm whitespace-pre-wrap">{fileContent}</pre>
+              {contentNextOffset !== null && (
+                <div className="text-center text-xs text-gray-500 mt-2">
+                  {loadingContent ? "Chargement..." : "Faites défiler pour charger la suite"}
+                </div>
+              )}
             </div>
           </div>
         )}
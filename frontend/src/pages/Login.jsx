@@ -63,10 +63,13 @@ export default function Login() {
       const data = await res.json();
       console.log("Données reçues:", data);
       
-      // Le backend Flask retourne {message, token, user: {email}}
+      // Le backend Flask retourne {message, token, session: {refresh_token, expires_at...}, user: {email}}
       const userData = { 
         email: data.user.email, 
-        token: data.token
+        token: data.token,
+        // Rafraîchissement du jeton avant expiration (cf. authFetch dans api.js)
+        refresh_token: data.session?.refresh_token,
+        expires_at: data.session?.expires_at
       };
 
       login(userData);
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Test du démarrage de l'API : `import app` (ce que fait chaque worker gunicorn) doit rester
+sous un budget de temps et ne faire aucun accès réseau (Supabase, Postgres).
+
+Chaque mesure tourne dans un interpréteur neuf, avec Supabase et la base pointant vers une
+adresse injoignable ; toute tentative de connexion sortante est interceptée et signalée.
+
+Usage :
+    python test_import_time.py                       # budget IMPORT_BUDGET_MS (1500 ms par défaut)
+    python test_import_time.py --budget-ms 800 --runs 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1500"))
+BACKEND_DIR = Path(__file__).resolve().parent / "backend"
+UNREACHABLE_HOST = "10.255.255.1"  # non routable : une connexion bloquerait jusqu'au timeout
+
+# Exécuté dans l'interpréteur mesuré : les connexions sortantes sont refusées et enregistrées
+CHILD_CODE = r"""
+import json, socket, sys, time
+attempts = []
+_connect = socket.socket.connect
+def guarded_connect(self, address):
+    if self.family in (socket.AF_INET, socket.AF_INET6):
+        attempts.append(str(address))
+        raise OSError("connexion réseau pendant l'import")
+    return _connect(self, address)
+socket.socket.connect = guarded_connect
+sys.path.insert(0, sys.argv[1])
+started = time.perf_counter()
+import app
+elapsed = (time.perf_counter() - started) * 1000
+print(json.dumps({
+    "ms": elapsed,
+    "connections": attempts,
+    "supabase_loaded": "supabase" in sys.modules,
+    "has_factory": callable(getattr(app, "create_app", None)),
+    "routes": len(list(app.app.url_map.iter_rules())),
+}))
+"""
+
+
+def database_url(tmp_dir):
+    """Postgres injoignable si le pilote est installé (vérifie l'absence de connexion), sinon SQLite"""
+    try:
+        import psycopg2  # noqa: F401
+        return f"postgresql://user:password@{UNREACHABLE_HOST}:5432/postgres"
+    except ImportError:
+        return f"sqlite:///{Path(tmp_dir) / 'import_test.db'}"
+
+
+def measure(tmp_dir):
+    env = dict(
+        os.environ,
+        SUPABASE_URL=f"http://{UNREACHABLE_HOST}",
+        SUPABASE_KEY="import-test-key",
+        DATABASE_URL=database_url(tmp_dir),
+        DB_AUTO_MIGRATE="false",
+        LOG_FILE=str(Path(tmp_dir) / "session_log.jsonl"),
+        LOG_CONSOLE="false",
+        EVENTS_FILE=str(Path(tmp_dir) / "events.jsonl"),
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD_CODE, str(BACKEND_DIR)],
+        cwd=tmp_dir, env=env, capture_output=True, text=True, timeout=60
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import impossible")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Budget de temps d'import de l'API")
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    print("TEST DE DÉMARRAGE - Import de app.py")
+    print("=" * 60)
+
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for _ in range(max(1, args.runs)):
+                results.append(measure(tmp_dir))
+    except Exception as e:
+        print(f"Erreur pendant le test: {e}")
+        return 1
+
+    timings = [result["ms"] for result in results]
+    median = statistics.median(timings)
+    print(f"Import : médiane={median:.0f} ms  min={min(timings):.0f} ms  max={max(timings):.0f} ms "
+          f"({len(timings)} mesure(s), budget {args.budget_ms:.0f} ms)")
+    print(f"Routes enregistrées : {results[0]['routes']}")
+
+    all_passed = True
+    if median > args.budget_ms:
+        print(f"FAIL import {median:.0f} ms > budget {args.budget_ms:.0f} ms")
+        all_passed = False
+    connections = sorted({address for result in results for address in result["connections"]})
+    if connections:
+        print(f"FAIL connexion(s) réseau pendant l'import : {', '.join(connections)}")
+        all_passed = False
+    if any(result["supabase_loaded"] for result in results):
+        print("FAIL le client Supabase est importé au démarrage (doit être créé à la demande)")
+        all_passed = False
+    if not all(result["has_factory"] for result in results):
+        print("FAIL create_app() absent")
+        all_passed = False
+
+    print("=" * 60)
+    print("PASS Démarrage sans réseau, sous le budget" if all_passed else "ECHEC")
+    return 0 if all_passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
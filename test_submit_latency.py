@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Test de charge du chemin de soumission des transcriptions.
+Envoie des POST /api/transcribe/selected en parallèle et vérifie que le p99 de latence
+reste sous SUBMIT_P99_MS (10 ms par défaut : la requête ne fait que mettre le job en file),
+tout en vérifiant que /api/health répond pendant la charge.
+
+Par défaut, l'API est lancée sous gunicorn (comme en production) sur une base SQLite
+temporaire, avec un compte premium de test (aucun quota) et un jeton HS256 signé localement.
+Aucun worker.py n'est lancé : les jobs restent en file.
+
+Usage :
+    python test_submit_latency.py                           # API gunicorn temporaire
+    python test_submit_latency.py --requests 400 --concurrency 8
+    python test_submit_latency.py --url http://host:port --token <jeton d'un compte premium>
+"""
+
+import argparse
+import os
+import secrets
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+SUBMIT_P99_MS = float(os.getenv("SUBMIT_P99_MS", "10"))
+BACKEND_DIR = Path(__file__).resolve().parent / "backend"
+TEST_URL = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+TEST_EMAIL = "latency-test@example.test"
+HEALTH_INTERVAL = 0.05  # secondes entre deux sondes /api/health pendant la charge
+# Clients et API partagent la machine : au-delà des cœurs disponibles, on mesure la file
+# d'attente CPU et non le chemin de soumission (un cœur reste aux workers gunicorn)
+DEFAULT_CONCURRENCY = max(1, min(4, (os.cpu_count() or 1) - 1))
+
+# Exécuté dans backend/ avec l'environnement temporaire : schéma créé, compte premium de test
+SETUP_CODE = r"""
+import sys
+from sqlalchemy import text
+import app
+from database import engine
+app.create_user(sys.argv[1], app.hash_password("latency-test"))
+with engine.begin() as conn:
+    conn.execute(text("UPDATE users SET premium = TRUE WHERE email = :email"), {"email": sys.argv[1]})
+"""
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def sign_token(secret, email):
+    import jwt
+    now = int(time.time())
+    payload = {"sub": secrets.token_hex(16), "email": email, "role": "authenticated",
+               "aud": "authenticated", "iat": now, "exp": now + 3600}
+    return jwt.encode(payload, secret, algorithm="HS256")
+
+
+def start_backend(tmp_dir, workers):
+    """API gunicorn sur une base SQLite temporaire ; retourne (processus, url, jeton)"""
+    secret = secrets.token_hex(32)
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{Path(tmp_dir) / 'latency.db'}",
+        DB_AUTO_MIGRATE="false",
+        JOBS_ROOT=str(Path(tmp_dir) / "jobs"),
+        JOB_QUEUE_LIMIT="1000000",
+        SUPABASE_URL="http://supabase.invalid",
+        SUPABASE_JWT_SECRET=secret,
+        LOG_FILE=str(Path(tmp_dir) / "session_log.jsonl"),
+        LOG_CONSOLE="false",
+        EVENTS_FILE=str(Path(tmp_dir) / "events.jsonl"),
+    )
+    subprocess.run([sys.executable, "app.py", "migrate"], cwd=BACKEND_DIR, env=env,
+                   check=True, capture_output=True, timeout=60)
+    subprocess.run([sys.executable, "-c", SETUP_CODE, TEST_EMAIL], cwd=BACKEND_DIR, env=env,
+                   check=True, capture_output=True, timeout=60)
+
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "app:app", "--bind", f"127.0.0.1:{port}",
+         "--workers", str(workers), "--worker-class", "gthread", "--threads", "8", "--graceful-timeout", "5"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{url}/api/health", timeout=1).status_code == 200:
+                return process, url, sign_token(secret, TEST_EMAIL)
+        except requests.RequestException:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("l'API n'a pas démarré")
+
+
+def make_http_client(base_url, token):
+    """Une session HTTP (keep-alive) par thread client : pas de connexions partagées entre threads"""
+    local = threading.local()
+    headers = {"Authorization": f"Bearer {token}"}
+
+    def session():
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        return local.session
+
+    def submit():
+        return session().post(f"{base_url}/api/transcribe/selected", json={"urls": [TEST_URL]},
+                              headers=headers, timeout=10).status_code
+
+    def health():
+        return session().get(f"{base_url}/api/health", timeout=10).status_code
+
+    return submit, health
+
+
+def timed(func):
+    start = time.perf_counter()
+    status = func()
+    return status, (time.perf_counter() - start) * 1000
+
+
+def run_load(submit, health, total, concurrency):
+    """Lance `total` soumissions avec `concurrency` clients et sonde /api/health en parallèle"""
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        # Échauffement : connexion de chaque thread, cache premium des workers
+        list(executor.map(lambda _: submit(), range(concurrency * 4)))
+        futures = [executor.submit(timed, submit) for _ in range(total)]
+        health_results = []
+        while not all(f.done() for f in futures):
+            health_results.append(timed(health))
+            time.sleep(HEALTH_INTERVAL)
+        submit_results = [f.result() for f in futures]
+    return submit_results, health_results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge de /api/transcribe/selected")
+    parser.add_argument("--url", help="API déjà lancée (sinon : gunicorn temporaire)")
+    parser.add_argument("--token", default=os.getenv("SUBMIT_TOKEN"),
+                        help="jeton d'un compte premium (obligatoire avec --url)")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="workers gunicorn de l'API temporaire")
+    args = parser.parse_args()
+
+    print("TEST DE CHARGE - Soumission de transcriptions")
+    print("=" * 60)
+
+    if args.url and not args.token:
+        print("Erreur: --token (ou SUBMIT_TOKEN) requis avec --url")
+        return 1
+
+    process = None
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            try:
+                if args.url:
+                    url, token = args.url.rstrip("/"), args.token
+                else:
+                    process, url, token = start_backend(tmp_dir, args.workers)
+                submit, health = make_http_client(url, token)
+                submit_results, health_results = run_load(submit, health, args.requests, args.concurrency)
+            finally:
+                if process is not None:
+                    process.terminate()
+                    process.wait(timeout=30)
+    except Exception as e:
+        print(f"Erreur pendant le test: {e}")
+        return 1
+
+    latencies = [ms for _, ms in submit_results]
+    statuses = {}
+    for status, _ in submit_results:
+        statuses[status] = statuses.get(status, 0) + 1
+    health_latencies = [ms for _, ms in health_results] or [0.0]
+    p99 = percentile(latencies, 99)
+
+    print(f"Soumissions : {len(latencies)} (concurrence {args.concurrency}), codes {statuses}")
+    print(f"Latence soumission : p50={statistics.median(latencies):.2f} ms  "
+          f"p95={percentile(latencies, 95):.2f} ms  p99={p99:.2f} ms  max={max(latencies):.2f} ms")
+    print(f"Health pendant la charge : {len(health_results)} appels, "
+          f"p99={percentile(health_latencies, 99):.2f} ms")
+
+    accepted = statuses.get(202, 0)
+    all_passed = True
+    if accepted != len(latencies):
+        print(f"FAIL {len(latencies) - accepted} soumission(s) non acceptées (202 attendu)")
+        all_passed = False
+    if p99 >= SUBMIT_P99_MS:
+        print(f"FAIL p99 {p99:.2f} ms >= {SUBMIT_P99_MS} ms")
+        all_passed = False
+    if any(status != 200 for status, _ in health_results):
+        print("FAIL /api/health a échoué pendant la charge")
+        all_passed = False
+
+    print("=" * 60)
+    print("PASS Soumission non bloquante" if all_passed else "ECHEC")
+    return 0 if all_passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""
+Configuration commune des tests : base SQLite, dossiers de jobs, magasin, cache et logs dans un
+répertoire temporaire. Les variables sont posées AVANT l'import des modules du backend
+(ils lisent leur configuration à l'import).
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+TEST_DIR = Path(tempfile.mkdtemp(prefix="yt-saas-tests-"))
+
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{TEST_DIR / 'test.db'}",
+    "DB_AUTO_MIGRATE": "true",
+    "JOBS_ROOT": str(TEST_DIR / "jobs"),
+    "TRANSCRIPT_STORE_DIR": str(TEST_DIR / "transcript_store"),
+    "VIDEO_CACHE_DIR": str(TEST_DIR / "video_cache"),
+    "EVENTS_FILE": str(TEST_DIR / "events.jsonl"),
+    "LOG_FILE": str(TEST_DIR / "session_log.jsonl"),
+    "LOG_CONSOLE": "false",
+    "SUPABASE_URL": "http://supabase.invalid",
+    "SUPABASE_JWT_SECRET": "test-jwt-secret-for-the-unit-test-suite",
+    "ADMIN_KEY": "test-admin-key",
+})
+sys.path.insert(0, str(ROOT / "backend"))
+
+
+def pytest_sessionfinish(session, exitstatus):
+    # Le logger vide sa file à la sortie du processus : le fermer avant de supprimer son dossier
+    if "logger" in sys.modules:
+        sys.modules["logger"].logger.close()
+    shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def flask_app():
+    """Application créée par app.py (schéma SQLite créé à l'import, DB_AUTO_MIGRATE) : importée pour tous les tests"""
+    import app as app_module
+    app_module.app.config["TESTING"] = True
+    return app_module.app
+
+
+@pytest.fixture
+def client(flask_app):
+    return flask_app.test_client()
+
+
+def make_token(email, expires_in=3600, secret=None, **claims):
+    """Jeton d'accès Supabase HS256 signé avec le secret de test"""
+    import jwt
+    now = int(time.time())
+    payload = {"sub": str(uuid.uuid4()), "email": email, "role": "authenticated", "aud": "authenticated",
+               "iat": now, "exp": now + expires_in, **claims}
+    return jwt.encode(payload, secret or os.environ["SUPABASE_JWT_SECRET"], algorithm="HS256")
+
+
+def bearer(email, **kwargs):
+    return {"Authorization": f"Bearer {make_token(email, **kwargs)}"}
+
+
+ADMIN_HEADERS = {"X-Admin-Key": os.environ["ADMIN_KEY"]}
+
+
+@pytest.fixture
+def email():
+    """Adresse unique par test (la base est partagée par toute la session)"""
+    return f"user-{uuid.uuid4().hex[:12]}@example.test"
@@ -0,0 +1,95 @@
+"""Opérations admin groupées : lecture JSON / CSV, validation du corps, UPDATE par paquets (app.py)"""
+
+import io
+import uuid
+
+import pytest
+from sqlalchemy import text
+
+from conftest import ADMIN_HEADERS
+from database import engine
+
+
+def new_emails(count):
+    import app as app_module
+    emails = [f"bulk-{uuid.uuid4().hex[:12]}@example.test" for _ in range(count)]
+    for email in emails:
+        app_module.create_user(email, app_module.hash_password("secret"))
+    return emails
+
+
+def premium_of(email):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT premium FROM users WHERE email = :email"), {"email": email}).scalar()
+
+
+def statuses(response):
+    return {result["email"]: result["status"] for result in response.json["results"]}
+
+
+@pytest.mark.parametrize("body", [["a@example.test"], "a@example.test", {"emails": "a@example.test"},
+                                  {"users": {"email": "a@example.test"}}, {"emails": ["a@example.test"], "premium": [1]}])
+def test_malformed_json_bodies_are_rejected(client, body):
+    response = client.post("/api/admin/bulk/set-premium", json=body, headers=ADMIN_HEADERS)
+    assert response.status_code == 400
+    assert response.json["error"]
+
+
+def test_invalid_json_is_rejected(client):
+    response = client.post("/api/admin/bulk/reset-trial", data="{pas du json", content_type="application/json",
+                           headers=ADMIN_HEADERS)
+    assert response.status_code == 400
+
+
+def test_badly_typed_rows_are_reported_invalid(client):
+    (email,) = new_emails(1)
+    body = {"users": [{"email": None}, {"email": 123}, "texte", {"email": email, "premium": {"x": 1}},
+                      {"email": "sans-arobase"}]}
+    response = client.post("/api/admin/bulk/set-premium", json=body, headers=ADMIN_HEADERS)
+    assert response.status_code == 200
+    assert statuses(response) == {"null": "invalid", "123": "invalid", "texte": "invalid",
+                                  email: "invalid", "sans-arobase": "invalid"}
+    assert response.json["summary"] == {"invalid": 5}
+
+
+def test_json_rows_are_updated_in_chunks(client, monkeypatch):
+    import app as app_module
+    monkeypatch.setattr(app_module, "ADMIN_BULK_CHUNK", 2)
+    emails = new_emails(5)
+    unknown = f"inconnu-{uuid.uuid4().hex[:8]}@example.test"
+    body = {"users": [{"email": f"  {email} ", "premium": True} for email in emails]
+            + [{"email": unknown, "premium": True}, {"email": emails[0], "premium": "false"}]}
+
+    response = client.post("/api/admin/bulk/set-premium", json=body, headers=ADMIN_HEADERS)
+
+    assert response.status_code == 200
+    assert statuses(response) == {**{email: "updated" for email in emails}, unknown: "not_found"}
+    assert [result["email"] for result in response.json["results"]][-1] == emails[0]  # dernière valeur gardée
+    assert not premium_of(emails[0])
+    assert all(premium_of(email) for email in emails[1:])
+
+
+def test_csv_upload_with_and_without_header(client):
+    emails = new_emails(3)
+    csv_body = "email,premium\n" + f"{emails[0]},oui\n{emails[1]},0\n"
+    response = client.post("/api/admin/bulk/set-premium", headers=ADMIN_HEADERS, content_type="multipart/form-data",
+                           data={"file": (io.BytesIO(csv_body.encode("utf-8")), "users.csv")})
+    assert statuses(response) == {emails[0]: "updated", emails[1]: "updated"}
+    assert premium_of(emails[0]) and not premium_of(emails[1])
+
+    # Sans en-tête : colonnes email[,premium], valeur par défaut en paramètre
+    response = client.post("/api/admin/bulk/set-premium?premium=true", data=f"{emails[2]}\n",
+                           content_type="text/csv", headers=ADMIN_HEADERS)
+    assert statuses(response) == {emails[2]: "updated"}
+    assert premium_of(emails[2])
+
+
+def test_bulk_reset_trial(client):
+    emails = new_emails(2)
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE users SET trial_count = 3 WHERE email IN (:a, :b)"), {"a": emails[0], "b": emails[1]})
+    response = client.post("/api/admin/bulk/reset-trial", json={"emails": emails}, headers=ADMIN_HEADERS)
+    assert response.json["summary"] == {"updated": 2}
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT SUM(trial_count) FROM users WHERE email IN (:a, :b)"),
+                            {"a": emails[0], "b": emails[1]}).scalar() == 0
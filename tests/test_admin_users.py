@@ -0,0 +1,75 @@
+"""Liste admin des utilisateurs : pagination keyset (created_at, id), NULL compris, curseurs invalides"""
+
+import uuid
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text, update
+
+from conftest import ADMIN_HEADERS
+from database import engine
+
+
+@pytest.fixture
+def users():
+    """Comptes de test : même created_at sur plusieurs pages, et created_at NULL (anciens comptes)"""
+    import app as app_module
+    same_time = datetime(2020, 1, 1, 12, 0, 0)
+    created = [same_time] * 3 + [None] * 3 + [datetime(2019, 6, 1), datetime(2021, 3, 4)]
+    emails = [f"page-{uuid.uuid4().hex[:12]}@example.test" for _ in created]
+    for email in emails:
+        app_module.create_user(email, app_module.hash_password("secret"))
+    User = app_module.User
+    with engine.begin() as conn:
+        # UPDATE typé : même format de date que les lignes écrites par l'application
+        for email, created_at in zip(emails, created):
+            conn.execute(update(User).where(User.email == email).values(created_at=created_at))
+    return emails
+
+
+def all_pages(client, limit):
+    seen, cursor, pages = [], None, 0
+    while True:
+        url = f"/api/admin/users?limit={limit}" + (f"&cursor={cursor}" if cursor else "")
+        response = client.get(url, headers=ADMIN_HEADERS)
+        assert response.status_code == 200
+        seen += [user["email"] for user in response.json["users"]]
+        cursor = response.json["next_cursor"]
+        pages += 1
+        assert pages < 1000, "la pagination ne progresse pas"
+        if cursor is None:
+            return seen
+
+
+def total_users():
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT COUNT(*) FROM users")).scalar()
+
+
+def users_without_date():
+    with engine.connect() as conn:
+        return {row[0] for row in conn.execute(text("SELECT email FROM users WHERE created_at IS NULL"))}
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 7])
+def test_pages_cover_every_user_once(client, users, limit):
+    seen = all_pages(client, limit)
+    assert len(seen) == len(set(seen)) == total_users()
+    assert set(users) <= set(seen)
+    # Comptes sans created_at en dernier, quel que soit le moteur
+    undated = users_without_date()
+    assert set(seen[-len(undated):]) == undated
+    positions = [seen.index(email) for email in users]
+    assert positions[6] < min(positions[:3]) and max(positions[:3]) < positions[7]
+
+
+def test_ndjson_export_matches_pages(client, users):
+    response = client.get("/api/admin/users?format=ndjson", headers=ADMIN_HEADERS)
+    lines = [line for line in response.data.decode("utf-8").splitlines() if line]
+    assert len(lines) == total_users()
+
+
+@pytest.mark.parametrize("cursor", ["sans-separateur", "pas-une-date|abc", "2020-01-01T12:00:00|", "|"])
+def test_malformed_cursor_is_rejected(client, cursor):
+    response = client.get(f"/api/admin/users?cursor={cursor}", headers=ADMIN_HEADERS)
+    assert response.status_code == 400
@@ -0,0 +1,85 @@
+"""Vérification des jetons (HS256, JWKS, expiration) et décorateurs d'accès (auth.py)"""
+
+import time
+import uuid
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ec
+
+import auth
+from auth import AuthError, verify_token
+from conftest import ADMIN_HEADERS, bearer, make_token
+from jobs import create_job
+
+
+def test_verify_token_hs256(email):
+    claims = verify_token(make_token(email))
+    assert claims["email"] == email
+    assert claims["aud"] == "authenticated"
+
+
+def test_verify_token_rejects_a_foreign_secret(email):
+    with pytest.raises(AuthError):
+        verify_token(make_token(email, secret="un-autre-secret-de-projet-supabase"))
+
+
+def test_verify_token_es256_through_jwks(email, monkeypatch):
+    private_key = ec.generate_private_key(ec.SECP256R1())
+
+    class StubJwks:
+        """Client JWKS sans réseau : renvoie la clé publique attendue pour le `kid` du jeton"""
+        def get_signing_key_from_jwt(self, token):
+            assert jwt.get_unverified_header(token)["kid"] == "test-key"
+            return type("SigningKey", (), {"key": private_key.public_key()})()
+
+    monkeypatch.setattr(auth, "_jwks_client", StubJwks())
+    now = int(time.time())
+    token = jwt.encode(
+        {"sub": str(uuid.uuid4()), "email": email, "aud": "authenticated", "iat": now, "exp": now + 3600},
+        private_key, algorithm="ES256", headers={"kid": "test-key"}
+    )
+    assert verify_token(token)["email"] == email
+
+    other_key = ec.generate_private_key(ec.SECP256R1())
+    forged = jwt.encode(
+        {"sub": str(uuid.uuid4()), "email": email, "aud": "authenticated", "exp": now + 3600},
+        other_key, algorithm="ES256", headers={"kid": "test-key"}
+    )
+    with pytest.raises(AuthError):
+        verify_token(forged)
+
+
+def test_expired_token_is_refused(client, email):
+    token = make_token(email, expires_in=-3600)
+    with pytest.raises(AuthError, match="expired"):
+        verify_token(token)
+    response = client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
+    assert "expired" in response.get_json()["error"]
+
+
+def test_bad_token_does_not_block_public_routes(client):
+    assert client.get("/api/health", headers={"Authorization": "Bearer pas-un-jeton"}).status_code == 200
+
+
+def test_user_routes_require_a_token_by_default(client, email):
+    assert auth.AUTH_REQUIRED
+    assert client.get("/api/jobs").status_code == 401
+    assert client.get("/api/jobs", headers=bearer(email)).status_code == 200
+    assert client.get("/api/jobs", headers=ADMIN_HEADERS).status_code == 200
+
+
+def test_body_email_only_with_explicit_opt_out(client, email, monkeypatch):
+    job = create_job("scrape", owner=email)
+    url = f"/api/jobs/{job['job_id']}?email={email}"
+    assert client.get(url).status_code == 401
+
+    monkeypatch.setattr(auth, "AUTH_REQUIRED", False)
+    assert client.get(url).status_code == 200
+    # Un jeton fourni mais invalide reste refusé, même en mode de compatibilité
+    assert client.get(url, headers=bearer(email, expires_in=-3600)).status_code == 401
+
+
+def test_refresh_requires_a_refresh_token(client):
+    assert client.post("/api/auth/refresh", json={}).status_code == 400
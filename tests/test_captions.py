@@ -0,0 +1,56 @@
+"""Choix de la piste de sous-titres yt-dlp et conversion json3 / VTT en texte (captions.py)"""
+
+import json
+
+from captions import caption_to_text, pick_caption_track
+
+
+def track(ext, url=None):
+    return {"ext": ext, "url": url or f"https://example.test/{ext}"}
+
+
+def test_manual_subtitles_win_over_automatic_captions():
+    picked = pick_caption_track({"en": [track("vtt")]}, {"fr": [track("json3")]})
+    assert picked == {"url": "https://example.test/vtt", "ext": "vtt", "lang": "en", "auto": False}
+
+
+def test_language_order_then_automatic_captions():
+    assert pick_caption_track({"en": [track("vtt")], "fr": [track("vtt", "https://fr")]}, {})["lang"] == "fr"
+    picked = pick_caption_track({"de": [track("json3")]}, {"en": [track("vtt")]})
+    assert (picked["lang"], picked["auto"]) == ("en", True)
+
+
+def test_json3_preferred_then_vtt_then_any_track_with_url():
+    assert pick_caption_track({"fr": [track("srv1"), track("vtt"), track("json3")]}, {})["ext"] == "json3"
+    assert pick_caption_track({"fr": [track("srv1"), track("vtt")]}, {})["ext"] == "vtt"
+    assert pick_caption_track({"fr": [{"ext": "json3"}, track("srv1")]}, {})["ext"] == "srv1"
+
+
+def test_no_usable_track():
+    assert pick_caption_track({}, {}) is None
+    assert pick_caption_track(None, None) is None
+    assert pick_caption_track({"fr": [{"ext": "vtt"}]}, {"de": [track("vtt")]}) is None
+    assert pick_caption_track({"de": [track("vtt")]}, {}, langs=["de"])["lang"] == "de"
+
+
+def test_json3_to_text():
+    content = json.dumps({"events": [
+        {"segs": [{"utf8": "Bonjour"}, {"utf8": "\n"}]},
+        {"tStartMs": 1200},
+        {"segs": [{"utf8": "tout  le"}, {"utf8": "monde"}]},
+    ]})
+    assert caption_to_text(content) == "Bonjour tout le monde"
+
+
+def test_vtt_to_text():
+    content = (
+        "WEBVTT\nKind: captions\nLanguage: fr\n\n"
+        "1\n00:00:00.000 --> 00:00:01.500 align:start\n<c>Première</c> ligne\n\n"
+        "2\n00:00:01.500 --> 00:00:03.000\nseconde ligne\n"
+    )
+    assert caption_to_text(content) == "Première ligne seconde ligne"
+
+
+def test_empty_caption():
+    assert caption_to_text("") == ""
+    assert caption_to_text(json.dumps({"events": []})) == ""
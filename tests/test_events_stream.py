@@ -0,0 +1,96 @@
+"""/api/events : flux réservé aux jobs de l'appelant, nombre de flux simultanés borné (app.py, events.py)"""
+
+import threading
+import uuid
+
+import events
+from conftest import bearer, make_token
+from events import emit, parse_event_id, stream_events
+from jobs import create_job
+
+
+def other_email():
+    return f"other-{uuid.uuid4().hex[:12]}@example.test"
+
+
+def test_events_of_another_users_job_are_refused(client, email):
+    job = create_job("scrape", owner=email)
+    url = f"/api/events?job_id={job['job_id']}"
+    assert client.get(url, headers=bearer(other_email())).status_code == 404
+    response = client.get(url, headers=bearer(email))
+    assert response.status_code == 200
+    response.close()
+
+
+def test_access_token_query_only_for_event_streams(client, email):
+    job = create_job("scrape", owner=email)
+    url = f"/api/events?job_id={job['job_id']}&access_token={make_token(email)}"
+    response = client.get(url, headers={"Accept": "text/event-stream"})
+    assert response.status_code == 200
+    response.close()
+    # Hors EventSource, le jeton en paramètre est ignoré
+    assert client.get(url).status_code == 401
+
+
+def test_stream_only_yields_the_owners_events(flask_app, email):
+    import app as app_module
+    mine = create_job("scrape", owner=email)
+    theirs = create_job("scrape", owner=other_email())
+    emit("video_found", job_id=theirs["job_id"], video_id="theirs")
+    emit("video_found", job_id=mine["job_id"], video_id="mine")
+    emit("log", line="sans job")
+
+    stream = stream_events(0, None, app_module._owned_events(email))
+    assert next(stream).startswith("retry:")
+    chunk = next(stream)
+    assert '"video_id": "mine"' in chunk
+    assert "theirs" not in chunk and "sans job" not in chunk
+    stream.close()
+
+
+def test_concurrent_streams_are_capped(client, email, monkeypatch):
+    monkeypatch.setattr(events, "_stream_slots", threading.BoundedSemaphore(1))
+    job = create_job("scrape", owner=email)
+    url = f"/api/events?job_id={job['job_id']}"
+    first = client.get(url, headers=bearer(email))
+    assert first.status_code == 200
+    refused = client.get(url, headers=bearer(email))
+    assert refused.status_code == 503
+    assert refused.headers["Retry-After"]
+    # La place est rendue à la fermeture du flux, même jamais lu
+    first.close()
+    second = client.get(url, headers=bearer(email))
+    assert second.status_code == 200
+    second.close()
+
+
+def test_event_ids_carry_the_inode():
+    assert parse_event_id("12:345") == (12, 345)
+    assert parse_event_id("345") == (None, 345)  # ancien id (offset seul)
+    assert parse_event_id("abc") == (None, None)
+    assert parse_event_id(None) == (None, None)
+
+
+def test_resume_after_rotation_restarts_the_new_file(email, monkeypatch):
+    job_id = create_job("scrape", owner=email)["job_id"]
+    accept = lambda record: record.get("job_id") == job_id
+    emit("video_found", job_id=job_id, video_id="avant")
+    stream = stream_events(0, None, accept)
+    next(stream)
+    last_id = next(stream).split("\n")[0][len("id: "):]
+    stream.close()
+
+    # Rotation (fichier plus grand que la limite) puis des événements dans le nouveau fichier
+    monkeypatch.setattr(events, "EVENTS_MAX_BYTES", 0)
+    emit("video_found", job_id=job_id, video_id="apres-1")
+    monkeypatch.setattr(events, "EVENTS_MAX_BYTES", 10 ** 9)
+    emit("video_found", job_id=job_id, video_id="apres-2")
+    assert events.EVENTS_FILE.stat().st_ino != parse_event_id(last_id)[0]
+
+    inode, offset = parse_event_id(last_id)
+    stream = stream_events(offset, None, accept, inode)
+    next(stream)
+    chunks = next(stream) + next(stream)
+    stream.close()
+    assert '"video_id": "apres-1"' in chunks and '"video_id": "apres-2"' in chunks
+    assert "avant" not in chunks
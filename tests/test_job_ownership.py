@@ -0,0 +1,71 @@
+"""Les endpoints de lecture des jobs ne servent que les jobs de l'appelant (app.py)"""
+
+import uuid
+
+from conftest import ADMIN_HEADERS, bearer
+from jobs import create_job, job_workdir
+
+
+def other_email():
+    return f"other-{uuid.uuid4().hex[:12]}@example.test"
+
+
+def test_job_of_another_user_is_not_found(client, email):
+    job = create_job("scrape", owner=email, files={"urls.txt": "https://www.youtube.com/watch?v=aaaaaaaaaaa"})
+    intruder = bearer(other_email())
+    for endpoint in ("/api/scrape/status", "/api/scrape/urls", "/api/scraped-urls", "/api/debug/urls"):
+        assert client.get(f"{endpoint}?job_id={job['job_id']}", headers=intruder).status_code == 404, endpoint
+        assert client.get(f"{endpoint}?job_id={job['job_id']}", headers=bearer(email)).status_code == 200, endpoint
+    assert client.get(f"/api/jobs/{job['job_id']}", headers=intruder).status_code == 404
+    assert client.get(f"/api/jobs/{job['job_id']}", headers=bearer(email)).json["owner"] == email
+    assert client.get(f"/api/jobs/{job['job_id']}", headers=ADMIN_HEADERS).status_code == 200
+
+
+def test_latest_job_is_the_callers_own(client, email):
+    mine = create_job("transcribe", owner=email)
+    create_job("transcribe", owner=other_email())  # plus récent, d'un autre utilisateur
+    response = client.get("/api/transcribe/status", headers=bearer(email))
+    assert response.status_code == 200
+    assert response.json["job_id"] == mine["job_id"]
+    # Aucun job : 404, jamais le dernier job de quelqu'un d'autre ni les fichiers partagés
+    assert client.get("/api/transcribe/status", headers=bearer(other_email())).status_code == 404
+
+
+def test_transcript_reads_of_another_user_are_not_found(client, email):
+    job = create_job("transcribe", owner=email)
+    transcripts = job_workdir(job) / "transcripts"
+    transcripts.mkdir()
+    (transcripts / "video.txt").write_text("texte privé", encoding="utf-8")
+    query = f"job_id={job['job_id']}"
+    intruder = bearer(other_email())
+    for url in (f"/api/transcripts?{query}", f"/api/transcripts/content?path=transcripts/video.txt&{query}",
+                f"/api/transcripts/download?{query}", f"/api/transcribe/log?{query}"):
+        assert client.get(url, headers=intruder).status_code == 404, url
+    content = client.get(f"/api/transcripts/content?path=transcripts/video.txt&{query}", headers=bearer(email))
+    assert content.json["content"] == "texte privé"
+
+
+def test_jobs_list_is_forced_to_the_caller(client, email):
+    other = other_email()
+    create_job("scrape", owner=other)
+    mine = create_job("scrape", owner=email)
+    jobs = client.get(f"/api/jobs?owner={other}", headers=bearer(email)).json["jobs"]
+    assert [job["job_id"] for job in jobs] == [mine["job_id"]]
+    admin_jobs = client.get(f"/api/jobs?owner={other}", headers=ADMIN_HEADERS).json["jobs"]
+    assert {job["owner"] for job in admin_jobs} == {other}
+
+
+def test_clean_requires_auth_an_explicit_job_and_ownership(client, email):
+    job = create_job("transcribe", owner=email)
+    transcripts = job_workdir(job) / "transcripts"
+    transcripts.mkdir()
+    transcript = transcripts / "video.txt"
+    transcript.write_text("texte", encoding="utf-8")
+    url = f"/api/transcripts/clean?job_id={job['job_id']}"
+
+    assert client.post(url).status_code == 401
+    assert client.post("/api/transcripts/clean", headers=bearer(email)).status_code == 400
+    assert client.post(url, headers=bearer(other_email())).status_code == 404
+    assert transcript.exists()
+    assert client.post(url, headers=bearer(email)).status_code == 200
+    assert not transcript.exists()
@@ -0,0 +1,93 @@
+"""Quota d'essais : consommation atomique, cache premium et son invalidation (quota.py)"""
+
+import threading
+
+import pytest
+from sqlalchemy import text
+
+import quota
+from conftest import ADMIN_HEADERS
+from database import engine
+from quota import TRIAL_LIMIT, cached_premium, consume_trial, invalidate_premium, refund_trial
+
+
+@pytest.fixture
+def user(email):
+    import app as app_module
+    app_module.create_user(email, app_module.hash_password("secret"))
+    yield email
+    invalidate_premium(email)
+
+
+def set_premium_in_db(email, premium):
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE users SET premium = :premium WHERE email = :email"),
+                     {"premium": premium, "email": email})
+
+
+def trial_count(email):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT trial_count FROM users WHERE email = :email"), {"email": email}).scalar()
+
+
+def test_trials_are_consumed_up_to_the_limit(user):
+    results = [consume_trial(user) for _ in range(TRIAL_LIMIT + 2)]
+    assert [allowed for allowed, _ in results] == [True] * TRIAL_LIMIT + [False, False]
+    assert results[0][1] == f"Essais restants: {TRIAL_LIMIT}"
+    assert "Limite d'essais atteinte" in results[-1][1]
+    assert trial_count(user) == TRIAL_LIMIT
+    assert consume_trial("inconnu@example.test") == (False, "Utilisateur non trouvé")
+
+
+def test_concurrent_submissions_never_exceed_the_limit(user):
+    barrier = threading.Barrier(12)
+    allowed = []
+
+    def submit():
+        barrier.wait()
+        allowed.append(consume_trial(user)[0])
+
+    threads = [threading.Thread(target=submit) for _ in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert allowed.count(True) == TRIAL_LIMIT
+    assert trial_count(user) == TRIAL_LIMIT
+
+
+def test_refund_gives_the_trial_back(user):
+    consume_trial(user)
+    refund_trial(user)
+    assert trial_count(user) == 0
+    refund_trial(user)  # jamais sous zéro
+    assert trial_count(user) == 0
+
+
+def test_premium_status_is_cached_until_invalidated(user, monkeypatch):
+    set_premium_in_db(user, True)
+    assert consume_trial(user) == (True, "Compte premium")
+    assert cached_premium(user) is True
+    assert trial_count(user) == 0
+
+    # Premium retiré en base : le cache répond encore (aucune requête) jusqu'à l'invalidation
+    set_premium_in_db(user, False)
+    assert consume_trial(user) == (True, "Compte premium")
+    invalidate_premium(user)
+    assert consume_trial(user)[1] == f"Essais restants: {TRIAL_LIMIT}"
+    assert cached_premium(user) is False
+
+    # Entrée expirée après QUOTA_PREMIUM_TTL
+    monkeypatch.setattr(quota, "QUOTA_PREMIUM_TTL", -1)
+    quota.remember_premium(user, True)
+    assert cached_premium(user) is None
+
+
+def test_admin_set_premium_invalidates_the_cache(client, user):
+    consume_trial(user)
+    assert cached_premium(user) is False
+    response = client.post("/api/admin/set-premium", json={"email": user, "premium": True}, headers=ADMIN_HEADERS)
+    assert response.status_code == 200
+    assert cached_premium(user) is None
+    assert consume_trial(user) == (True, "Compte premium")
@@ -0,0 +1,132 @@
+"""Flux JSON Lines du scraping (scrape_feed.py) et deltas / ETag de /api/scrape/urls"""
+
+import os
+
+from scrape_feed import ScrapeFeedState, ScrapeFeedWriter, read_feed
+
+
+def video(video_id, title=None):
+    return {"url": f"https://www.youtube.com/watch?v={video_id}", "video_id": video_id,
+            "title": title or f"Titre {video_id}", "title_resolved": title is not None}
+
+
+def test_writer_appends_and_reader_keeps_partial_line(tmp_path):
+    path = tmp_path / "feed.jsonl"
+    with ScrapeFeedWriter(path) as feed:
+        feed.append_video(video("aaaaaaaaaaa"))
+        feed.append_title("aaaaaaaaaaa", "Vrai titre")
+    records, offset = read_feed(path)
+    assert [record["type"] for record in records] == ["video", "title"]
+    assert offset == path.stat().st_size
+
+    # Ligne en cours d'écriture : ignorée, relue au prochain appel
+    with open(path, "ab") as f:
+        f.write(b'{"type": "video", "video_id": "bbb')
+    assert read_feed(path, offset) == ([], offset)
+    with open(path, "ab") as f:
+        f.write(b'bbbbbbbb"}\n')
+    records, _ = read_feed(path, offset)
+    assert records == [{"type": "video", "video_id": "bbbbbbbbbbb"}]
+
+
+def test_writer_resets_an_existing_feed(tmp_path):
+    path = tmp_path / "feed.jsonl"
+    with ScrapeFeedWriter(path) as feed:
+        feed.append_video(video("aaaaaaaaaaa"))
+    with ScrapeFeedWriter(path) as feed:
+        feed.append_video(video("bbbbbbbbbbb"))
+    assert [record["video_id"] for record in read_feed(path)[0]] == ["bbbbbbbbbbb"]
+
+
+def test_state_applies_only_the_delta_and_titles(tmp_path):
+    path = tmp_path / "feed.jsonl"
+    feed = ScrapeFeedWriter(path)
+    feed.append_video(video("aaaaaaaaaaa"))
+    feed.append_video(video("bbbbbbbbbbb"))
+    state = ScrapeFeedState(path)
+    assert len(state.refresh()) == 2
+    assert state.refresh() == []
+
+    feed.append_title("bbbbbbbbbbb", "Titre enrichi")
+    assert len(state.refresh()) == 1
+    assert state.count() == 2
+    assert state.snapshot()[1]["title"] == "Titre enrichi"
+    assert state.snapshot()[1]["title_resolved"] is True
+    feed.close()
+
+
+def test_cursor_returns_changes_since(tmp_path):
+    path = tmp_path / "feed.jsonl"
+    feed = ScrapeFeedWriter(path)
+    feed.append_video(video("aaaaaaaaaaa"))
+    feed.append_video(video("bbbbbbbbbbb"))
+    state = ScrapeFeedState(path)
+    state.refresh()
+    cursor = state.cursor()
+    assert cursor == f"{os.stat(path).st_ino}:2"
+    assert state.changes_since(cursor) == ([], False)
+
+    feed.append_video(video("ccccccccccc"))
+    feed.append_title("aaaaaaaaaaa", "Titre enrichi")
+    state.refresh()
+    changed, reset = state.changes_since(cursor)
+    assert not reset
+    assert [v["video_id"] for v in changed] == ["aaaaaaaaaaa", "ccccccccccc"]
+    feed.close()
+
+
+def test_cursor_from_another_feed_or_invalid_resets(tmp_path):
+    path = tmp_path / "feed.jsonl"
+    with ScrapeFeedWriter(path) as feed:
+        feed.append_video(video("aaaaaaaaaaa"))
+    state = ScrapeFeedState(path)
+    state.refresh()
+    inode = os.stat(path).st_ino
+    for cursor in (f"{inode + 1}:1", f"{inode}:99", "n'importe quoi"):
+        changed, reset = state.changes_since(cursor)
+        assert reset and len(changed) == 1
+
+
+def test_state_rebuilds_when_the_feed_is_recreated(tmp_path):
+    path = tmp_path / "feed.jsonl"
+    with ScrapeFeedWriter(path) as feed:
+        feed.append_video(video("aaaaaaaaaaa"))
+        feed.append_video(video("bbbbbbbbbbb"))
+    state = ScrapeFeedState(path)
+    state.refresh()
+    old_cursor = state.cursor()
+
+    # Nouveau scraping : le fichier est recréé (nouvel inode, gardé vivant pour ne pas être réutilisé)
+    os.rename(path, tmp_path / "old.jsonl")
+    with ScrapeFeedWriter(path) as feed:
+        feed.append_video(video("ccccccccccc"))
+    state.refresh()
+    assert [v["video_id"] for v in state.snapshot()] == ["ccccccccccc"]
+    assert state.changes_since(old_cursor)[1] is True
+
+
+def test_scrape_urls_etag_and_delta(client, email):
+    from conftest import bearer
+    from jobs import create_job, job_workdir
+    from scrape_feed import SCRAPE_FEED_NAME
+
+    job = create_job("scrape", owner=email)
+    feed = ScrapeFeedWriter(job_workdir(job) / SCRAPE_FEED_NAME)
+    feed.append_video(video("aaaaaaaaaaa", "Première"))
+    url = f"/api/scrape/urls?job_id={job['job_id']}"
+    auth = bearer(email)
+
+    first = client.get(url, headers=auth)
+    assert first.status_code == 200
+    assert first.json["count"] == 1 and first.json["reset"] is True
+    etag = first.headers["ETag"]
+    assert client.get(url, headers={**auth, "If-None-Match": etag}).status_code == 304
+
+    feed.append_video(video("bbbbbbbbbbb", "Seconde"))
+    feed.close()
+    delta = client.get(f"{url}&since={first.json['cursor']}", headers={**auth, "If-None-Match": etag})
+    assert delta.status_code == 200
+    assert delta.headers["ETag"] != etag
+    assert delta.json["delta"] is True and delta.json["reset"] is False
+    assert [v["video_id"] for v in delta.json["urls"]] == ["bbbbbbbbbbb"]
+    assert delta.json["count"] == 2
@@ -0,0 +1,62 @@
+"""
+Soumission d'une transcription : job mis en file (202), essai rendu si la file est pleine,
+entrée validée avant de consommer un essai (app.py, quota.py).
+Latence sous charge : test_submit_latency.py (API gunicorn, à la racine du dépôt).
+"""
+
+import pytest
+from sqlalchemy import text
+
+from conftest import bearer
+from database import engine
+from jobs import Job, get_job, job_workdir
+
+VIDEO_URL = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+
+
+def trial_count(email):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT trial_count FROM users WHERE email = :email"), {"email": email}).scalar()
+
+
+def test_submit_queues_the_job(client, email):
+    import app as app_module
+    from database import SessionLocal
+    app_module.create_user(email, app_module.hash_password("secret"))
+
+    response = client.post("/api/transcribe/selected", json={"urls": [VIDEO_URL]}, headers=bearer(email))
+
+    assert response.status_code == 202
+    assert response.json["state"] == "queued"
+    db = SessionLocal()
+    try:
+        job = db.query(Job).filter(Job.id == response.json["job_id"]).one()
+        assert (job.kind, job.state, job.owner) == ("transcribe", "queued", email)
+    finally:
+        db.close()
+    assert (job_workdir(get_job(job.id)) / "urls.txt").read_text() == VIDEO_URL
+    assert trial_count(email) == 1
+
+
+def test_full_queue_refunds_the_trial(client, email, monkeypatch):
+    import app as app_module
+    app_module.create_user(email, app_module.hash_password("secret"))
+    monkeypatch.setattr(app_module, "JOB_QUEUE_LIMIT", 0)
+
+    response = client.post("/api/transcribe/selected", json={"urls": [VIDEO_URL]}, headers=bearer(email))
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"]
+    assert trial_count(email) == 0
+
+
+@pytest.mark.parametrize("urls", [VIDEO_URL, [VIDEO_URL, 42], [""], {"url": VIDEO_URL}])
+def test_invalid_urls_are_refused_before_consuming_a_trial(client, email, urls):
+    import app as app_module
+    app_module.create_user(email, app_module.hash_password("secret"))
+
+    response = client.post("/api/transcribe/selected", json={"urls": urls}, headers=bearer(email))
+
+    assert response.status_code == 400
+    assert trial_count(email) == 0
+
@@ -0,0 +1,30 @@
+"""/api/transcribe/log : dernières lignes, reprise par since_offset, curseur invalide refusé (app.py)"""
+
+from conftest import bearer
+from jobs import JOB_SCRIPTS, create_job, job_workdir
+
+
+def job_with_log(email, content):
+    job = create_job("transcribe", owner=email)
+    (job_workdir(job) / JOB_SCRIPTS["transcribe"][1]).write_text(content, encoding="utf-8")
+    return job
+
+
+def test_since_offset_returns_only_new_lines(client, email):
+    job = job_with_log(email, "un\ndeux\n")
+    url = f"/api/transcribe/log?job_id={job['job_id']}"
+    first = client.get(url, headers=bearer(email)).json
+    assert first["log"] == "un\ndeux\n"
+
+    with open(job_workdir(job) / JOB_SCRIPTS["transcribe"][1], "a", encoding="utf-8") as f:
+        f.write("trois\n")
+    after = client.get(f"{url}&since_offset={first['offset']}", headers=bearer(email)).json
+    assert after["log"] == "trois\n"
+    assert not after["reset"]
+
+
+def test_negative_since_offset_is_refused(client, email):
+    job = job_with_log(email, "un\n")
+    url = f"/api/transcribe/log?job_id={job['job_id']}&since_offset=-5"
+    assert client.get(url, headers=bearer(email)).status_code == 400
+    assert client.get(f"{url}&follow=1", headers=bearer(email)).status_code == 400
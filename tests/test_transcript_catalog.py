@@ -0,0 +1,31 @@
+"""Réindexation d'un dossier existant : .txt et .txt.gz (transcript_catalog.py)"""
+
+from jobs import create_job, job_workdir
+from transcript_catalog import list_transcripts, reindex_directory
+from transcript_search import search_transcripts
+from transcript_store import encode_transcript
+
+
+def test_reindex_catalogues_plain_and_compressed_files(email):
+    job = create_job("transcribe", owner=email)
+    directory = job_workdir(job) / "transcripts"
+    directory.mkdir(parents=True)
+    (directory / "ancien.txt").write_text("texte ancien reindexplain", encoding="utf-8")
+    metadata = {"video_id": "abcdefghijk", "language": "fr", "title": "Vidéo compressée",
+                "url": "https://www.youtube.com/watch?v=abcdefghijk", "source": "captions"}
+    (directory / "compresse [abcdefghijk].txt.gz").write_bytes(
+        encode_transcript("texte compressé reindexgz".encode("utf-8"), metadata))
+    # Même nom en .txt et .txt.gz : une seule ligne, celle du fichier compressé
+    (directory / "double.txt").write_text("version non compressée", encoding="utf-8")
+    (directory / "double.txt.gz").write_bytes(encode_transcript("version compressée".encode("utf-8"), {}))
+
+    assert reindex_directory(directory, job_id=job["job_id"]) == 3
+
+    rows, _ = list_transcripts(job["job_id"])
+    by_name = {row["name"]: row for row in rows}
+    assert set(by_name) == {"ancien.txt", "compresse [abcdefghijk].txt", "double.txt"}
+    assert by_name["compresse [abcdefghijk].txt"]["video_id"] == "abcdefghijk"
+    assert by_name["compresse [abcdefghijk].txt"]["title"] == "Vidéo compressée"
+    assert [result["name"] for result in search_transcripts("reindexgz", job_id=job["job_id"])] == [
+        "compresse [abcdefghijk].txt"
+    ]
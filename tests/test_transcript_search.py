@@ -0,0 +1,88 @@
+"""Recherche plein texte SQLite FTS5 : classement, extraits, filtre par job et par propriétaire (transcript_search.py)"""
+
+import uuid
+
+from conftest import ADMIN_HEADERS, bearer
+from jobs import create_job, job_workdir
+from transcript_catalog import record_transcript
+from transcript_search import MARK_END, MARK_START, search_transcripts
+
+
+def index(job, name, body, title=None):
+    record_transcript(job_workdir(job) / "transcripts" / name, body, title=title or name, job_id=job["job_id"])
+
+
+def word():
+    """Terme propre au test (la base est partagée par toute la session)"""
+    return "mot" + uuid.uuid4().hex[:10]
+
+
+def test_results_are_ranked_with_snippets(email):
+    term = word()
+    job = create_job("transcribe", owner=email)
+    index(job, "rare.txt", f"une seule mention de {term} dans un long texte " + "remplissage " * 50)
+    index(job, "dense.txt", f"{term} {term} {term} encore {term}")
+    index(job, "absent.txt", "rien à voir")
+
+    results = search_transcripts(term, owner=email)
+
+    assert [result["name"] for result in results] == ["dense.txt", "rare.txt"]
+    assert results[0]["rank"] > results[1]["rank"]
+    assert f"{MARK_START}{term}{MARK_END}" in results[1]["snippet"]
+    assert results[1]["offset"] == len("une seule mention de ")
+    assert results[0]["path"] == "transcripts/dense.txt"
+
+
+def test_prefix_match_on_last_term(email):
+    term = word()
+    job = create_job("transcribe", owner=email)
+    index(job, "video.txt", f"le {term}suffixe apparaît ici")
+    assert [result["name"] for result in search_transcripts(term, owner=email)] == ["video.txt"]
+
+
+def test_job_and_owner_filters(email):
+    term = word()
+    first, second = create_job("transcribe", owner=email), create_job("transcribe", owner=email)
+    foreign = create_job("transcribe", owner=f"other-{uuid.uuid4().hex[:12]}@example.test")
+    index(first, "a.txt", term)
+    index(second, "b.txt", term)
+    index(foreign, "c.txt", term)
+
+    assert {result["name"] for result in search_transcripts(term, job_id=first["job_id"])} == {"a.txt"}
+    assert {result["name"] for result in search_transcripts(term, owner=email)} == {"a.txt", "b.txt"}
+    assert {result["name"] for result in search_transcripts(term)} == {"a.txt", "b.txt", "c.txt"}
+
+
+def test_search_endpoint_is_scoped_to_the_caller(client, email):
+    term = word()
+    mine = create_job("transcribe", owner=email)
+    foreign = create_job("transcribe", owner=f"other-{uuid.uuid4().hex[:12]}@example.test")
+    index(mine, "mine.txt", term)
+    index(foreign, "theirs.txt", term)
+
+    assert client.get(f"/api/transcripts/search?q={term}").status_code == 401
+    response = client.get(f"/api/transcripts/search?q={term}", headers=bearer(email))
+    assert response.status_code == 200
+    assert [result["name"] for result in response.json["results"]] == ["mine.txt"]
+    url = f"/api/transcripts/search?q={term}&job_id={foreign['job_id']}"
+    assert client.get(url, headers=bearer(email)).status_code == 404
+    assert client.get(f"/api/transcripts/search?q={term}", headers=ADMIN_HEADERS).json["count"] == 2
+
+
+def test_offset_is_a_utf8_byte_offset_for_the_content_api(client, email):
+    term = word()
+    job = create_job("transcribe", owner=email)
+    before = "Œuvre présentée à l'ÉCOLE : "
+    body = f"{before}{term} et l'ÉLÉPHANT rosé."
+    path = job_workdir(job) / "transcripts" / "accents.txt"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(body, encoding="utf-8")
+    index(job, "accents.txt", body)
+
+    # Premier terme de la requête sans accents ni casse : la position vient du mot surligné
+    results = search_transcripts(f"elephant {term}", owner=email)
+    assert [result["name"] for result in results] == ["accents.txt"]
+    assert results[0]["offset"] == len(before.encode("utf-8"))
+
+    url = f"/api/transcripts/content?path=transcripts/accents.txt&job_id={job['job_id']}&offset={results[0]['offset']}"
+    assert client.get(url, headers=bearer(email)).json["content"].startswith(term)
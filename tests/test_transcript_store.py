@@ -0,0 +1,114 @@
+"""Magasin de transcriptions : déduplication sur le texte seul, en-tête d'exécution propre à chaque job"""
+
+import uuid
+
+from jobs import create_job, job_workdir
+from transcript_store import (
+    StoredTranscript, object_path, read_metadata, read_transcript, reuse_stored, save_transcript,
+    transcript_header
+)
+from database import SessionLocal
+
+
+def video_id():
+    return uuid.uuid4().hex[:11]
+
+
+def save(job, vid, header, text="Bonjour\r\nle monde  \n"):
+    out = job_workdir(job) / "transcripts" / f"Titre [{vid}].txt"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    return save_transcript(out, header, text, url=f"https://www.youtube.com/watch?v={vid}",
+                           title="Titre", video_id=vid, language="fr", source="captions")
+
+
+def test_runs_with_different_headers_share_one_object(email):
+    vid = video_id()
+    first = save(create_job("transcribe", owner=email), vid, "TITRE: Titre\nDATE: 2026-01-01 10:00:00\n\n")
+    second = save(create_job("transcribe", owner=email), vid, "TITRE: Titre\nDATE: 2026-01-02 11:30:00\n\n")
+
+    assert first.stat().st_ino == second.stat().st_ino
+    assert read_transcript(second) == "Bonjour\nle monde"
+    # Chaque job garde l'en-tête de sa propre exécution, l'objet partagé n'en porte aucun
+    assert transcript_header(first).startswith("TITRE: Titre\nDATE: 2026-01-01")
+    assert transcript_header(second).startswith("TITRE: Titre\nDATE: 2026-01-02")
+    assert "header" not in read_metadata(second)
+    db = SessionLocal()
+    try:
+        row = db.get(StoredTranscript, (vid, "fr"))
+        assert object_path(row.content_hash).exists()
+        assert row.size == len("Bonjour\nle monde")
+    finally:
+        db.close()
+
+
+def test_reuse_links_the_stored_text(email):
+    vid = video_id()
+    save(create_job("transcribe", owner=email), vid, "TITRE: Titre\nDATE: 2026-01-01\n\n",
+         text="Premier paragraphe.\n\nSecond paragraphe.")
+    out_dir = job_workdir(create_job("transcribe", owner=email)) / "transcripts"
+    url = f"https://www.youtube.com/watch?v={vid}"
+
+    remaining, reused = reuse_stored([url, "https://www.youtube.com/watch?v=zzzzzzzzzzz"], out_dir, lambda t: t,
+                                     lambda title, u: f"TITRE: {title}\nDATE: 2026-03-01\n\n")
+
+    assert remaining == ["https://www.youtube.com/watch?v=zzzzzzzzzzz"]
+    assert [u for u, _ in reused] == [url]
+    # Texte intact (aucun paragraphe pris pour un en-tête), en-tête de l'exécution qui réutilise
+    assert read_transcript(reused[0][1]) == "Premier paragraphe.\n\nSecond paragraphe."
+    assert transcript_header(reused[0][1]) == "TITRE: Titre\nDATE: 2026-03-01\n\n"
+    assert read_metadata(reused[0][1])["video_id"] == vid
+
+
+def test_same_text_of_two_videos_keeps_each_videos_metadata(email):
+    job = create_job("transcribe", owner=email)
+    first, second = video_id(), video_id()
+    assert save(job, first, "").stat().st_ino != save(job, second, "").stat().st_ino
+    assert read_metadata(job_workdir(job) / "transcripts" / f"Titre [{second}].txt.gz")["video_id"] == second
+
+
+def sample_text():
+    return "".join(f"ligne {i:05d} é\n" for i in range(20000)).encode("utf-8")
+
+
+def test_seek_points_decode_from_the_nearest_checkpoint(monkeypatch, tmp_path):
+    import gzip
+    import transcript_store
+    monkeypatch.setattr(transcript_store, "TRANSCRIPT_SEEK_SPAN", 4096)
+    data = sample_text()
+    path = tmp_path / "long.txt.gz"
+    path.write_bytes(transcript_store.encode_transcript(data, {"title": "long"}))
+
+    assert gzip.decompress(path.read_bytes()) == data  # toujours un gzip standard
+    assert len(read_metadata(path)["seek"]) == len(data) // 4096
+    with transcript_store.open_transcript(path) as f:
+        for offset in (150_000, 4096, 0, 12_345, len(data) - 10, len(data) + 5):
+            f.seek(offset)
+            assert f.read(100) == data[offset:offset + 100]
+            assert f.tell() == min(offset + 100, len(data))
+    text, next_offset = transcript_store.read_transcript_page(path, 100_000, 1000)
+    assert text.encode("utf-8") == data[100_000:next_offset]
+
+
+def test_range_requests_on_compressed_transcripts(client, email, monkeypatch):
+    import transcript_store
+    from conftest import bearer
+    monkeypatch.setattr(transcript_store, "TRANSCRIPT_SEEK_SPAN", 4096)
+    data = sample_text()
+    job = create_job("transcribe", owner=email)
+    directory = job_workdir(job) / "transcripts"
+    directory.mkdir(parents=True)
+    (directory / "long.txt.gz").write_bytes(transcript_store.encode_transcript(data, {}))
+    url = f"/api/transcripts/content?path=transcripts/long.txt&raw=1&job_id={job['job_id']}"
+    headers = {**bearer(email), "Accept-Encoding": "identity"}
+
+    response = client.get(url, headers={**headers, "Range": "bytes=200000-200099"})
+    assert response.status_code == 206
+    assert response.data == data[200_000:200_100]
+    assert response.headers["Content-Range"] == f"bytes 200000-200099/{len(data)}"
+
+    full = client.get(url, headers=headers)
+    assert full.status_code == 200 and full.data == data
+    assert full.headers["Accept-Ranges"] == "bytes"
+    stale = client.get(url, headers={**headers, "Range": "bytes=0-9", "If-Range": '"autre-version"'})
+    assert stale.status_code == 200
+    assert client.get(url, headers={**headers, "Range": f"bytes={len(data) + 10}-"}).status_code == 416
@@ -0,0 +1,49 @@
+"""
+worker.py ne crée pas le schéma : arrêt immédiat si les tables manquent (database.missing_tables).
+Bail expiré sur la dernière tentative : job 'failed' et événement job_finished (jobs.lease_job).
+"""
+
+import json
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+import events
+import worker
+from database import engine, missing_tables
+from jobs import Job, create_job, get_job, lease_job
+
+
+def test_missing_tables_reports_only_absent_tables():
+    assert missing_tables("jobs", "transcripts", "transcript_store") == []
+    assert missing_tables("jobs", "table_inexistante") == ["table_inexistante"]
+
+
+def test_worker_stops_before_starting_without_schema(monkeypatch, capsys):
+    monkeypatch.setattr(worker, "missing_tables", lambda *names: ["jobs"])
+    monkeypatch.setattr(worker, "worker_loop", lambda *args: pytest.fail("worker démarré sans schéma"))
+    monkeypatch.setattr(sys, "argv", ["worker.py", "--once"])
+    with pytest.raises(SystemExit) as exit_info:
+        worker.main()
+    assert exit_info.value.code == 1
+    assert "python app.py migrate" in capsys.readouterr().out
+
+
+def test_expired_lease_on_the_last_attempt_announces_the_failure(email):
+    job = create_job("lease-test", owner=email, max_attempts=1)  # type propre au test : aucun autre job pris
+    with engine.begin() as conn:
+        conn.execute(update(Job).where(Job.id == job["job_id"]).values(
+            state="running", attempts=1, lease_owner="mort", available_at=datetime(2000, 1, 1),
+            lease_expires_at=datetime.utcnow() - timedelta(minutes=5)
+        ))
+    offset = events.EVENTS_FILE.stat().st_size if events.EVENTS_FILE.exists() else 0
+
+    lease_job("worker-test", kinds=["lease-test"])
+
+    assert get_job(job["job_id"])["state"] == "failed"
+    lines, _ = events.read_since(events.EVENTS_FILE, offset)
+    finished = [record for record in map(json.loads, lines)
+                if record["type"] == "job_finished" and record.get("job_id") == job["job_id"]]
+    assert [record["state"] for record in finished] == ["failed"]